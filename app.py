@@ -32,16 +32,27 @@ if not os.path.exists(app.config['HOSTED_FILES_FOLDER']):
 # Database configuration
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    'pool_pre_ping': True,
-    "pool_recycle": 300,
-}
+# Pool size, overflow, timeout and pre-ping come from DB_POOL_* variables (see utils/db_pool.py)
+from utils.db_pool import engine_options  # noqa: E402
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 
 # Initialize the database
 db = SQLAlchemy(app, model_class=Base)
 
-# Create tables
-with app.app_context():
-    import models  # noqa: F401
-    db.create_all()
-    logging.info("Database tables created")
+# Opt-in request profiler; it runs inside the metrics middleware, so profiled requests' timings include its overhead
+from utils.profiling import init_profiling  # noqa: E402
+init_profiling(app)
+
+# Per-endpoint latency, DB/LLM time and response size metrics
+from utils.request_metrics import init_request_metrics  # noqa: E402
+init_request_metrics(app)
+
+# Schema changes are applied by `python migrate.py`, not at import, so worker startup never touches the database
+
+def _reset_db_pool_after_fork():
+    """Drop pooled connections inherited from a parent that imported the app (gunicorn --preload)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_reset_db_pool_after_fork)
@@ -0,0 +1,41 @@
+"""Benchmarks for utils.html_analyzer."""
+import os
+import atexit
+import shutil
+import tempfile
+from bs4 import BeautifulSoup
+from corpora import make_css, make_html
+from utils.html_analyzer import (
+    analyze_html_css, extract_colors, extract_typography, extract_layout, extract_components
+)
+
+CORPORA = {
+    "small": (make_html(3), make_css(30)),
+    "large": (make_html(200), make_css(3000)),
+    "minified": (make_html(200, minified=True), make_css(3000, minified=True)),
+}
+
+
+def _write_corpus(directory, label, html, css):
+    html_path = os.path.join(directory, f"{label}.html")
+    css_path = os.path.join(directory, f"{label}.css")
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    with open(css_path, "w", encoding="utf-8") as f:
+        f.write(css)
+    return html_path, css_path
+
+
+def benchmarks():
+    directory = tempfile.mkdtemp(prefix="bench_analyzer_")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+
+    for label, (html, css) in CORPORA.items():
+        html_path, css_path = _write_corpus(directory, label, html, css)
+        soup = BeautifulSoup(html, "html.parser")
+
+        yield f"analyzer.analyze_html_css[{label}]", lambda h=html_path, c=css_path: analyze_html_css(h, c)
+        yield f"analyzer.extract_colors[{label}]", lambda c=css: extract_colors(c)
+        yield f"analyzer.extract_typography[{label}]", lambda c=css: extract_typography(c)
+        yield f"analyzer.extract_layout[{label}]", lambda s=soup, c=css: extract_layout(s, c)
+        yield f"analyzer.extract_components[{label}]", lambda s=soup, c=css: extract_components(s, c)
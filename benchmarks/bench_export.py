@@ -0,0 +1,18 @@
+"""Benchmarks for export packaging."""
+from corpora import make_posts, make_project, make_style_analysis
+from utils.html_generator import generate_blog_template, generate_post_template
+from utils.file_storage import create_download_package
+
+POST_COUNTS = (10, 100, 1000, 10000)
+
+
+def benchmarks():
+    analysis = make_style_analysis()
+    project = make_project(
+        generate_blog_template(analysis, "1_1.css", None),
+        generate_post_template(analysis, "1_1.css", None),
+    )
+    posts = make_posts(max(POST_COUNTS))
+
+    for count in POST_COUNTS:
+        yield f"export.create_download_package[{count} posts]", lambda p=posts[:count]: create_download_package(project, p)
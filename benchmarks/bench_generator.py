@@ -0,0 +1,20 @@
+"""Benchmarks for utils.html_generator and post formatting."""
+from corpora import make_markdown, make_style_analysis
+from utils.html_generator import (
+    generate_blog_stylesheet_content, generate_blog_template, generate_post_template,
+    format_blog_html as format_generator_html
+)
+from openai_service import format_blog_html
+
+
+def benchmarks():
+    analysis = make_style_analysis()
+
+    yield "generator.generate_blog_stylesheet_content", lambda: generate_blog_stylesheet_content(analysis)
+    yield "generator.generate_blog_template", lambda: generate_blog_template(analysis, "1_1.css", "1_1.js")
+    yield "generator.generate_post_template", lambda: generate_post_template(analysis, "1_1.css", "1_1.js")
+
+    for paragraphs in (10, 100, 1000):
+        content = make_markdown(paragraphs)
+        yield f"formatter.format_blog_html[{paragraphs}p]", lambda c=content: format_blog_html("Title", c, analysis)
+        yield f"formatter.html_generator.format_blog_html[{paragraphs}p]", lambda c=content: format_generator_html("Title", c, analysis)
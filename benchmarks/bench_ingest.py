@@ -0,0 +1,46 @@
+"""Benchmarks for utils.upload_ingest, against the save-then-reread flow it replaced."""
+import io
+import os
+import atexit
+import shutil
+import itertools
+import tempfile
+from werkzeug.datastructures import FileStorage
+from corpora import make_html
+import utils.blob_storage as blob_storage
+from utils.upload_ingest import ingest_upload
+
+CORPORA = {
+    "small": make_html(3),
+    "large": make_html(2000),
+}
+
+
+def _upload(data):
+    return FileStorage(io.BytesIO(data), filename="index.html")
+
+
+def _save_and_reread(directory, data, counter):
+    """The old flow: file.save() to disk, then each of the two analyzers opens and decodes the file."""
+    path = os.path.join(directory, f"{next(counter)}_index.html")
+    _upload(data).save(path)
+    for _ in range(2):
+        with open(path, encoding="utf-8") as f:
+            f.read()
+
+
+def benchmarks():
+    directory = tempfile.mkdtemp(prefix="bench_ingest_")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    # Store into the temporary directory rather than the app's uploads folder
+    blob_storage._storage = blob_storage.LocalStorage({"uploads": os.path.join(directory, "uploads")})
+    blob_storage._storage_pid = os.getpid()
+    counter = itertools.count()
+
+    for label, html in CORPORA.items():
+        data = html.encode("utf-8")
+        yield f"ingest.save_and_reread[{label}]", lambda d=data: _save_and_reread(directory, d, counter)
+        # A unique suffix per call, so every upload is new content and gets written
+        yield f"ingest.ingest_upload[{label}]", lambda d=data: ingest_upload(
+            _upload(d + f"<!-- {next(counter)} -->".encode("ascii")), "html")
+        yield f"ingest.ingest_upload_duplicate[{label}]", lambda d=data: ingest_upload(_upload(d), "html")
@@ -0,0 +1,84 @@
+"""
+Benchmarks for the full upload and create_post pipelines, with LLM calls replayed from a cassette.
+
+The cassette is recorded once per run against loadtest/fake_openai.py, then
+every timed iteration replays it instantly, so the numbers cover only this
+app's own work and do not depend on the network.
+"""
+import os
+import sys
+import atexit
+import shutil
+import tempfile
+import threading
+from openai import AsyncOpenAI
+from corpora import make_css, make_html
+import openai_service
+from openai_service import analyze_upload, generate_blog_post
+from utils.html_generator import generate_blog_stylesheet_content, generate_blog_template, generate_post_template
+from utils.llm_cassette import use_cassette
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "loadtest"))
+from fake_openai import make_server  # noqa: E402
+
+WEBSITE_PURPOSE = "A developer tools company blog"
+TOPIC = "Reducing build times in large monorepos"
+
+
+def upload_pipeline(html_path, css_path):
+    """The analysis and generation steps of the upload_files route."""
+    with open(html_path, encoding="utf-8") as html_file, open(css_path, encoding="utf-8") as css_file:
+        analysis = analyze_upload(html_file.read(), css_file.read(), WEBSITE_PURPOSE)
+    generate_blog_stylesheet_content(analysis)
+    generate_blog_template(analysis, "1_1.css", "1_1.js")
+    generate_post_template(analysis, "1_1.css", "1_1.js")
+    return analysis
+
+
+def create_post_pipeline(analysis):
+    """The generation steps of the create_post route."""
+    return generate_blog_post(topic=TOPIC, website_info=WEBSITE_PURPOSE, style_analysis=analysis)
+
+
+def _replayed(cassette_path, func, *args):
+    """Run func with every LLM call served from the cassette; a miss fails the benchmark."""
+    def run():
+        with use_cassette(cassette_path, mode="replay") as cassette:
+            func(*args)
+        if cassette.misses:
+            raise RuntimeError(f"{cassette.misses} LLM call(s) missing from {cassette_path}")
+    return run
+
+
+def _record(cassette_path, html_path, css_path):
+    """Run both pipelines once against the fake OpenAI server, recording the calls."""
+    server = make_server(port=0, latency="fixed:0")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    live_client = openai_service.async_openai
+    openai_service.async_openai = AsyncOpenAI(api_key="benchmark", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        with use_cassette(cassette_path, mode="record"):
+            analysis = upload_pipeline(html_path, css_path)
+            create_post_pipeline(analysis)
+    finally:
+        openai_service.async_openai = live_client
+        server.shutdown()
+    return analysis
+
+
+def benchmarks():
+    directory = tempfile.mkdtemp(prefix="bench_pipeline_")
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+
+    html_path = os.path.join(directory, "site.html")
+    css_path = os.path.join(directory, "site.css")
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(make_html(50))
+    with open(css_path, "w", encoding="utf-8") as f:
+        f.write(make_css(500))
+
+    cassette_path = os.path.join(directory, "pipeline.jsonl")
+    analysis = _record(cassette_path, html_path, css_path)
+
+    yield "pipeline.upload[replay]", _replayed(cassette_path, upload_pipeline, html_path, css_path)
+    yield "pipeline.create_post[replay]", _replayed(cassette_path, create_post_pipeline, analysis)
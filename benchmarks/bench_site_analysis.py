@@ -0,0 +1,35 @@
+"""Benchmarks for utils.site_analysis: reading a site ZIP, and analyzing its pages serially and in the pool."""
+import io
+import zipfile
+from corpora import make_css, make_html
+import utils.site_analysis as site_analysis
+
+PAGES = 40
+
+
+def _site_zip(pages):
+    """A ZIP of a site: a home page and blog pages sharing one stylesheet, and one page with its own."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("site/css/main.css", make_css(1000))
+        archive.writestr("site/css/landing.css", make_css(200, seed=7))
+        archive.writestr("site/index.html", '<link rel="stylesheet" href="css/main.css">' + make_html(40))
+        archive.writestr("site/landing.html", '<link rel="stylesheet" href="/css/landing.css">' + make_html(20, seed=7))
+        for index in range(pages):
+            archive.writestr(f"site/blog/post-{index}.html",
+                             '<link rel="stylesheet" href="../css/main.css">' + make_html(10, seed=index))
+    return buffer.getvalue()
+
+
+def _analyze(site, workers):
+    site_analysis.SITE_ANALYSIS_WORKERS = workers
+    return site_analysis.analyze_site(site, time_budget=600)
+
+
+def benchmarks():
+    data = _site_zip(PAGES)
+    site = site_analysis.read_site_zip(io.BytesIO(data))
+
+    yield f"site.read_site_zip[{PAGES + 2} pages]", lambda: site_analysis.read_site_zip(io.BytesIO(data))
+    yield f"site.analyze_site[{PAGES + 2} pages, serial]", lambda: _analyze(site, 1)
+    yield f"site.analyze_site[{PAGES + 2} pages, 2 workers]", lambda: _analyze(site, 2)
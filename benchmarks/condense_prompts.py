@@ -0,0 +1,90 @@
+"""
+Measure how much the condensation stage shrinks the analysis prompt.
+
+Pairs the HTML and CSS files in uploads/ by their upload timestamp and reports
+prompt tokens and condensation time for the raw and condensed sources. With
+--live, also times analyze_website_content end to end against the OpenAI API.
+
+Usage:
+    python benchmarks/condense_prompts.py [--live] [--uploads DIR]
+"""
+import os
+import sys
+import time
+import argparse
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.prompt_budget import count_tokens  # noqa: E402
+from utils.content_condenser import condense_for_analysis  # noqa: E402
+
+
+def find_upload_pairs(uploads_dir):
+    """Group uploaded files by timestamp prefix into (html_path, css_path) pairs."""
+    groups = defaultdict(dict)
+    for name in sorted(os.listdir(uploads_dir)):
+        timestamp = name.split('_', 1)[0]
+        extension = os.path.splitext(name)[1].lower()
+        if extension in ('.html', '.htm'):
+            groups[timestamp]['html'] = os.path.join(uploads_dir, name)
+        elif extension == '.css':
+            groups[timestamp]['css'] = os.path.join(uploads_dir, name)
+    return [(group['html'], group['css']) for _, group in sorted(groups.items()) if len(group) == 2]
+
+
+def measure_pair(html_path, css_path, live=False):
+    """Return prompt size and timing figures for one HTML/CSS pair."""
+    with open(html_path, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    with open(css_path, 'r', encoding='utf-8') as f:
+        css_content = f.read()
+
+    start = time.perf_counter()
+    condensed_html, condensed_css = condense_for_analysis(html_content, css_content)
+    condense_ms = (time.perf_counter() - start) * 1000
+
+    result = {
+        "pair": os.path.basename(html_path).split('_', 1)[0],
+        "raw_tokens": count_tokens(html_content) + count_tokens(css_content),
+        "condensed_tokens": count_tokens(condensed_html) + count_tokens(condensed_css),
+        "condense_ms": condense_ms,
+    }
+
+    if live:
+        from openai_service import analyze_website_content
+        for condense in (False, True):
+            start = time.perf_counter()
+            analyze_website_content(html_path, css_path, "Benchmark run", condense=condense)
+            result[f"{'condensed' if condense else 'raw'}_latency_s"] = time.perf_counter() - start
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--uploads', default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'uploads'))
+    parser.add_argument('--live', action='store_true', help='also call the OpenAI API and time the full analysis')
+    args = parser.parse_args()
+
+    pairs = find_upload_pairs(args.uploads)
+    if not pairs:
+        print(f"No HTML/CSS pairs found in {args.uploads}")
+        return 1
+
+    for html_path, css_path in pairs:
+        result = measure_pair(html_path, css_path, live=args.live)
+        saved = 100 * (1 - result['condensed_tokens'] / max(result['raw_tokens'], 1))
+        line = (
+            f"{result['pair']}: {result['raw_tokens']} -> {result['condensed_tokens']} tokens "
+            f"({saved:.0f}% smaller), condensed in {result['condense_ms']:.1f} ms"
+        )
+        if args.live:
+            line += f", analysis {result['raw_latency_s']:.1f}s raw vs {result['condensed_latency_s']:.1f}s condensed"
+        print(line)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Synthetic inputs for the benchmark suite.
+
+Everything here is deterministic (seeded) so runs are comparable.
+"""
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+SEED = 1234
+
+FONTS = ["'Inter', sans-serif", "Georgia, serif", "'Roboto Mono', monospace", "Helvetica, Arial, sans-serif"]
+WORDS = (
+    "market trading portfolio strategy growth design system blog content guide developer "
+    "product launch customer insight analytics performance teams cloud platform"
+).split()
+
+
+def _color(rng):
+    return f"#{rng.randrange(0x1000000):06x}"
+
+
+def _css_rule(rng, index):
+    selector = rng.choice([
+        f".card-{index}", f".btn-{index}", f"#section-{index} h2", f".nav-{index} a:hover",
+        "body", "h1", "h2", "a", ".container", "header", "footer", ".btn",
+    ])
+    declarations = [
+        f"color: {_color(rng)}",
+        f"background-color: {_color(rng)}",
+        f"font-family: {rng.choice(FONTS)}",
+        f"font-size: {rng.choice(['1rem', '14px', '2.5rem', '1.25em'])}",
+        f"padding: {rng.randint(0, 32)}px {rng.randint(0, 32)}px",
+        f"border-radius: {rng.randint(0, 24)}px",
+        f"box-shadow: 0 {rng.randint(1, 8)}px {rng.randint(2, 24)}px rgba(0,0,0,0.{rng.randint(1, 9)})",
+        f"-webkit-transition: all 0.{rng.randint(1, 9)}s",
+        f"margin-bottom: {rng.randint(0, 4)}rem",
+    ]
+    rng.shuffle(declarations)
+    body = ";\n    ".join(declarations[:rng.randint(3, len(declarations))])
+    return f"/* rule {index} */\n{selector} {{\n    {body};\n}}\n"
+
+
+def make_css(rules, minified=False, seed=SEED):
+    """A stylesheet with the given number of rules, optionally minified."""
+    rng = random.Random(seed)
+    css = "\n".join(_css_rule(rng, i) for i in range(rules))
+    if minified:
+        css = "".join(line.strip() for line in css.splitlines() if not line.strip().startswith("/*"))
+    return css
+
+
+def _section(rng, index):
+    cards = "".join(
+        f'<div class="card"><h3>{" ".join(rng.choices(WORDS, k=4))}</h3>'
+        f'<p>{" ".join(rng.choices(WORDS, k=30))}</p><a class="btn" href="/p/{index}-{i}">More</a></div>\n'
+        for i in range(rng.randint(2, 6))
+    )
+    return (
+        f'<section id="section-{index}" class="section">\n<h2>{" ".join(rng.choices(WORDS, k=3))}</h2>\n'
+        f'<svg viewBox="0 0 10 10"><path d="M0 0L10 10"/></svg>\n{cards}</section>\n'
+    )
+
+
+def make_html(sections, minified=False, seed=SEED):
+    """An HTML page with header, nav, footer and the given number of content sections."""
+    rng = random.Random(seed)
+    body = "".join(_section(rng, i) for i in range(sections))
+    html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Benchmark Site</title>
+<meta name="description" content="{' '.join(rng.choices(WORDS, k=20))}">
+<script>window.dataLayer = [];</script>
+</head>
+<body>
+<header class="site-header"><img class="logo" src="/logo.png" alt="Logo"><nav><a href="/">Home</a><a href="/blog">Blog</a></nav></header>
+<main class="container">
+{body}</main>
+<footer class="site-footer"><p>Copyright 2025</p><a href="/a">A</a><a href="/b">B</a><div class="social"></div></footer>
+</body>
+</html>"""
+    if minified:
+        html = "".join(line.strip() for line in html.splitlines())
+    return html
+
+
+def make_markdown(paragraphs, seed=SEED):
+    """Blog post content in the markdown-ish format the LLM returns."""
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(paragraphs):
+        kind = i % 6
+        if kind == 0:
+            blocks.append(f"## {' '.join(rng.choices(WORDS, k=4)).title()}")
+        elif kind == 3:
+            blocks.append("\n".join(f"- **{rng.choice(WORDS)}** {' '.join(rng.choices(WORDS, k=8))}" for _ in range(4)))
+        elif kind == 5:
+            blocks.append("\n".join(f"{n}. {' '.join(rng.choices(WORDS, k=6))}" for n in range(1, 4)))
+        else:
+            blocks.append(
+                f"{' '.join(rng.choices(WORDS, k=60))} see https://example.com/{rng.choice(WORDS)} "
+                f"and *{rng.choice(WORDS)}* with `{rng.choice(WORDS)}`."
+            )
+    return "\n\n".join(blocks)
+
+
+def make_style_analysis():
+    """A style analysis shaped like the merged analyzer + LLM output stored on Project."""
+    return {
+        "colors": {"primary": "#4f46e5", "secondary": "#0ea5e9", "background": "#ffffff", "text": "#111827", "accent": "#f59e0b"},
+        "typography": {"headingFont": "'Inter', sans-serif", "bodyFont": "Georgia, serif",
+                       "headingSizes": {"h1": "2.5rem", "h2": "2rem", "h3": "1.5rem"}, "bodySize": "1rem"},
+        "layout": {"containerWidth": "1100px", "spacing": "1.5rem", "headerStyle": "Header with logo and navigation menu",
+                   "footerStyle": "Standard footer with copyright and links"},
+        "components": {"buttonProperties": {"radius": "8px"}, "linkProperties": {}, "cardProperties": {}},
+        "business": {"name": "Benchmark Co", "industry": "Software", "audience": "Developers", "purpose": "Benchmarks"},
+    }
+
+
+def make_project(blog_template_html, post_template_html):
+    """A stand-in for a Project row with generated templates."""
+    return SimpleNamespace(
+        id=1, name="Benchmark Co", hosted_css_filename=None, hosted_js_filename=None,
+        blog_template_html=blog_template_html, post_template_html=post_template_html,
+    )
+
+
+def make_posts(count, seed=SEED):
+    """Stand-ins for BlogPost rows with formatted HTML fragments."""
+    from openai_service import format_blog_html
+
+    rng = random.Random(seed)
+    base_date = datetime(2025, 1, 1)
+    content = make_markdown(12, seed)
+    html_content = format_blog_html("Benchmark", content, make_style_analysis())
+    return [
+        SimpleNamespace(
+            id=i + 1,
+            title=" ".join(rng.choices(WORDS, k=6)).title(),
+            content=content,
+            meta_description=" ".join(rng.choices(WORDS, k=20))[:155],
+            html_content=html_content,
+            created_at=base_date + timedelta(hours=i),
+            updated_at=base_date + timedelta(hours=i),
+        )
+        for i in range(count)
+    ]
@@ -0,0 +1,84 @@
+"""
+Compare export archive size and CPU time across compression policies.
+
+Builds the export ZIP for a synthetic blog (distinct content per post)
+with each policy and reports archive size, ratio to the uncompressed
+(stored) archive, and CPU time to build it. Policies with .gz/.br
+siblings also report the size of the siblings alone, which is what a
+static host would serve instead of the raw files.
+
+Usage:
+    python benchmarks/export_compression.py [--posts 1000]
+"""
+import os
+import sys
+import io
+import time
+import zipfile
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+os.environ.setdefault("REPL_ID", "benchmark")
+
+import logging  # noqa: E402
+logging.disable(logging.CRITICAL)
+
+from corpora import make_posts, make_project, make_style_analysis, make_markdown  # noqa: E402
+from openai_service import format_blog_html  # noqa: E402
+from utils.html_generator import generate_blog_template, generate_post_template  # noqa: E402
+from utils.file_storage import create_download_package  # noqa: E402
+from utils.export_compression import brotli  # noqa: E402
+
+POLICIES = (
+    ("store", "store", None, ()),
+    ("deflate 1", "deflate", 1, ()),
+    ("deflate 6", "deflate", 6, ()),
+    ("deflate 9", "deflate", 9, ()),
+    ("zstd 3", "zstd", 3, ()),
+    ("zstd 19", "zstd", 19, ()),
+    ("deflate 6 + gz", "deflate", 6, ("gz",)),
+    ("deflate 6 + gz + br", "deflate", 6, ("gz", "br")),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    args = parser.parse_args()
+
+    analysis = make_style_analysis()
+    project = make_project(
+        generate_blog_template(analysis, "1_1.css", None),
+        generate_post_template(analysis, "1_1.css", None),
+    )
+    posts = make_posts(args.posts)
+    for post in posts:
+        post.content = make_markdown(12, seed=post.id)
+        post.html_content = format_blog_html(post.title, post.content, analysis)
+
+    if not hasattr(zipfile, "ZIP_ZSTANDARD"):
+        print("zstd needs Python 3.14+; the zstd rows fall back to deflate")
+    if brotli is None:
+        print("brotli is not installed; the br row adds no .br files")
+
+    print(f"{'policy':<22}{'archive KB':>12}{'ratio':>8}{'CPU ms':>10}{'siblings KB':>13}")
+    baseline = None
+    for label, compression, level, precompress in POLICIES:
+        start = time.process_time()
+        data = create_download_package(project, posts, compression=compression, level=level, precompress=precompress)
+        cpu_ms = (time.process_time() - start) * 1000
+        baseline = baseline or len(data)
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            siblings = sum(info.file_size for info in archive.infolist() if info.filename.endswith((".gz", ".br")))
+        print(f"{label:<22}{len(data) / 1024:>12.0f}{len(data) / baseline:>8.2f}{cpu_ms:>10.0f}"
+              f"{siblings / 1024 if siblings else 0:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure export build time against the number of export worker processes.
+
+Builds the export ZIP for a synthetic blog with precompressed siblings
+(the only part of an export the workers take on) with each worker count
+and reports wall time and speedup over building in one process. Every
+archive's entries are compared with the single-process archive, so a
+difference in content or order fails the run. Each pool is warmed up
+with one untimed export first, as a long-running web worker's would be.
+
+Usage:
+    python benchmarks/export_parallel.py [--posts 5000] [--workers 1,2,4,8] [--precompress gz,br]
+"""
+import os
+import sys
+import io
+import time
+import zipfile
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+os.environ.setdefault("REPL_ID", "benchmark")
+
+import logging  # noqa: E402
+logging.disable(logging.CRITICAL)
+
+from corpora import make_posts, make_project, make_style_analysis, make_markdown  # noqa: E402
+from openai_service import format_blog_html  # noqa: E402
+from utils.html_generator import generate_blog_template, generate_post_template  # noqa: E402
+from utils.file_storage import create_download_package  # noqa: E402
+from utils import export_engine  # noqa: E402
+
+
+def entries(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return [(info.filename, info.CRC, info.compress_size) for info in archive.infolist()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--precompress", default="gz,br")
+    args = parser.parse_args()
+
+    analysis = make_style_analysis()
+    project = make_project(
+        generate_blog_template(analysis, "1_1.css", None),
+        generate_post_template(analysis, "1_1.css", None),
+    )
+    posts = make_posts(args.posts)
+    precompress = tuple(encoding for encoding in args.precompress.split(",") if encoding)
+    for post in posts:
+        post.content = make_markdown(12, seed=post.id)
+        post.html_content = format_blog_html(post.title, post.content, analysis)
+
+    print(f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8}{'wall s':>10}{'speedup':>9}")
+    baseline = None
+    for workers in (int(count) for count in args.workers.split(",")):
+        export_engine.EXPORT_WORKERS = workers
+        if workers > 1:
+            create_download_package(project, posts[:export_engine.EXPORT_PARALLEL_MIN_POSTS], precompress=precompress)
+        start = time.perf_counter()
+        data = create_download_package(project, posts, precompress=precompress)
+        elapsed = time.perf_counter() - start
+        if export_engine._executor is not None:
+            export_engine._discard_executor(export_engine._executor)
+
+        if baseline is None:
+            baseline = (elapsed, entries(data))
+        elif entries(data) != baseline[1]:
+            sys.exit(f"Archive built with {workers} workers differs from the single-process one")
+        print(f"{workers:>8}{elapsed:>10.2f}{baseline[0] / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
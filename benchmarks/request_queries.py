@@ -0,0 +1,73 @@
+"""
+Count SQL queries and Set-Cookie headers per request for a logged-in user.
+
+Seeds a user, OAuth token and project in a temporary SQLite database (the
+same seed as loadtest/driver.py), then sends repeated requests through the
+Flask test client with the forged login session and reports the average
+number of queries and session cookie writes per request for each route.
+
+Usage:
+    python benchmarks/request_queries.py [--requests 20]
+"""
+import os
+import sys
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "loadtest"))
+
+_database_file = tempfile.NamedTemporaryFile(prefix="request_queries_", suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_file.name}"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+os.environ.setdefault("REPL_ID", "benchmark")
+
+import logging  # noqa: E402
+logging.disable(logging.CRITICAL)
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from driver import seed_database  # noqa: E402
+from main import app  # noqa: E402
+
+query_count = [0]
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    query_count[0] += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="requests per route")
+    args = parser.parse_args()
+
+    project_id, cookie = seed_database()
+    routes = {
+        "index": "/",
+        "dashboard": "/dashboard",
+        "project": f"/projects/{project_id}",
+    }
+
+    print(f"{'route':<12}{'status':>8}{'queries/req':>14}{'cookies/req':>14}")
+    try:
+        for name, path in routes.items():
+            client = app.test_client()
+            client.set_cookie(app.config["SESSION_COOKIE_NAME"], cookie)
+            # The first request may legitimately set the cookie; measure the steady state after it
+            client.get(path)
+            query_count[0] = 0
+            cookie_writes = 0
+            for _ in range(args.requests):
+                response = client.get(path)
+                cookie_writes += sum(1 for header in response.headers.getlist("Set-Cookie") if header.startswith("session="))
+            print(f"{name:<12}{response.status_code:>8}{query_count[0] / args.requests:>14.2f}{cookie_writes / args.requests:>14.2f}")
+    finally:
+        os.unlink(_database_file.name)
+
+
+if __name__ == "__main__":
+    main()
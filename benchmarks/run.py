@@ -0,0 +1,132 @@
+"""
+Run the micro-benchmark suite and write the results to JSON.
+
+Each benchmarks/bench_*.py module defines a ``benchmarks()`` generator that
+yields ``(name, callable)`` pairs. Every callable is timed repeatedly and the
+median, minimum and mean are recorded.
+
+Usage:
+    python benchmarks/run.py [--output results.json] [--filter analyzer]
+    python benchmarks/run.py --compare baseline.json --threshold 0.25
+
+With --compare, the run fails (exit status 1) when any benchmark's median is
+more than --threshold (a fraction) slower than in the baseline file.
+"""
+import os
+import sys
+import json
+import time
+import glob
+import argparse
+import platform
+import importlib
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The app module needs these at import time; benchmarks never touch the network or a real DB
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SESSION_SECRET", "benchmark")
+os.environ.setdefault("REPL_ID", "benchmark")
+
+import logging  # noqa: E402
+logging.disable(logging.CRITICAL)
+
+MIN_REPEATS = 3
+MAX_REPEATS = 50
+MIN_TOTAL_SECONDS = 1.0
+
+
+def time_callable(func):
+    """Time a callable repeatedly; returns a list of durations in seconds."""
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < MAX_REPEATS:
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+        if len(durations) >= MIN_REPEATS and time.perf_counter() - started >= MIN_TOTAL_SECONDS:
+            break
+    return durations
+
+
+def discover(filter_text=None):
+    """Yield (name, callable) pairs from every bench_*.py module."""
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_*.py"))):
+        module = importlib.import_module(os.path.splitext(os.path.basename(path))[0])
+        for name, func in module.benchmarks():
+            if not filter_text or filter_text in name:
+                yield name, func
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (name, baseline_median, median, ratio) for regressions beyond threshold."""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = result["median_s"] / previous["median_s"] if previous["median_s"] else 1.0
+        if ratio > 1 + threshold:
+            regressions.append((name, previous["median_s"], result["median_s"], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_output.json", help="where to write the JSON results")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown as a fraction (default 0.25)")
+    args = parser.parse_args()
+
+    results = {}
+    for name, func in discover(args.filter):
+        durations = time_callable(func)
+        results[name] = {
+            "median_s": statistics.median(durations),
+            "min_s": min(durations),
+            "mean_s": statistics.fmean(durations),
+            "repeats": len(durations),
+        }
+        print(f"{name:60s} median {results[name]['median_s'] * 1000:10.3f} ms  ({len(durations)} runs)")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": git_commit(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({(ratio - 1) * 100:.0f}% slower)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold * 100:.0f}% against {args.compare}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
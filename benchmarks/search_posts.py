@@ -0,0 +1,130 @@
+"""
+Benchmark blog post search against a large synthetic corpus.
+
+Seeds --posts synthetic posts (1M by default) spread over a few projects of
+one user, installs the full-text index as migrate.py does, then times
+search_posts() for a rare term, a common term, a multi-word query and a
+deep results page, next to the unindexed LIKE scan for the same terms.
+
+Uses a temporary SQLite database (FTS5) unless --database-url is given;
+point it at an empty Postgres database to measure the tsvector/GIN path.
+
+Usage:
+    python benchmarks/search_posts.py [--posts 1000000] [--database-url postgresql://...]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+USER_ID = "search-benchmark"
+RARE_TERM = "quokka"
+COMMON_TERM = "marketing"
+
+# A small Zipf-like vocabulary: the first words are far more frequent than the last
+VOCABULARY = [COMMON_TERM, "content", "website", "customers", "business", "guide", "design", "strategy",
+              "growth", "search", "brand", "social", "local", "tips", "product", "service", "email",
+              "analytics", "conversion", "pricing"] + [f"term{i}" for i in range(5000)]
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+
+def synthetic_post(rng, project_ids):
+    """One post row; roughly 1 in 10,000 posts mentions the rare term."""
+    words = rng.choices(VOCABULARY, weights=WEIGHTS, k=80)
+    if rng.random() < 0.0001:
+        words[rng.randrange(len(words))] = RARE_TERM
+    return {
+        "title": " ".join(rng.choices(VOCABULARY, weights=WEIGHTS, k=6)).capitalize(),
+        "meta_description": " ".join(words[:20]),
+        "content": " ".join(words),
+        "project_id": rng.choice(project_ids),
+    }
+
+
+def seed(db, total, batch_size=10000):
+    """Create the schema and insert the user, projects and posts in batches."""
+    from models import User, Project, BlogPost
+
+    db.create_all()
+    db.session.add(User(id=USER_ID, email="search-benchmark@example.com"))
+    projects = [Project(name=f"Search Project {i}", user_id=USER_ID) for i in range(10)]
+    db.session.add_all(projects)
+    db.session.commit()
+    project_ids = [project.id for project in projects]
+
+    rng = random.Random(42)
+    with db.engine.begin() as connection:
+        for start in range(0, total, batch_size):
+            rows = [synthetic_post(rng, project_ids) for _ in range(min(batch_size, total - start))]
+            connection.execute(BlogPost.__table__.insert(), rows)
+
+
+def timed(function, runs):
+    """Run function runs times; return (median milliseconds, last result)."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    database_file = None
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        database_file = tempfile.NamedTemporaryFile(prefix="search_posts_", suffix=".db", delete=False)
+        os.environ["DATABASE_URL"] = f"sqlite:///{database_file.name}"
+    os.environ.setdefault("SESSION_SECRET", "benchmark")
+
+    import logging
+    logging.disable(logging.CRITICAL)
+    from app import app, db
+    from utils.post_search import install_search_index, search_posts, _like_search
+
+    try:
+        with app.app_context():
+            start = time.perf_counter()
+            seed(db, args.posts)
+            seeded = time.perf_counter()
+            with db.engine.begin() as connection:
+                install_search_index(connection)
+            indexed = time.perf_counter()
+            print(f"Seeded {args.posts} posts in {seeded - start:.1f}s, "
+                  f"built the {db.engine.dialect.name} search index in {indexed - seeded:.1f}s")
+
+            queries = (
+                ("rare term", RARE_TERM, 1),
+                ("common term", COMMON_TERM, 1),
+                ("multi-word", "local business growth", 1),
+                ("deep page (50)", COMMON_TERM, 50),
+            )
+            print(f"{'query':<18}{'results':>9}{'next':>6}{'indexed ms':>12}{'LIKE ms':>10}")
+            with db.engine.connect() as connection:
+                for label, query, page in queries:
+                    indexed_ms, (results, has_next) = timed(
+                        lambda: search_posts(connection, USER_ID, query, page=page), args.runs)
+                    # The LIKE scan only handles a single phrase, so compare it on the first word
+                    like_ms, _ = timed(lambda: _like_search(
+                        connection, USER_ID, query.split()[0], 21, (page - 1) * 20), 1)
+                    print(f"{label:<18}{len(results):>9}{'yes' if has_next else 'no':>6}{indexed_ms:>12.1f}{like_ms:>10.1f}")
+    finally:
+        if database_file is not None:
+            os.unlink(database_file.name)
+
+
+if __name__ == "__main__":
+    main()
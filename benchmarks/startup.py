@@ -0,0 +1,76 @@
+"""
+Measure worker cold-start cost: import time of main.py and time to the first request.
+
+Each sample runs in a fresh interpreter, as a new autoscale instance or
+gunicorn worker would. The report also lists which heavy third-party
+modules were loaded by startup, so lazy imports can be checked.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--database-url postgresql://...]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("openai", "httpx", "bs4", "tinycss2", "tiktoken")
+
+# Runs in the child interpreter; prints one JSON line
+PROBE = f"""
+import sys, json, time, logging
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+logging.disable(logging.CRITICAL)
+response = main.app.test_client().get("/")
+first_request = time.perf_counter()
+print(json.dumps({{
+    "import_seconds": imported - start,
+    "first_request_seconds": first_request - imported,
+    "status": response.status_code,
+    "heavy_modules": sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules),
+}}))
+"""
+
+
+def sample(env):
+    """Start a fresh interpreter, import the app, serve one request and return its timings."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", default="sqlite://")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark")
+    env.setdefault("SESSION_SECRET", "benchmark")
+    env.setdefault("REPL_ID", "benchmark")
+    env["DATABASE_URL"] = args.database_url
+
+    # Warm the filesystem and bytecode caches so every run measures the same thing
+    sample(env)
+    samples = [sample(env) for _ in range(args.runs)]
+
+    import_ms = [s["import_seconds"] * 1000 for s in samples]
+    first_ms = [s["first_request_seconds"] * 1000 for s in samples]
+    total_ms = [i + f for i, f in zip(import_ms, first_ms)]
+
+    print(f"{'':<22}{'median ms':>10}{'min ms':>10}")
+    for label, values in (("import main", import_ms), ("first request", first_ms), ("total", total_ms)):
+        print(f"{label:<22}{statistics.median(values):>10.1f}{min(values):>10.1f}")
+    print(f"First response status: {samples[0]['status']}")
+    print(f"Heavy modules loaded at startup: {', '.join(samples[0]['heavy_modules']) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
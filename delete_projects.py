@@ -1,20 +1,55 @@
+"""
+Delete projects with their blog posts and files.
 
-from app import app, db
-from models import Project
-
-# Use application context
-with app.app_context():
-    # Get all projects
-    projects = Project.query.all()
-    
-    # Count projects
-    project_count = len(projects)
-    
-    # Delete all projects (cascade will automatically delete related blog posts)
-    for project in projects:
-        db.session.delete(project)
-    
-    # Commit the changes
-    db.session.commit()
-    
-    print(f"Successfully deleted {project_count} projects and their related blog posts.")
+    python delete_projects.py --project 12 --project 15
+    python delete_projects.py --user <user_id> [--older-than 90]
+    python delete_projects.py --older-than 365 --dry-run
+    python delete_projects.py --all
+
+Filters combine: a project is deleted only if it matches all of them.
+Projects are deleted in chunks, each in its own transaction, with their
+posts, uploaded HTML/CSS files and hosted CSS/JS files; an interrupted run
+can simply be repeated. --dry-run only counts what would be deleted.
+"""
+import sys
+import argparse
+from app import app
+from utils.project_deletion import DELETE_CHUNK_SIZE, project_filter, count_matching, delete_projects
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", dest="project_ids", type=int, action="append", help="a project id; repeatable")
+    parser.add_argument("--user", dest="user_id", help="only this user's projects")
+    parser.add_argument("--older-than", type=int, metavar="DAYS", help="only projects created more than DAYS days ago")
+    parser.add_argument("--all", action="store_true", help="delete every project")
+    parser.add_argument("--chunk-size", type=int, default=DELETE_CHUNK_SIZE, help="projects per transaction")
+    parser.add_argument("--keep-files", action="store_true", help="leave uploaded and hosted files in place")
+    parser.add_argument("--dry-run", action="store_true", help="count matching projects and posts; delete nothing")
+    args = parser.parse_args()
+
+    if not (args.all or args.project_ids or args.user_id or args.older_than is not None):
+        parser.error("give --project, --user or --older-than, or --all to delete every project")
+
+    with app.app_context():
+        condition = project_filter(args.project_ids, args.user_id, args.older_than)
+        project_count, post_count = count_matching(condition)
+        if args.dry_run or not project_count:
+            print(f"{project_count} projects and {post_count} blog posts match"
+                  f"{'; nothing deleted (dry run)' if args.dry_run else ''}.")
+            return
+
+        def report(progress):
+            rate = progress.seconds or 1e-9
+            print(f"Deleted {progress.projects}/{project_count} projects, {progress.posts}/{post_count} posts, "
+                  f"{progress.files} files ({progress.projects / rate:.0f} projects/s, "
+                  f"{progress.posts / rate:.0f} posts/s)", file=sys.stderr)
+
+        result = delete_projects(condition, chunk_size=args.chunk_size, remove_files=not args.keep_files,
+                                 progress=report)
+        print(f"Successfully deleted {result.projects} projects, {result.posts} blog posts and {result.files} files "
+              f"in {result.seconds:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Delete uploaded and hosted files that no project refers to.
+
+    python gc_files.py --dry-run
+    python gc_files.py [--grace-hours 24] [--max-rate 200]
+
+Files in the uploads, cssstyles and scripts folders of blob storage (local
+directories or the S3 bucket) that no project's html_file_path,
+css_file_path, hosted_css_filename or hosted_js_filename points at are
+deleted once they are older than the grace period (GC_GRACE_PERIOD seconds,
+24 hours by default), so uploads still being analyzed are left alone. Safe
+to run from cron alongside the app.
+"""
+import argparse
+from app import app
+from utils.file_gc import GC_GRACE_PERIOD, collect_garbage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE_PERIOD / 3600,
+                        help="keep unreferenced files modified within this many hours")
+    parser.add_argument("--max-rate", type=float, help="maximum files deleted per second")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be deleted; delete nothing")
+    args = parser.parse_args()
+
+    with app.app_context():
+        result = collect_garbage(grace_period=args.grace_hours * 3600, dry_run=args.dry_run, max_rate=args.max_rate)
+    print(f"{result.scanned} files scanned: {result.referenced} referenced, {result.recent} within the grace period, "
+          f"{result.deleted} {'would be ' if args.dry_run else ''}deleted ({result.freed_bytes / 1024:.0f} KB) "
+          f"in {result.seconds:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+End-to-end load test: the real gunicorn app against the fake OpenAI server.
+
+Starts loadtest/fake_openai.py in-process, seeds a user, OAuth token and
+project, starts gunicorn on main:app with OPENAI_BASE_URL pointing at the
+fake server, then drives a weighted mix of routes from concurrent clients
+with a forged login session. Reports requests/s, p50/p95/p99 latency per
+route and worker saturation (busy time / available worker time).
+
+Usage:
+    python loadtest/driver.py --duration 30 --concurrency 16 --workers 4 \\
+        --mix dashboard=4,project=3,create_post=2,upload=1,export=1 \\
+        --latency lognormal:0.0,0.5 --rate-429 0.02
+"""
+import os
+import sys
+import time
+import glob
+import random
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from collections import defaultdict
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_openai import make_server  # noqa: E402
+
+SESSION_SECRET = "loadtest-secret"
+USER_ID = "loadtest-user"
+BROWSER_SESSION_KEY = "loadtest-browser-session"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_database():
+    """Create the load-test user, OAuth token and project; return (project_id, session_cookie)."""
+    from app import app, db
+    from models import User, OAuth, Project
+    from migrate import migrate
+
+    migrate()
+    with app.app_context():
+        db.session.merge(User(id=USER_ID, email="loadtest@example.com", first_name="Load"))
+        db.session.query(OAuth).filter_by(user_id=USER_ID, browser_session_key=BROWSER_SESSION_KEY).delete()
+        oauth = OAuth(provider="replit_auth", user_id=USER_ID, browser_session_key=BROWSER_SESSION_KEY)
+        oauth.token = {"access_token": "fake", "token_type": "Bearer", "expires_in": 86400, "expires_at": time.time() + 86400}
+        db.session.add(oauth)
+        project = Project(name="Load Test Project", user_id=USER_ID, website_purpose="Load testing")
+        db.session.add(project)
+        db.session.commit()
+        project_id = project.id
+
+        serializer = app.session_interface.get_signing_serializer(app)
+        cookie = serializer.dumps({
+            "_user_id": USER_ID,
+            "_fresh": True,
+            "_browser_session_key": BROWSER_SESSION_KEY,
+            "_permanent": True,
+        })
+
+    return project_id, cookie
+
+
+def start_gunicorn(port, workers, threads, env):
+    process = subprocess.Popen(
+        ["gunicorn", "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--threads", str(threads),
+         "--timeout", "120", "--log-level", "warning", "main:app"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/", timeout=5)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start within 30 seconds")
+
+
+def make_routes(base_url, project_id, upload_pair):
+    """Return route name -> function(session) performing one request."""
+    html_path, css_path = upload_pair
+
+    def upload(session):
+        with open(html_path, "rb") as html_file, open(css_path, "rb") as css_file:
+            return session.post(
+                f"{base_url}/projects/{project_id}/upload",
+                data={"website_purpose": "Load testing"},
+                files={"html_file": ("index.html", html_file), "css_file": ("index.css", css_file)},
+                allow_redirects=False,
+            )
+
+    return {
+        "dashboard": lambda session: session.get(f"{base_url}/dashboard", allow_redirects=False),
+        "project": lambda session: session.get(f"{base_url}/projects/{project_id}", allow_redirects=False),
+        "create_post": lambda session: session.post(
+            f"{base_url}/projects/{project_id}/posts/new",
+            data={"topic_input": f"Load test topic {random.randint(1, 10**6)}"},
+            allow_redirects=False,
+        ),
+        "upload": upload,
+        "export": lambda session: session.get(f"{base_url}/projects/{project_id}/export", allow_redirects=False),
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def run_load(routes, mix, cookie, concurrency, duration):
+    """Drive the routes from concurrent clients; returns {route: [(latency, status), ...]}."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def client():
+        session = requests.Session()
+        session.cookies.set("session", cookie)
+        while time.time() < deadline:
+            name = random.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = routes[name](session).status_code
+            except requests.RequestException:
+                status = 0
+            with lock:
+                results[name].append((time.perf_counter() - start, status))
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def report(results, duration, worker_slots):
+    total = sum(len(samples) for samples in results.values())
+    busy = sum(latency for samples in results.values() for latency, _ in samples)
+    print(f"\n{'route':12s} {'count':>7s} {'req/s':>8s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'errors':>7s}")
+    for name, samples in sorted(results.items()):
+        latencies = [latency for latency, _ in samples]
+        errors = sum(1 for _, status in samples if status == 0 or status >= 400)
+        print(
+            f"{name:12s} {len(samples):7d} {len(samples) / duration:8.2f} "
+            f"{percentile(latencies, 0.50) * 1000:9.1f} {percentile(latencies, 0.95) * 1000:9.1f} "
+            f"{percentile(latencies, 0.99) * 1000:9.1f} {errors:7d}"
+        )
+    print(f"\nTotal: {total} requests, {total / duration:.2f} req/s")
+    # Little's law: average requests in the server divided by the slots available to serve them
+    print(f"Worker saturation: {min(busy / (duration * worker_slots), 1.0) * 100:.0f}% of {worker_slots} worker slots")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--mix", default="dashboard=4,project=3,create_post=2,upload=1,export=1")
+    parser.add_argument("--latency", default="lognormal:-0.7,0.5", help="fake OpenAI latency distribution")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file; use Postgres for realistic numbers")
+    args = parser.parse_args()
+
+    fake = make_server(port=free_port(), latency=args.latency, rate_429=args.rate_429, rate_500=args.rate_500)
+    threading.Thread(target=fake.serve_forever, daemon=True).start()
+    fake_url = f"http://127.0.0.1:{fake.server_address[1]}/v1"
+
+    database_url = args.database_url or f"sqlite:///{tempfile.mkdtemp(prefix='loadtest_')}/loadtest.db"
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": database_url,
+        "SESSION_SECRET": SESSION_SECRET,
+        "REPL_ID": env.get("REPL_ID", "loadtest"),
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": fake_url,
+    })
+    os.environ.update(env)
+
+    project_id, cookie = seed_database()
+    upload_pair = (
+        sorted(glob.glob(os.path.join(ROOT, "uploads", "*.html")))[0],
+        sorted(glob.glob(os.path.join(ROOT, "uploads", "*.css")))[0],
+    )
+
+    port = free_port()
+    gunicorn = start_gunicorn(port, args.workers, args.threads, env)
+    try:
+        routes = make_routes(f"http://127.0.0.1:{port}", project_id, upload_pair)
+        mix = parse_mix(args.mix)
+        unknown = set(mix) - set(routes)
+        if unknown:
+            parser.error(f"unknown routes in --mix: {', '.join(sorted(unknown))}")
+
+        print(f"Driving {args.concurrency} clients for {args.duration:.0f}s against {args.workers}x{args.threads} gunicorn workers")
+        results = run_load(routes, mix, cookie, args.concurrency, args.duration)
+        report(results, args.duration, args.workers * args.threads)
+        stats = fake.config.stats
+        print(f"Fake OpenAI: {stats.requests} requests, injected errors {stats.errors or 'none'}")
+    finally:
+        gunicorn.terminate()
+        gunicorn.wait(timeout=10)
+        fake.shutdown()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
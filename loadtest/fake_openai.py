@@ -0,0 +1,208 @@
+"""
+A local stand-in for the OpenAI chat completions API.
+
+Serves POST /v1/chat/completions with configurable latency, optional token
+streaming and injected 429/500 errors, so load tests can exercise the real
+app without spending money. Point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1.
+
+Usage:
+    python loadtest/fake_openai.py --port 8765 --latency lognormal:0.0,0.5 \\
+        --rate-429 0.02 --rate-500 0.01
+"""
+import sys
+import json
+import math
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS_JSON = {
+    "colors": {"primary": "#4f46e5", "secondary": "#0ea5e9", "background": "#ffffff", "text": "#111827", "accent": "#f59e0b"},
+    "typography": {"headingFont": "Inter, sans-serif", "bodyFont": "Inter, sans-serif",
+                   "headingSizes": {"h1": "2.5rem", "h2": "2rem", "h3": "1.5rem"}, "bodySize": "1rem"},
+    "layout": {"containerWidth": "1100px", "spacing": "1.5rem", "headerStyle": "Header with navigation", "footerStyle": "Simple footer"},
+    "components": {"buttonStyle": "Rounded buttons", "linkStyle": "Underlined links", "cardStyle": "Bordered cards"},
+    "business": {"name": "Load Test Co", "industry": "Software", "audience": "Developers", "purpose": "Load testing"},
+}
+
+FILLER = (
+    "Load testing keeps capacity planning honest. This paragraph stands in for generated blog content "
+    "so that formatting, persistence and export see realistic sizes."
+)
+
+
+def parse_latency(spec):
+    """
+    Parse a latency distribution spec into a sampling function returning seconds.
+
+    Supported: fixed:S, uniform:LOW,HIGH, normal:MEAN,STDDEV, lognormal:MU,SIGMA
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(value) for value in params.split(",") if value]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(random.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(values[0], values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def estimate_tokens(text):
+    return max(1, math.ceil(len(text) / 4))
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # set by make_server
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        self.config.stats.record_request()
+
+        roll = random.random()
+        if roll < self.config.rate_429:
+            self.config.stats.record_error(429)
+            self._send_json(429, {"error": {"message": "Rate limit reached (injected)", "type": "rate_limit_error"}},
+                            {"retry-after": "1"})
+            return
+        if roll < self.config.rate_429 + self.config.rate_500:
+            self.config.stats.record_error(500)
+            self._send_json(500, {"error": {"message": "Internal error (injected)", "type": "server_error"}})
+            return
+
+        content = self._completion_text(request)
+        prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in request.get("messages", []))
+        completion_tokens = estimate_tokens(content)
+        latency = self.config.latency()
+
+        if request.get("stream"):
+            self._stream(request, content, latency)
+        else:
+            time.sleep(latency)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake-model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens},
+            }, {"openai-processing-ms": str(int(latency * 1000))})
+
+    def _completion_text(self, request):
+        if (request.get("response_format") or {}).get("type") == "json_object":
+            return json.dumps(ANALYSIS_JSON)
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+        if max_tokens and max_tokens <= 100:
+            return "A Fake But Plausible Blog Title For Load Testing Purposes Only"[: max_tokens * 4]
+        return "\n\n".join(["## Introduction", FILLER * 3, "## Details", FILLER * 4, "## Conclusion", FILLER * 2])
+
+    def _stream(self, request, content, latency):
+        """Send the completion as server-sent events, spreading the latency across chunks."""
+        words = content.split(" ")
+        chunk_delay = latency / max(len(words), 1)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        for index, word in enumerate(words):
+            time.sleep(chunk_delay)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake-model"),
+                "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class ServerStats:
+    """Thread-safe request/error counters for the fake server."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = {}
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_error(self, status):
+        with self._lock:
+            self.errors[status] = self.errors.get(status, 0) + 1
+
+
+def make_server(host="127.0.0.1", port=8765, latency="fixed:0.5", rate_429=0.0, rate_500=0.0, verbose=False):
+    """
+    Build (but don't start) a fake OpenAI server.
+
+    Returns:
+        A ThreadingHTTPServer; its handler config is available as server.config
+    """
+    config = argparse.Namespace(
+        latency=parse_latency(latency), rate_429=rate_429, rate_500=rate_500, verbose=verbose, stats=ServerStats()
+    )
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.5", help="fixed:S | uniform:LOW,HIGH | normal:MEAN,SD | lognormal:MU,SIGMA")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.rate_429, args.rate_500, args.verbose)
+    print(f"Fake OpenAI listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
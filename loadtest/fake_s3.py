@@ -0,0 +1,202 @@
+"""
+A local stand-in for an S3-compatible object store (MinIO-style, path-style URLs).
+
+Serves GET/HEAD/PUT/DELETE on /<bucket>/<key>, conditional GETs with
+If-None-Match, and ListObjectsV2 (GET /<bucket>?list-type=2&prefix=...)
+with continuation tokens, keeping objects in memory. Requests must carry
+an AWS4-HMAC-SHA256 Authorization header, but signatures are not checked.
+Point the app at it with:
+
+    STORAGE_BACKEND=s3 S3_BUCKET=blobs S3_ENDPOINT_URL=http://127.0.0.1:9900
+
+Usage:
+    python loadtest/fake_s3.py --port 9900 [--latency 0.02] [--page-size 1000]
+"""
+import sys
+import time
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from urllib.parse import urlsplit, parse_qs, unquote
+from xml.sax.saxutils import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ObjectStore:
+    """Thread-safe in-memory buckets: {bucket: {key: (data, etag, modified)}}."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = {}
+        self.requests = {}
+
+    def record(self, method):
+        with self._lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def put(self, bucket, key, data):
+        etag = hashlib.md5(data).hexdigest()
+        with self._lock:
+            self.buckets.setdefault(bucket, {})[key] = (data, etag, datetime.now(timezone.utc))
+        return etag
+
+    def get(self, bucket, key):
+        with self._lock:
+            return self.buckets.get(bucket, {}).get(key)
+
+    def delete(self, bucket, key):
+        with self._lock:
+            self.buckets.get(bucket, {}).pop(key, None)
+
+    def list(self, bucket, prefix, start_after, limit):
+        with self._lock:
+            keys = sorted(key for key in self.buckets.get(bucket, {}) if key.startswith(prefix) and key > start_after)
+            return [(key, self.buckets[bucket][key]) for key in keys[:limit + 1]]
+
+
+class FakeS3Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None  # set by make_server
+
+    def log_message(self, format, *args):
+        if self.config.verbose:
+            super().log_message(format, *args)
+
+    def _parse(self):
+        url = urlsplit(self.path)
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        return bucket, key, {name: values[0] for name, values in parse_qs(url.query).items()}
+
+    def _send(self, status, body=b"", headers=None, content_type="application/xml"):
+        self.send_response(status)
+        if body or status == 200:
+            self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status, code):
+        self._send(status, f"<Error><Code>{code}</Code></Error>".encode("utf-8"))
+
+    def _start(self):
+        self.config.store.record(self.command)
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if not self.headers.get("Authorization", "").startswith("AWS4-HMAC-SHA256 "):
+            self._error(403, "AccessDenied")
+            return None
+        return self._parse()
+
+    def do_PUT(self):
+        parsed = self._start()
+        if parsed is None:
+            return
+        bucket, key, _ = parsed
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        etag = self.config.store.put(bucket, key, data)
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def do_GET(self):
+        parsed = self._start()
+        if parsed is None:
+            return
+        bucket, key, query = parsed
+        if not key:
+            self._list(bucket, query)
+            return
+        found = self.config.store.get(bucket, key)
+        if found is None:
+            self._error(404, "NoSuchKey")
+            return
+        data, etag, modified = found
+        headers = {"ETag": f'"{etag}"', "Last-Modified": format_datetime(modified, usegmt=True)}
+        if self.headers.get("If-None-Match", "").strip('"') == etag:
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        self._send(200, data, headers, "application/octet-stream")
+
+    def do_HEAD(self):
+        parsed = self._start()
+        if parsed is None:
+            return
+        bucket, key, _ = parsed
+        found = self.config.store.get(bucket, key)
+        if found is None:
+            self._error(404, "NoSuchKey")
+            return
+        data, etag, modified = found
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", f'"{etag}"')
+        self.send_header("Last-Modified", format_datetime(modified, usegmt=True))
+        self.end_headers()
+
+    def do_DELETE(self):
+        parsed = self._start()
+        if parsed is None:
+            return
+        bucket, key, _ = parsed
+        self.config.store.delete(bucket, key)
+        self._send(204)
+
+    def _list(self, bucket, query):
+        limit = min(int(query.get("max-keys", self.config.page_size)), self.config.page_size)
+        items = self.config.store.list(bucket, query.get("prefix", ""), query.get("continuation-token", ""), limit)
+        truncated = len(items) > limit
+        items = items[:limit]
+        contents = "".join(
+            f"<Contents><Key>{escape(key)}</Key><LastModified>{modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')}</LastModified>"
+            f"<ETag>&quot;{etag}&quot;</ETag><Size>{len(data)}</Size></Contents>"
+            for key, (data, etag, modified) in items
+        )
+        token = f"<NextContinuationToken>{escape(items[-1][0])}</NextContinuationToken>" if truncated else ""
+        body = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<ListBucketResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/"><Name>{escape(bucket)}</Name>'
+                f'<KeyCount>{len(items)}</KeyCount><IsTruncated>{"true" if truncated else "false"}</IsTruncated>'
+                f'{token}{contents}</ListBucketResult>')
+        self._send(200, body.encode("utf-8"))
+
+
+def make_server(host="127.0.0.1", port=9900, latency=0.0, page_size=1000, verbose=False):
+    """
+    Build (but don't start) a fake S3 server.
+
+    Returns:
+        A ThreadingHTTPServer; its objects and request counts are in server.config.store
+    """
+    config = argparse.Namespace(latency=latency, page_size=page_size, verbose=verbose, store=ObjectStore())
+    handler = type("ConfiguredFakeS3Handler", (FakeS3Handler,), {"config": config})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.config = config
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9900)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--page-size", type=int, default=1000, help="keys per ListObjectsV2 page")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.latency, args.page_size, args.verbose)
+    print(f"Fake S3 listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
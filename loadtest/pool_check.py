@@ -0,0 +1,148 @@
+"""
+Check that concurrent generations do not hold database connections.
+
+Runs create_post, edit_post and upload requests concurrently through the
+Flask test client against the fake OpenAI server, with a slow fixed
+latency, and samples how many pooled connections are checked out while
+the generations wait on the API. The check fails (exit status 1) if any
+connection is held during that wait, or if a dashboard load made during
+the generations fails or is slower than --dashboard-budget.
+
+Usage:
+    python loadtest/pool_check.py [--concurrency 12] [--latency fixed:1.0]
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+_database_file = tempfile.NamedTemporaryFile(prefix="pool_check_", suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_file.name}"
+os.environ.setdefault("OPENAI_API_KEY", "pool-check")
+os.environ.setdefault("SESSION_SECRET", "pool-check")
+os.environ.setdefault("REPL_ID", "pool-check")
+
+import logging  # noqa: E402
+logging.disable(logging.CRITICAL)
+
+from sqlalchemy import event  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+from fake_openai import make_server  # noqa: E402
+from driver import seed_database  # noqa: E402
+from main import app  # noqa: E402
+from app import db  # noqa: E402
+from models import BlogPost  # noqa: E402
+import openai_service  # noqa: E402
+
+
+class CheckoutTracker:
+    """Tracks current and peak checked-out connections through pool events."""
+
+    def __init__(self, engine):
+        self._lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def _checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.current -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=12, help="concurrent generations")
+    parser.add_argument("--latency", default="fixed:1.0", help="fake OpenAI latency per call")
+    parser.add_argument("--dashboard-budget", type=float, default=1.0, help="max seconds for a dashboard load")
+    args = parser.parse_args()
+
+    server = make_server(port=0, latency=args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    openai_service.async_openai = AsyncOpenAI(api_key="pool-check", base_url=f"http://127.0.0.1:{server.server_address[1]}/v1")
+
+    project_id, cookie = seed_database()
+    with app.app_context():
+        post = BlogPost(title="Pool check", content="Body", project_id=project_id)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        engine = db.engine
+    pool_size = engine.pool.size()
+    tracker = CheckoutTracker(engine)
+
+    html = b"<html><head><title>Pool check</title></head><body><h1>Hello</h1></body></html>"
+    css = b"body { color: #333; } h1 { color: #4f46e5; }"
+    requests_by_kind = {
+        "create_post": lambda client: client.post(f"/projects/{project_id}/posts/new", data={"topic_input": "Pools"}),
+        "edit_post": lambda client: client.post(f"/posts/{post_id}/edit", data={"title": "Pool check", "content": "Body"}),
+        "upload": lambda client: client.post(f"/projects/{project_id}/upload", data={
+            "website_purpose": "Pool check",
+            "html_file": (io.BytesIO(html), "index.html"),
+            "css_file": (io.BytesIO(css), "index.css"),
+        }),
+    }
+    kinds = list(requests_by_kind)
+    failures = []
+
+    def generate(index):
+        client = app.test_client()
+        client.set_cookie(app.config["SESSION_COOKIE_NAME"], cookie)
+        kind = kinds[index % len(kinds)]
+        response = requests_by_kind[kind](client)
+        if response.status_code != 302:
+            failures.append(f"{kind} returned {response.status_code}")
+
+    threads = [threading.Thread(target=generate, args=(i,)) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    # Sample the pool while the generations are waiting on the fake API
+    time.sleep(0.3)
+    held_while_waiting = 0
+    sample_until = time.perf_counter() + 0.3
+    while time.perf_counter() < sample_until:
+        held_while_waiting = max(held_while_waiting, tracker.current)
+        time.sleep(0.01)
+
+    # Then load the dashboard
+    client = app.test_client()
+    client.set_cookie(app.config["SESSION_COOKIE_NAME"], cookie)
+    dashboard_start = time.perf_counter()
+    dashboard = client.get("/dashboard")
+    dashboard_seconds = time.perf_counter() - dashboard_start
+
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    os.unlink(_database_file.name)
+
+    print(f"{args.concurrency} concurrent generations finished in {elapsed:.1f}s")
+    print(f"Pool size {pool_size}, peak connections checked out {tracker.peak}, "
+          f"held while waiting on the API {held_while_waiting}")
+    print(f"Dashboard during generation: {dashboard.status_code} in {dashboard_seconds * 1000:.0f}ms")
+    for failure in failures:
+        print(f"FAILED: {failure}")
+
+    ok = not failures and held_while_waiting == 0 and dashboard.status_code == 200 \
+        and dashboard_seconds <= args.dashboard_budget
+    print("OK" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Check the blob storage backends against the same contract.
+
+Runs a sequence of writes, streamed reads, stats, listings and deletes
+against the local-disk backend (in a temporary directory) and against the
+S3 backend pointed at loadtest/fake_s3.py, through the read-through cache.
+Two S3 "instances" with separate caches check that a write on one is seen
+by the other once the cache TTL has passed, and the fake server's request
+counts show what the cache saved. A flat local folder from before sharding
+is checked to stay readable and then moved into shard directories. Exits with status 1 on the first failed
+check.
+
+Usage:
+    python loadtest/storage_check.py [--size 5000000] [--files 20000] [--ttl 0.5]
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_s3 import make_server  # noqa: E402
+from utils.blob_storage import LocalStorage, S3Storage, ReadThroughCache  # noqa: E402
+
+
+def check(condition, message):
+    if not condition:
+        print(f"FAIL: {message}")
+        sys.exit(1)
+
+
+def check_contract(name, storage, size):
+    """Exercise one backend; returns seconds taken."""
+    start = time.perf_counter()
+    big = os.urandom(size)
+    with storage.create("uploads/big.bin") as output:
+        for offset in range(0, size, 100_000):
+            output.write(big[offset:offset + 100_000])
+    with storage.open("uploads/big.bin") as stream:
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: stream.read(65536), b""):
+            digest.update(chunk)
+    check(digest.digest() == hashlib.sha256(big).digest(), f"{name}: streamed read differs from what was written")
+
+    storage.write_text("cssstyles/1_1.css", "body { color: red; }")
+    check(storage.read_text("cssstyles/1_1.css") == "body { color: red; }", f"{name}: text round trip")
+    info = storage.stat("cssstyles/1_1.css")
+    check(info.size == 20 and info.etag, f"{name}: stat {info}")
+    storage.write_text("cssstyles/1_1.css", "body { color: blue; }")
+    check(storage.read_text("cssstyles/1_1.css") == "body { color: blue; }", f"{name}: overwrite not read back")
+
+    with storage.local_copy("cssstyles/1_1.css") as path:
+        with open(path, encoding="utf-8") as local_file:
+            check(local_file.read() == "body { color: blue; }", f"{name}: local copy")
+
+    for index in range(25):
+        storage.write_text(f"scripts/{index}.js", "//")
+    listed = sorted(blob.key for blob in storage.iter_blobs("scripts"))
+    check(listed == sorted(f"scripts/{index}.js" for index in range(25)), f"{name}: listing {listed[:3]}...")
+
+    storage.delete("scripts/0.js")
+    try:
+        storage.open("scripts/0.js")
+        check(False, f"{name}: deleted blob still readable")
+    except FileNotFoundError:
+        pass
+    try:
+        storage.open("uploads/missing.html")
+        check(False, f"{name}: missing blob readable")
+    except FileNotFoundError:
+        pass
+    return time.perf_counter() - start
+
+
+def check_sharding(root, count):
+    """Flat files from before sharding stay readable, then shard_flat_files() moves them; returns seconds taken."""
+    directories = {folder: os.path.join(root, "sharding", folder) for folder in ("uploads", "cssstyles", "scripts")}
+    flat, sharded = LocalStorage(directories, shard_depth=0), LocalStorage(directories, shard_depth=2)
+    for index in range(count):
+        flat.write_text(f"uploads/{index}_index.html", f"<p>{index}</p>")
+    sharded.write_text("uploads/0_index.html", "<p>rewritten</p>")
+    check(sharded.read_text("uploads/1_index.html") == "<p>1</p>", "sharding: flat file not resolved")
+    check(sharded.read_text("uploads/0_index.html") == "<p>rewritten</p>", "sharding: sharded copy not preferred")
+    check(len(list(sharded.iter_blobs("uploads"))) == count + 1, "sharding: listing should show both copies")
+
+    start = time.perf_counter()
+    result = sharded.shard_flat_files("uploads")
+    seconds = time.perf_counter() - start
+    check(result.moved == count - 1 and result.superseded == 1, f"sharding: {result}")
+    check(os.listdir(directories["uploads"]) and all(len(name) == 2 for name in os.listdir(directories["uploads"])),
+          "sharding: flat files left at the top of the folder")
+    listed = sorted(blob.key for blob in sharded.iter_blobs("uploads"))
+    check(listed == sorted(f"uploads/{index}_index.html" for index in range(count)), "sharding: keys after the move")
+    check(sharded.read_text("uploads/0_index.html") == "<p>rewritten</p>", "sharding: stale flat copy won")
+    check(sharded.read_text(f"uploads/{count - 1}_index.html") == f"<p>{count - 1}</p>", "sharding: moved file")
+    sharded.delete("uploads/1_index.html")
+    check(not os.path.exists(sharded.path("uploads/1_index.html")), "sharding: delete")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5_000_000, help="bytes in the streamed blob")
+    parser.add_argument("--files", type=int, default=20000, help="flat files moved by the sharding check")
+    parser.add_argument("--ttl", type=float, default=0.5, help="cache TTL for the two-instance check")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="storage_check_")
+    local = LocalStorage({folder: os.path.join(root, folder) for folder in ("uploads", "cssstyles", "scripts")})
+    print(f"local: contract passed in {check_contract('local', local, args.size):.2f}s")
+    print(f"local: {args.files} flat files sharded in {check_sharding(root, args.files):.2f}s")
+
+    server = make_server(port=0, page_size=10)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def instance(cache_name):
+        backend = S3Storage("blobs", endpoint, access_key="check", secret_key="check")
+        return ReadThroughCache(backend, os.path.join(root, cache_name), max_bytes=64 * 1024 * 1024, ttl=args.ttl)
+
+    first, second = instance("cache-a"), instance("cache-b")
+    print(f"s3: contract passed in {check_contract('s3', first, args.size):.2f}s")
+
+    requests = dict(server.config.store.requests)
+    for _ in range(100):
+        first.read_text("cssstyles/1_1.css")
+    gets = server.config.store.requests.get("GET", 0) - requests.get("GET", 0)
+    check(gets <= 1, f"s3: 100 cached reads made {gets} GET requests")
+    print(f"s3: 100 reads of a cached blob made {gets} GET requests")
+
+    check(second.read_text("cssstyles/1_1.css") == "body { color: blue; }", "s3: second instance read")
+    first.write_text("cssstyles/1_1.css", "body { color: green; }")
+    check(second.read_text("cssstyles/1_1.css") == "body { color: blue; }", "s3: cache served within TTL")
+    time.sleep(args.ttl)
+    check(second.read_text("cssstyles/1_1.css") == "body { color: green; }", "s3: stale after TTL")
+    before = server.config.store.requests.get("GET", 0)
+    time.sleep(args.ttl)
+    second.read_text("cssstyles/1_1.css")
+    check(server.config.store.requests.get("GET", 0) - before == 1, "s3: revalidation should be one conditional GET")
+    print(f"s3: other instance saw the write after the {args.ttl}s TTL; revalidation is one conditional GET")
+    print(f"fake S3 requests: {server.config.store.requests}")
+    server.shutdown()
+    print("All storage checks passed")
+
+
+if __name__ == "__main__":
+    main()
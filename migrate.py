@@ -0,0 +1,31 @@
+"""
+Apply the database schema.
+
+Run once per deploy, before the web workers start:
+    python migrate.py
+
+Creates any missing tables and the blog post full-text index, and signs
+existing posts for near-duplicate detection; existing tables and data are
+left untouched.
+"""
+import logging
+from app import app, db
+import models  # noqa: F401
+from utils.post_search import install_search_index
+from utils.topic_index import backfill_signatures
+
+
+def migrate():
+    """Create any missing tables for the models, the search index and missing post signatures."""
+    with app.app_context():
+        db.create_all()
+        logging.info("Database tables created")
+        with db.engine.begin() as connection:
+            install_search_index(connection)
+        logging.info("Blog post search index installed")
+        backfill_signatures()
+
+
+if __name__ == "__main__":
+    migrate()
+    print("Database schema is up to date.")
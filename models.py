@@ -71,3 +71,18 @@ class BlogPost(db.Model):
     html_content = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.now)
     updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+    
+    # Near-duplicate detection signature, kept current by utils.topic_index
+    signature = db.relationship('PostSignature', uselist=False, cascade="all, delete-orphan")
+
+# MinHash signatures of a blog post, for finding near-duplicate topics before generating
+class PostSignature(db.Model):
+    __tablename__ = 'post_signatures'
+    post_id = db.Column(db.Integer, db.ForeignKey('blog_posts.id', ondelete='CASCADE'), primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
+    title_minhash = db.Column(db.LargeBinary, nullable=True)
+    content_minhash = db.Column(db.LargeBinary, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+# Registers the flush hook that signs new and edited posts
+import utils.topic_index  # noqa: E402,F401
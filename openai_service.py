@@ -1,20 +1,107 @@
 import os
 import json
-import requests
-from openai import OpenAI
+import httpx
+import asyncio
+from openai import AsyncOpenAI
 import logging
 import tempfile
 import re
 from bs4 import BeautifulSoup
 from datetime import datetime
+from utils.prompt_budget import (
+    fit_prompt_sections, fit_text, truncate_html, truncate_css, truncate_text,
+    ANALYSIS_PROMPT_BUDGET, TITLE_INSPIRATION_BUDGET, CONTENT_INSPIRATION_BUDGET
+)
+from utils.content_condenser import condense_for_analysis
+from utils.html_analyzer import analyze_html_css
+from utils.site_analysis import analyze_site
+from utils.llm_telemetry import acreate_chat_completion
+from utils.llm_cassette import active_cassette
+from utils.async_runtime import run_sync
 
 # Initialize OpenAI client
 # The newest OpenAI model is "gpt-4o" which was released May 13, 2024.
 # Do not change this unless explicitly requested by the user
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
+# Set OPENAI_BASE_URL to point at a compatible server (e.g. loadtest/fake_openai.py)
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL") or None
+OPENAI_MAX_RETRIES = int(os.environ.get("OPENAI_MAX_RETRIES", "2"))
+# Set LLM_CASSETTE_MODE=record|replay to record calls to, or serve them from, LLM_CASSETTE_PATH
+if not OPENAI_API_KEY and active_cassette() is not None and active_cassette().mode == "replay":
+    # Replay never reaches the API, so offline development needs no real key
+    OPENAI_API_KEY = "cassette-replay"
+async_openai = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=OPENAI_MAX_RETRIES)
 
-def analyze_website_content(html_path, css_path, website_purpose):
+# Shared client for fetching inspiration URLs; like requests, it follows redirects
+http_client = httpx.AsyncClient(timeout=10, follow_redirects=True)
+
+
+def _visible_text(html):
+    """Extract the readable text of a page, one phrase per line."""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.extract()
+    
+    # Get text from the page
+    page_text = soup.get_text()
+    
+    # Clean up text
+    lines = (line.strip() for line in page_text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+async def fetch_inspiration_text(url):
+    """
+    Fetch an inspiration URL and return the page's readable text.
+    
+    Args:
+        url: The page to fetch
+        
+    Returns:
+        The page text, or an empty string if the page could not be fetched
+    """
+    try:
+        response = await http_client.get(url)
+        if response.status_code != 200:
+            return ""
+        # Parsing is CPU-bound, so keep it off the shared event loop
+        return await asyncio.to_thread(_visible_text, response.text)
+    except Exception as e:
+        logging.error(f"Error fetching URL: {str(e)}")
+        return ""
+
+def _read_text(path):
+    """Read a UTF-8 text file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _fit_analysis_sections(html_content, css_content, condense):
+    """
+    Fit the HTML and CSS into the analysis token budget on rule/element boundaries.
+    
+    Returns:
+        The fitted sections and the labels describing them in the prompt
+    """
+    if condense:
+        html_content, css_content = condense_for_analysis(html_content, css_content)
+        html_label, css_label = " (condensed structural outline)", " (condensed and de-duplicated)"
+        sections = {
+            "html": (html_content, truncate_text),
+            "css": (css_content, truncate_text),
+        }
+    else:
+        html_label, css_label = "", ""
+        sections = {
+            "html": (html_content, truncate_html),
+            "css": (css_content, truncate_css),
+        }
+    fitted = fit_prompt_sections(sections, ANALYSIS_PROMPT_BUDGET, call_site="analyze_website_content")
+    return fitted, html_label, css_label
+
+async def analyze_website_content_async(html_path, css_path, website_purpose, condense=True,
+                                        html_content=None, css_content=None):
     """
     Analyze website content using the OpenAI API to understand:
     - Design patterns
@@ -23,14 +110,18 @@ def analyze_website_content(html_path, css_path, website_purpose):
     - Layout
     - Website purpose
     - Business context
+    
+    With condense=True (the default) the model receives a structural skeleton of
+    the HTML and a de-duplicated summary of the CSS instead of the raw sources.
+    When html_content and css_content are given, the files are not read.
     """
     try:
-        # Read the HTML and CSS files
-        with open(html_path, 'r', encoding='utf-8') as html_file:
-            html_content = html_file.read()
+        # Read the HTML and CSS files off the shared event loop
+        if html_content is None:
+            html_content = await asyncio.to_thread(_read_text, html_path)
         
-        with open(css_path, 'r', encoding='utf-8') as css_file:
-            css_content = css_file.read()
+        if css_content is None:
+            css_content = await asyncio.to_thread(_read_text, css_path)
         
         # Define the JSON structure template outside the f-string
         json_structure = '''
@@ -72,18 +163,23 @@ def analyze_website_content(html_path, css_path, website_purpose):
         }
         '''
         
+        # Condensing and token counting are CPU-bound, so keep them off the shared event loop
+        fitted, html_label, css_label = await asyncio.to_thread(
+            _fit_analysis_sections, html_content, css_content, condense
+        )
+        
         # Create the prompt with properly formatted content
         prompt = f"""
         I need you to analyze this website's HTML and CSS to understand its design style and purpose.
         
-        HTML CONTENT:
+        HTML CONTENT{html_label}:
         ```html
-        {html_content[:15000]}
+        {fitted['html']}
         ```
         
-        CSS CONTENT:
+        CSS CONTENT{css_label}:
         ```css
-        {css_content[:15000]}
+        {fitted['css']}
         ```
         
         WEBSITE PURPOSE:
@@ -95,7 +191,9 @@ def analyze_website_content(html_path, css_path, website_purpose):
         """
         
         # Call OpenAI API
-        response = openai.chat.completions.create(
+        response = await acreate_chat_completion(
+            async_openai,
+            "analyze_website_content",
             model="o4-mini-2025-04-16",
             messages=[
                 {"role": "system", "content": "You are a design analyzer specializing in website style analysis."},
@@ -155,7 +253,7 @@ def analyze_website_content(html_path, css_path, website_purpose):
             }
         }
 
-def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
+async def generate_blog_title_async(topic=None, inspiration_url=None, website_info=None, inspiration_text=None):
     """
     Generate a title for a blog post using OpenAI.
     
@@ -163,6 +261,7 @@ def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
         topic: Optional topic description
         inspiration_url: Optional URL to scrape for inspiration
         website_info: Information about the website's purpose
+        inspiration_text: Text already fetched from inspiration_url, to avoid fetching it again
         
     Returns:
         A string containing the generated title
@@ -176,29 +275,13 @@ def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
             context = f"Topic to write about: {topic}"
         # If we have an inspiration URL, scrape it
         elif inspiration_url:
-            try:
-                response = requests.get(inspiration_url, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in soup(["script", "style"]):
-                        script.extract()
-                    
-                    # Get text from the page
-                    page_text = soup.get_text()
-                    
-                    # Clean up text
-                    lines = (line.strip() for line in page_text.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    page_text = '\n'.join(chunk for chunk in chunks if chunk)
-                    
-                    # Trim to a reasonable length
-                    context = f"Inspiration URL content: {page_text[:3000]}"
-                else:
-                    context = f"Unable to fetch content from URL: {inspiration_url}"
-            except Exception as e:
-                logging.error(f"Error fetching URL: {str(e)}")
+            if inspiration_text is None:
+                inspiration_text = await fetch_inspiration_text(inspiration_url)
+            if inspiration_text:
+                # Trim to the token budget on paragraph boundaries
+                page_text = fit_text(inspiration_text, TITLE_INSPIRATION_BUDGET, call_site="generate_blog_title")
+                context = f"Inspiration URL content: {page_text}"
+            else:
                 context = f"Unable to fetch content from URL: {inspiration_url}"
         
         # Create a prompt for the OpenAI API
@@ -226,7 +309,9 @@ def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
         """
         
         # Call OpenAI API
-        response = openai.chat.completions.create(
+        response = await acreate_chat_completion(
+            async_openai,
+            "generate_blog_title",
             model="o4-mini-2025-04-16",
             messages=[
                 {"role": "system", "content": "You are a professional blog title generator with expertise in SEO and content marketing."},
@@ -248,7 +333,7 @@ def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
         logging.error(f"Error generating blog title: {str(e)}")
         return "Blog Post"
 
-def generate_blog_content(title, topic=None, content=None, inspiration_url=None, website_info=None, style_analysis=None):
+async def generate_blog_content_async(title, topic=None, content=None, inspiration_url=None, website_info=None, style_analysis=None, inspiration_text=None):
     """
     Generate blog post content using OpenAI.
     
@@ -259,6 +344,7 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
         inspiration_url: Optional URL to scrape for inspiration
         website_info: Information about the website's purpose
         style_analysis: Analysis of the website's style
+        inspiration_text: Text already fetched from inspiration_url, to avoid fetching it again
         
     Returns:
         Dictionary with generated content and metadata
@@ -275,29 +361,13 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
             context = f"Topic to write about: {topic}"
         # If we have an inspiration URL, scrape it
         elif inspiration_url:
-            try:
-                response = requests.get(inspiration_url, timeout=10)
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Remove script and style elements
-                    for script in soup(["script", "style"]):
-                        script.extract()
-                    
-                    # Get text from the page
-                    page_text = soup.get_text()
-                    
-                    # Clean up text
-                    lines = (line.strip() for line in page_text.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    page_text = '\n'.join(chunk for chunk in chunks if chunk)
-                    
-                    # Trim to a reasonable length
-                    context = f"Inspiration URL content: {page_text[:5000]}"
-                else:
-                    context = f"Unable to fetch content from URL. Please write based on the title: {title}"
-            except Exception as e:
-                logging.error(f"Error fetching URL: {str(e)}")
+            if inspiration_text is None:
+                inspiration_text = await fetch_inspiration_text(inspiration_url)
+            if inspiration_text:
+                # Trim to the token budget on paragraph boundaries
+                page_text = fit_text(inspiration_text, CONTENT_INSPIRATION_BUDGET, call_site="generate_blog_content")
+                context = f"Inspiration URL content: {page_text}"
+            else:
                 context = f"Unable to fetch content from URL. Please write based on the title: {title}"
         
         # Create a prompt for the OpenAI API
@@ -330,7 +400,9 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
         """
         
         # Call OpenAI API
-        response = openai.chat.completions.create(
+        response = await acreate_chat_completion(
+            async_openai,
+            "generate_blog_content",
             model="o4-mini-2025-04-16",
             messages=[
                 {"role": "system", "content": "You are a professional blog content writer specializing in creating content that matches a website's style and purpose."},
@@ -366,7 +438,9 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
         Return ONLY the meta description text. No quotes, no explanations.
         """
         
-        meta_response = openai.chat.completions.create(
+        meta_response = await acreate_chat_completion(
+            async_openai,
+            "generate_meta_description",
             model="o4-mini-2025-04-16",
             messages=[
                 {"role": "system", "content": "You are an SEO specialist creating meta descriptions. You must generate descriptions that use between 150-160 characters."},
@@ -387,7 +461,7 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
             meta_description = meta_description[:157] + '...'
         
         # Format HTML content based on the post template
-        formatted_html = format_blog_html(title, blog_content, style_analysis)
+        formatted_html = await asyncio.to_thread(format_blog_html, title, blog_content, style_analysis)
         
         return {
             "content": blog_content,
@@ -403,6 +477,106 @@ def generate_blog_content(title, topic=None, content=None, inspiration_url=None,
             "formatted_html": f"<h1>{title}</h1><p>Failed to generate content. Please try again later.</p>"
         }
 
+async def analyze_upload_async(html_content, css_content, website_purpose):
+    """
+    Run the local style analysis and the OpenAI analysis of an upload concurrently.
+    
+    Both analyses work on the same decoded text, read once at upload time
+    (see utils/upload_ingest.py), rather than each reading the files.
+    
+    Args:
+        html_content: The uploaded HTML, decoded
+        css_content: The uploaded CSS, decoded
+        website_purpose: The user's description of the website
+        
+    Returns:
+        The local analysis merged with the OpenAI analysis, which wins on conflicts
+    """
+    local_analysis, website_analysis = await asyncio.gather(
+        asyncio.to_thread(analyze_html_css, html_content=html_content, css_content=css_content),
+        analyze_website_content_async(None, None, website_purpose, html_content=html_content, css_content=css_content)
+    )
+    return {**local_analysis, **website_analysis}
+
+async def analyze_site_upload_async(site, website_purpose):
+    """
+    Analyze a whole-site ZIP upload: every page locally, merged, while OpenAI analyzes the home page.
+    
+    OpenAI gets the home page with only the CSS that page uses, not every
+    stylesheet in the site, which keeps condensing it for the prompt cheap.
+    
+    Args:
+        site: The SiteArchive read from the upload by utils.site_analysis.read_site_zip()
+        website_purpose: The user's description of the website
+        
+    Returns:
+        The merged local analysis merged with the OpenAI analysis, which wins on conflicts
+    """
+    site_analysis, website_analysis = await asyncio.gather(
+        asyncio.to_thread(analyze_site, site),
+        analyze_website_content_async(None, None, website_purpose, html_content=site.html, css_content=site.css)
+    )
+    return {**site_analysis.analysis, **website_analysis}
+
+async def generate_blog_post_async(title=None, topic=None, inspiration_url=None, website_info=None, style_analysis=None):
+    """
+    Generate a new blog post, including its title when none is given.
+    
+    The inspiration URL is fetched once and shared by the title and content
+    prompts. The title, content and meta description calls each depend on the
+    previous one's output, so they run in sequence.
+    
+    Args:
+        title: Optional title; generated when empty
+        topic: Optional topic description
+        inspiration_url: Optional URL to scrape for inspiration
+        website_info: Information about the website's purpose
+        style_analysis: Analysis of the website's style
+        
+    Returns:
+        Dictionary with the title, generated content and metadata
+    """
+    inspiration_text = None
+    if inspiration_url and not topic:
+        inspiration_text = await fetch_inspiration_text(inspiration_url)
+    
+    if not title:
+        title = await generate_blog_title_async(
+            topic=topic,
+            inspiration_url=inspiration_url,
+            website_info=website_info,
+            inspiration_text=inspiration_text
+        )
+    
+    content_result = await generate_blog_content_async(
+        title=title,
+        topic=topic,
+        inspiration_url=inspiration_url,
+        website_info=website_info,
+        style_analysis=style_analysis,
+        inspiration_text=inspiration_text
+    )
+    return {"title": title, **content_result}
+
+# Blocking wrappers for the sync Flask routes; each runs on the shared event loop
+def analyze_website_content(html_path, css_path, website_purpose, condense=True):
+    return run_sync(analyze_website_content_async(html_path, css_path, website_purpose, condense))
+
+def generate_blog_title(topic=None, inspiration_url=None, website_info=None):
+    return run_sync(generate_blog_title_async(topic, inspiration_url, website_info))
+
+def generate_blog_content(title, topic=None, content=None, inspiration_url=None, website_info=None, style_analysis=None):
+    return run_sync(generate_blog_content_async(title, topic, content, inspiration_url, website_info, style_analysis))
+
+def analyze_upload(html_content, css_content, website_purpose):
+    return run_sync(analyze_upload_async(html_content, css_content, website_purpose))
+
+def analyze_site_upload(site, website_purpose):
+    return run_sync(analyze_site_upload_async(site, website_purpose))
+
+def generate_blog_post(title=None, topic=None, inspiration_url=None, website_info=None, style_analysis=None):
+    return run_sync(generate_blog_post_async(title, topic, inspiration_url, website_info, style_analysis))
+
 def format_blog_html(title, content, style_analysis):
     """
     Format blog content as HTML based on the website's style.
@@ -0,0 +1,51 @@
+"""
+Publish project blogs as static sites into directories served by the web tier.
+
+    python publish.py <output_dir> <project_id> [<project_id> ...]
+    python publish.py <output_dir> --all [--site-url https://blogs.example.com/{project_id}]
+
+Each project is published into <output_dir>/<project_id>. Re-running only
+rewrites the posts, index page and assets whose inputs changed since the
+last publish, and removes pages of deleted posts; --full rewrites everything.
+With --site-url (where {project_id} is replaced per project), each blog also
+gets sitemap.xml and RSS/Atom feeds.
+"""
+import os
+import sys
+import argparse
+from app import app
+from models import Project
+from utils.site_publisher import publish_project
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output_dir")
+    parser.add_argument("project_ids", nargs="*", type=int)
+    parser.add_argument("--all", action="store_true", help="publish every project")
+    parser.add_argument("--site-url", help="URL each published blog is served from; may contain {project_id}")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and rewrite every file")
+    args = parser.parse_args()
+
+    if not args.all and not args.project_ids:
+        parser.error("give project ids or --all")
+
+    with app.app_context():
+        query = Project.query.order_by(Project.id)
+        if not args.all:
+            query = query.filter(Project.id.in_(args.project_ids))
+        projects = query.all()
+        missing = set(args.project_ids) - {project.id for project in projects}
+        if missing:
+            print(f"No such project: {', '.join(map(str, sorted(missing)))}", file=sys.stderr)
+            sys.exit(1)
+
+        for project in projects:
+            site_url = args.site_url.format(project_id=project.id) if args.site_url else None
+            result = publish_project(project, os.path.join(args.output_dir, str(project.id)),
+                                     site_url=site_url, full=args.full)
+            print(f"Project {project.id}: {result.written} written, {result.unchanged} unchanged, {result.removed} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import jwt
 import os
+import time
 import uuid
+import threading
 from functools import wraps
 from urllib.parse import urlencode
 
@@ -14,6 +16,7 @@ from flask_dance.consumer.storage import BaseStorage
 from flask_login import LoginManager, login_user, logout_user, current_user
 from oauthlib.oauth2.rfc6749.errors import InvalidGrantError
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import make_transient_to_detached
 from werkzeug.local import LocalProxy
 
 from app import app, db
@@ -21,15 +24,80 @@ from models import OAuth, User
 
 login_manager = LoginManager(app)
 
+# How long a worker may reuse a user row or OAuth token without re-reading it
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', '30'))
+
+# Re-issue the session cookie at most this often just to slide its expiry
+SESSION_REFRESH_INTERVAL = int(os.environ.get('SESSION_REFRESH_INTERVAL', str(24 * 60 * 60)))
+
+# The cookie is written only when the session changes; see set_applocal_session
+app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+
+
+class _TTLCache:
+    """A small thread-safe per-process cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_user_cache = _TTLCache(AUTH_CACHE_TTL)
+_token_cache = _TTLCache(AUTH_CACHE_TTL)
+
+USER_COLUMNS = [column.key for column in User.__table__.columns]
+
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)
+    values = _user_cache.get(user_id)
+    if values is None:
+        user = User.query.get(user_id)
+        if user is not None:
+            _user_cache.set(user_id, {name: getattr(user, name) for name in USER_COLUMNS})
+        return user
+
+    # Attach a copy of the cached row to this request's session without a SELECT
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
 
 
 class UserSessionStorage(BaseStorage):
 
+    @staticmethod
+    def _cache_key(blueprint):
+        return (current_user.get_id(), g.browser_session_key, blueprint.name)
+
     def get(self, blueprint):
+        key = self._cache_key(blueprint)
+        token = _token_cache.get(key)
+        # An expired token may already have been refreshed by another worker, so re-read it
+        if token is not None and token.get('expires_at', float('inf')) > time.time():
+            # flask-dance updates expires_in on the dict it gets, so hand out a copy
+            return dict(token)
+
         try:
             token = db.session.query(OAuth).filter_by(
                 user_id=current_user.get_id(),
@@ -38,9 +106,12 @@ class UserSessionStorage(BaseStorage):
             ).one().token
         except NoResultFound:
             token = None
+        if token is not None:
+            _token_cache.set(key, dict(token))
         return token
 
     def set(self, blueprint, token):
+        _token_cache.invalidate(self._cache_key(blueprint))
         db.session.query(OAuth).filter_by(
             user_id=current_user.get_id(),
             browser_session_key=g.browser_session_key,
@@ -55,6 +126,7 @@ class UserSessionStorage(BaseStorage):
         db.session.commit()
 
     def delete(self, blueprint):
+        _token_cache.invalidate(self._cache_key(blueprint))
         db.session.query(OAuth).filter_by(
             user_id=current_user.get_id(),
             browser_session_key=g.browser_session_key,
@@ -99,13 +171,18 @@ def make_replit_blueprint():
     def set_applocal_session():
         if '_browser_session_key' not in session:
             session['_browser_session_key'] = uuid.uuid4().hex
-        session.modified = True
+        # Assigning to the session marks it modified, so only touch it when the
+        # cookie is due for re-issue; otherwise responses carry no Set-Cookie
+        now = int(time.time())
+        if now - session.get('_refreshed_at', 0) >= SESSION_REFRESH_INTERVAL:
+            session['_refreshed_at'] = now
         g.browser_session_key = session['_browser_session_key']
         g.flask_dance_replit = replit_bp.session
 
     @replit_bp.route("/logout")
     def logout():
         del replit_bp.token
+        _user_cache.invalidate(current_user.get_id())
         logout_user()
 
         end_session_endpoint = issuer_url + "/session/end"
@@ -135,6 +212,7 @@ def save_user(user_claims):
     user.profile_image_url = user_claims.get('profile_image_url')
     merged_user = db.session.merge(user)
     db.session.commit()
+    _user_cache.invalidate(user.id)
     return merged_user
 
 
@@ -181,6 +259,23 @@ def require_login(f):
     return decorated_function
 
 
+def require_admin(f):
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_ids = {
+            user_id.strip()
+            for user_id in os.environ.get('ADMIN_USER_IDS', '').split(',')
+            if user_id.strip()
+        }
+        if not current_user.is_authenticated or current_user.get_id() not in admin_ids:
+            return render_template("403.html"), 403
+
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
 def get_next_navigation_url(request):
     is_navigation_url = request.headers.get(
         'Sec-Fetch-Mode') == 'navigate' and request.headers.get(
@@ -1,29 +1,38 @@
 import os
+import hmac
 import json
 import uuid
 import time
 import logging
 from datetime import datetime
-from flask import render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from flask import render_template, request, redirect, url_for, session, flash, jsonify, send_file, send_from_directory, Response, abort
 from flask_login import current_user
 from werkzeug.utils import secure_filename
 from app import app, db
 from models import Project, BlogPost
-from replit_auth import require_login, make_replit_blueprint
-from utils.html_analyzer import analyze_html_css
-from utils.file_storage import save_uploaded_file, generate_unique_filename, create_download_package
-from utils.html_generator import generate_blog_template, generate_post_template
-from openai_service import generate_blog_content, analyze_website_content
+from replit_auth import require_login, require_admin, make_replit_blueprint
+from utils.file_storage import generate_unique_filename, create_download_package
+from utils.upload_ingest import ingest_upload, read_upload, store_upload
+from utils.blob_storage import get_storage
+from utils.db_pool import release_connection
+from utils.post_search import search_posts
+from utils.topic_index import find_near_duplicates, NEAR_DUPLICATE_ACTION
+from utils.metrics import render_prometheus
+from utils.profiling import list_profiles, PROFILE_SUFFIXES
 import io
 import zipfile
 
+# openai_service and utils.html_generator pull in openai, httpx, bs4 and tinycss2, so the
+# routes that need them import them on first use to keep worker startup fast
+
 # Register Replit Auth Blueprint
 app.register_blueprint(make_replit_blueprint(), url_prefix="/auth")
 
-# Make session permanent
+# Make session permanent (only when it isn't already, since assigning marks the session modified)
 @app.before_request
 def make_session_permanent():
-    session.permanent = True
+    if not session.permanent:
+        session.permanent = True
 
 # Landing Page
 @app.route('/')
@@ -73,83 +82,84 @@ def project_detail(project_id):
 def upload_files(project_id):
     project = Project.query.filter_by(id=project_id, user_id=current_user.id).first_or_404()
     
-    # Check if files were uploaded
-    if 'html_file' not in request.files or 'css_file' not in request.files:
-        flash('Both HTML and CSS files are required', 'danger')
-        return redirect(url_for('project_detail', project_id=project_id))
-    
-    html_file = request.files['html_file']
-    css_file = request.files['css_file']
     website_purpose = request.form.get('website_purpose', '')
-    
-    # Check if filenames are valid
-    if html_file.filename == '' or css_file.filename == '':
-        flash('Both HTML and CSS files are required', 'danger')
+    site_zip = request.files.get('site_zip')
+    html_file = request.files.get('html_file')
+    css_file = request.files.get('css_file')
+    
+    # Accept either a ZIP of the whole site, or its main HTML and CSS files
+    if site_zip and site_zip.filename:
+        # Pages and stylesheets are read from the ZIP in memory; it is stored whole, under its
+        # content hash, only once it has turned out to be a usable site
+        site_content = read_upload(site_zip, 'zip', decode=False)
+        from utils.site_analysis import read_site_zip
+        try:
+            site = read_site_zip(io.BytesIO(site_content.data))
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('project_detail', project_id=project_id))
+        html_key, css_key = store_upload(site_content, 'zip').key, None
+    elif html_file and css_file and html_file.filename and css_file.filename:
+        # Store each file under its content hash, reading it once; the decoded text feeds both analyses
+        html_upload = ingest_upload(html_file, 'html')
+        css_upload = ingest_upload(css_file, 'css')
+        site = None
+        html_key, css_key = html_upload.key, css_upload.key
+    else:
+        flash('Upload a ZIP of your website, or both its HTML and CSS files', 'danger')
         return redirect(url_for('project_detail', project_id=project_id))
     
-    # Save HTML file
-    html_path = save_uploaded_file(html_file, 'html')
+    # Don't hold a pooled connection through the OpenAI analysis
+    release_connection()
     
-    # Save CSS file
-    css_path = save_uploaded_file(css_file, 'css')
-    
-    # Update project with file paths and website purpose
-    project.html_file_path = html_path
-    project.css_file_path = css_path
-    project.website_purpose = website_purpose
-    
-    # Analyze the website content and style
-    analysis_result = analyze_html_css(html_path, css_path)
+    from openai_service import analyze_upload, analyze_site_upload
+    from utils.html_generator import generate_blog_stylesheet_content, generate_blog_template, generate_post_template
+    from utils.file_storage import save_content_to_hosted_file
     
-    # Use OpenAI to enhance the analysis
-    website_analysis = analyze_website_content(
-        html_path=html_path, 
-        css_path=css_path, 
-        website_purpose=website_purpose
-    )
+    # Analyze the website style locally while OpenAI analyzes its content and purpose
+    if site is not None:
+        style_analysis = analyze_site_upload(site, website_purpose)
+    else:
+        style_analysis = analyze_upload(
+            html_content=html_upload.text,
+            css_content=css_upload.text,
+            website_purpose=website_purpose
+        )
     
     # Generate unique filenames for hosted CSS and JS
     timestamp = int(time.time())
-    css_filename = f"{project.id}_{timestamp}.css"
-    js_filename = f"{project.id}_{timestamp}.js"
+    css_filename = f"{project_id}_{timestamp}.css"
+    js_filename = f"{project_id}_{timestamp}.js"
     
-    # Save hosted filenames
-    project.hosted_css_filename = css_filename
-    project.hosted_js_filename = js_filename
-    
-    # Merge analysis results
-    project.style_analysis = {
-        **analysis_result,
-        **website_analysis
-    }
-    
-    # Generate CSS content based on analysis
-    from utils.html_generator import generate_blog_stylesheet_content
-    from utils.file_storage import save_content_to_hosted_file
-    
-    # Generate the CSS content
-    css_content = generate_blog_stylesheet_content(project.style_analysis)
+    # Generate the CSS content based on analysis
+    css_content = generate_blog_stylesheet_content(style_analysis)
     
-    # Save the generated CSS to the hosted directory
-    hosted_css_path = save_content_to_hosted_file(css_content, css_filename, 'cssstyles')
+    # Save the generated CSS to the hosted folder
+    save_content_to_hosted_file(css_content, css_filename, 'cssstyles')
     
     # Generate blog and post templates
     blog_template = generate_blog_template(
-        analysis_result=project.style_analysis,
+        analysis_result=style_analysis,
         css_filename=css_filename,
         js_filename=js_filename
     )
     
     post_template = generate_post_template(
-        analysis_result=project.style_analysis,
+        analysis_result=style_analysis,
         css_filename=css_filename,
         js_filename=js_filename
     )
     
-    # Save templates
+    # Persist the results in a short transaction
+    project = Project.query.filter_by(id=project_id, user_id=current_user.id).first_or_404()
+    project.html_file_path = html_key
+    project.css_file_path = css_key
+    project.website_purpose = website_purpose
+    project.hosted_css_filename = css_filename
+    project.hosted_js_filename = js_filename
+    project.style_analysis = style_analysis
     project.blog_template_html = blog_template
     project.post_template_html = post_template
-    
     db.session.commit()
     
     flash('Website files uploaded and analyzed successfully!', 'success')
@@ -172,29 +182,34 @@ def create_post(project_id):
             flash('Please provide either a topic or URL inspiration to generate content', 'danger')
             return redirect(url_for('create_post', project_id=project_id))
         
-        # If no title is provided, generate one based on topic or URL
-        if not title:
-            # First, attempt to generate a title
-            from openai_service import generate_blog_title
-            generated_title = generate_blog_title(
-                topic=topic_input,
-                inspiration_url=inspiration_url,
-                website_info=project.website_purpose
-            )
-            title = generated_title
+        # Don't pay for a generation that would repeat a post the project already has
+        duplicates = []
+        if NEAR_DUPLICATE_ACTION != 'off' and (title or topic_input):
+            duplicates = find_near_duplicates(project_id, ' '.join(filter(None, [title, topic_input])))
+        if duplicates and NEAR_DUPLICATE_ACTION == 'skip' and not request.form.get('allow_duplicate'):
+            flash(f'This topic is very similar to your post "{duplicates[0].title}". '
+                  'Choose another topic, or confirm below to generate it anyway.', 'warning')
+            return render_template('content.html', project=project, duplicates=duplicates)
         
-        # Generate blog post content
-        content_result = generate_blog_content(
+        # Copy what generation needs, then don't hold a pooled connection through the OpenAI calls
+        website_purpose = project.website_purpose
+        style_analysis = project.style_analysis
+        release_connection()
+        
+        # Generate the post content, and a title based on topic or URL if none is provided
+        from openai_service import generate_blog_post
+        content_result = generate_blog_post(
             title=title,
             topic=topic_input,
             inspiration_url=inspiration_url,
-            website_info=project.website_purpose,
-            style_analysis=project.style_analysis
+            website_info=website_purpose,
+            style_analysis=style_analysis
         )
         
-        # Create blog post
+        # Create the blog post in a short transaction, unless the project was deleted meanwhile
+        Project.query.filter_by(id=project_id, user_id=current_user.id).first_or_404()
         blog_post = BlogPost(
-            title=title,
+            title=content_result['title'],
             content=content_result['content'],
             meta_description=content_result.get('meta_description', ''),
             html_content=content_result['formatted_html'],
@@ -205,10 +220,21 @@ def create_post(project_id):
         db.session.commit()
         
         flash('Blog post created successfully!', 'success')
+        if duplicates:
+            flash(f'The new post is very similar to your post "{duplicates[0].title}".', 'warning')
         return redirect(url_for('project_detail', project_id=project_id))
     
     return render_template('content.html', project=project)
 
+# Search the current user's blog posts
+@app.route('/search')
+@require_login
+def search():
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, has_next = search_posts(db.session, current_user.id, query, page=page)
+    return render_template('search.html', query=query, results=results, page=page, has_next=has_next)
+
 # Preview blog post
 @app.route('/posts/<int:post_id>/preview')
 @require_login
@@ -226,23 +252,39 @@ def edit_post(post_id):
     project = Project.query.filter_by(id=post.project_id, user_id=current_user.id).first_or_404()
     
     if request.method == 'POST':
-        post.title = request.form.get('title')
-        post.content = request.form.get('content')
-        post.meta_description = request.form.get('meta_description', '')
+        title = request.form.get('title')
+        content = request.form.get('content')
+        meta_description = request.form.get('meta_description', '')
+        
+        # Copy what generation needs, then don't hold a pooled connection through the OpenAI calls
+        project_id = project.id
+        website_purpose = project.website_purpose
+        style_analysis = project.style_analysis
+        release_connection()
         
         # Update HTML content
+        from openai_service import generate_blog_content
         updated_content_result = generate_blog_content(
-            title=post.title,
-            content=post.content,  # Use existing content
-            website_info=project.website_purpose,
-            style_analysis=project.style_analysis
+            title=title,
+            content=content,  # Use existing content
+            website_info=website_purpose,
+            style_analysis=style_analysis
         )
         
+        # Save the post in a short transaction, checking ownership again since the first read
+        post = BlogPost.query.join(Project).filter(
+            BlogPost.id == post_id,
+            Project.id == project_id,
+            Project.user_id == current_user.id
+        ).first_or_404()
+        post.title = title
+        post.content = content
+        post.meta_description = meta_description
         post.html_content = updated_content_result['formatted_html']
         db.session.commit()
         
         flash('Blog post updated successfully!', 'success')
-        return redirect(url_for('project_detail', project_id=project.id))
+        return redirect(url_for('project_detail', project_id=project_id))
     
     return render_template('content.html', project=project, post=post, edit_mode=True)
 
@@ -270,8 +312,9 @@ def edit_blog_css(project_id):
         flash('No CSS file found for this project', 'danger')
         return redirect(url_for('project_detail', project_id=project_id))
     
-    # Get the path to the CSS file
-    css_path = os.path.join(app.config['HOSTED_FILES_FOLDER'], 'cssstyles', project.hosted_css_filename)
+    # Get the storage key of the CSS file
+    storage = get_storage()
+    css_key = f"cssstyles/{project.hosted_css_filename}"
     
     if request.method == 'POST':
         # Get the updated CSS content
@@ -283,8 +326,7 @@ def edit_blog_css(project_id):
             if css_content is None:
                 css_content = ""
                 
-            with open(css_path, 'w', encoding='utf-8') as f:
-                f.write(css_content)
+            storage.write_text(css_key, css_content)
             
             flash('CSS file updated successfully', 'success')
             return redirect(url_for('project_detail', project_id=project_id))
@@ -295,14 +337,32 @@ def edit_blog_css(project_id):
     # Read the current CSS content for the form
     css_content = ""
     try:
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
+        css_content = storage.read_text(css_key)
     except Exception as e:
         logging.error(f"Error reading CSS file: {str(e)}")
         flash('Error reading CSS file', 'danger')
     
     return render_template('edit_css.html', project=project, css_content=css_content)
 
+# Serve hosted blog CSS and JS from blob storage, so every instance can serve every project's files
+@app.route('/hosted_files/<any(cssstyles, scripts):folder>/<filename>')
+def hosted_file(folder, filename):
+    if filename != secure_filename(filename):
+        abort(404)
+    
+    try:
+        stream, info = get_storage().open_blob(f"{folder}/{filename}")
+    except FileNotFoundError:
+        abort(404)
+    
+    return send_file(
+        stream,
+        mimetype='text/css' if folder == 'cssstyles' else 'text/javascript',
+        etag=info.etag,
+        last_modified=info.modified,
+        max_age=300
+    )
+
 # Export blog package
 @app.route('/projects/<int:project_id>/export')
 @require_login
@@ -310,8 +370,14 @@ def export_project(project_id):
     project = Project.query.filter_by(id=project_id, user_id=current_user.id).first_or_404()
     blog_posts = BlogPost.query.filter_by(project_id=project_id).all()
     
+    # Sitemap and feeds need the absolute URL the blog will be served from
+    site_url = request.args.get('site_url', '').strip()
+    if site_url and not site_url.startswith(('http://', 'https://')):
+        flash('The blog URL must start with http:// or https://', 'danger')
+        return redirect(url_for('project_detail', project_id=project_id))
+    
     # Create a download package
-    zip_data = create_download_package(project, blog_posts)
+    zip_data = create_download_package(project, blog_posts, site_url=site_url or None)
     
     # Return the zip file
     return send_file(
@@ -321,6 +387,41 @@ def export_project(project_id):
         download_name=f"{project.name}_blog_export.zip"
     )
 
+# Prometheus metrics for this worker process: scrapers send METRICS_TOKEN as a bearer token;
+# without one configured, only admins may see them
+@app.route('/metrics')
+def metrics():
+    metrics_token = os.environ.get('METRICS_TOKEN')
+    if not metrics_token:
+        return admin_metrics()
+    authorization = request.headers.get('Authorization', '').encode('utf-8')
+    if not hmac.compare_digest(authorization, f"Bearer {metrics_token}".encode('utf-8')):
+        abort(403)
+    
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@require_admin
+def admin_metrics():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Saved request profiles (admin only)
+@app.route('/admin/profiles')
+@require_login
+@require_admin
+def admin_profiles():
+    profiles = list_profiles(app.config['PROFILE_FOLDER'])
+    return render_template('admin_profiles.html', profiles=profiles)
+
+# Download a saved profile file (admin only)
+@app.route('/admin/profiles/<filename>')
+@require_login
+@require_admin
+def download_profile(filename):
+    if not filename.endswith(PROFILE_SUFFIXES):
+        abort(404)
+    
+    return send_from_directory(app.config['PROFILE_FOLDER'], filename, as_attachment=True)
+
 # 403 Error handler
 @app.errorhandler(403)
 def forbidden(error):
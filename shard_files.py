@@ -0,0 +1,45 @@
+"""
+Move uploaded and hosted files into hash-prefixed shard directories.
+
+    python shard_files.py --dry-run
+    python shard_files.py
+
+One-time migration for local blob storage. Files are now written to
+<folder>/ab/cd/<name> (see STORAGE_SHARD_DEPTH) so no directory holds
+hundreds of thousands of entries; this moves the files written before
+that out of the flat uploads, cssstyles and scripts folders, and rewrites
+project rows that still hold absolute upload paths to storage keys. Flat
+files stay readable until they are moved, so it can run while the app
+serves traffic, and an interrupted run can simply be repeated.
+"""
+import sys
+import argparse
+from app import app
+from utils.blob_storage import STORAGE_BACKEND
+from utils.storage_migration import shard_local_storage
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the files and rows to migrate; change nothing")
+    args = parser.parse_args()
+
+    if STORAGE_BACKEND != "local":
+        print(f"Nothing to do: {STORAGE_BACKEND} storage has no directories to shard.")
+        return
+
+    def report(folder, progress):
+        print(f"{folder}: {progress.moved + progress.superseded} files "
+              f"({(progress.moved + progress.superseded) / (progress.seconds or 1e-9):.0f}/s)", file=sys.stderr)
+
+    with app.app_context():
+        results, rows = shard_local_storage(dry_run=args.dry_run, progress=report)
+    verb = "would be" if args.dry_run else "were"
+    for folder, result in results.items():
+        print(f"{folder}: {result.moved} files {verb} moved and {result.superseded} stale flat copies {verb} removed "
+              f"in {result.seconds:.1f}s.")
+    print(f"{rows} project rows {verb} rewritten to storage keys.")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,8 +11,10 @@ document.addEventListener('DOMContentLoaded', function() {
             // Get the project ID from the data attribute
             const projectId = this.getAttribute('data-project-id');
             
-            // Create the export URL
-            const exportUrl = `/projects/${projectId}/export`;
+            // Create the export URL, with the blog URL for the sitemap and feeds if one was given
+            const siteUrlInput = document.getElementById('export-site-url');
+            const siteUrl = siteUrlInput ? siteUrlInput.value.trim() : '';
+            const exportUrl = `/projects/${projectId}/export` + (siteUrl ? `?site_url=${encodeURIComponent(siteUrl)}` : '');
             
             // Create a hidden link element
             const downloadLink = document.createElement('a');
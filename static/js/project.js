@@ -3,13 +3,14 @@ document.addEventListener('DOMContentLoaded', function() {
     const uploadForm = document.getElementById('upload-form');
     if (uploadForm) {
         uploadForm.addEventListener('submit', function(e) {
+            const siteZip = document.getElementById('site-zip').files[0];
             const htmlFile = document.getElementById('html-file').files[0];
             const cssFile = document.getElementById('css-file').files[0];
             const websitePurpose = document.getElementById('website-purpose').value.trim();
             
-            if (!htmlFile || !cssFile) {
+            if (!siteZip && (!htmlFile || !cssFile)) {
                 e.preventDefault();
-                showAlert('Both HTML and CSS files are required.', 'danger');
+                showAlert('Upload a ZIP of your website, or both its HTML and CSS files.', 'danger');
                 return false;
             }
             
@@ -20,19 +21,27 @@ document.addEventListener('DOMContentLoaded', function() {
             }
             
             // Check file types
-            const htmlExtension = htmlFile.name.split('.').pop().toLowerCase();
-            const cssExtension = cssFile.name.split('.').pop().toLowerCase();
-            
-            if (htmlExtension !== 'html' && htmlExtension !== 'htm') {
-                e.preventDefault();
-                showAlert('Please upload a valid HTML file.', 'danger');
-                return false;
-            }
-            
-            if (cssExtension !== 'css') {
-                e.preventDefault();
-                showAlert('Please upload a valid CSS file.', 'danger');
-                return false;
+            if (siteZip) {
+                if (siteZip.name.split('.').pop().toLowerCase() !== 'zip') {
+                    e.preventDefault();
+                    showAlert('Please upload a valid ZIP file.', 'danger');
+                    return false;
+                }
+            } else {
+                const htmlExtension = htmlFile.name.split('.').pop().toLowerCase();
+                const cssExtension = cssFile.name.split('.').pop().toLowerCase();
+                
+                if (htmlExtension !== 'html' && htmlExtension !== 'htm') {
+                    e.preventDefault();
+                    showAlert('Please upload a valid HTML file.', 'danger');
+                    return false;
+                }
+                
+                if (cssExtension !== 'css') {
+                    e.preventDefault();
+                    showAlert('Please upload a valid CSS file.', 'danger');
+                    return false;
+                }
             }
             
             // Show loading state
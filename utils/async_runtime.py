@@ -0,0 +1,60 @@
+import os
+import asyncio
+import logging
+import threading
+import contextvars
+import concurrent.futures
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    """
+    Return this process's shared event loop, starting it on first use.
+
+    The loop runs forever in a daemon thread, so every request thread's async
+    work shares one loop and one set of HTTP connection pools. It is restarted
+    after a fork, since the loop thread does not survive into the child.
+    """
+    global _loop, _loop_pid
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True).start()
+            logging.debug("Started shared event loop thread")
+        return _loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the shared event loop and block until it finishes.
+
+    The coroutine runs in a copy of the caller's context, so context variables
+    such as the current request's metrics are visible to it.
+
+    Args:
+        coro: The coroutine to run
+
+    Returns:
+        The coroutine's result; its exception is re-raised in the caller
+    """
+    loop = get_loop()
+    result = concurrent.futures.Future()
+
+    def copy_outcome(task):
+        if task.cancelled():
+            result.cancel()
+        elif task.exception() is not None:
+            result.set_exception(task.exception())
+        else:
+            result.set_result(task.result())
+
+    def start():
+        # Tasks copy the context they are created in, which is the caller's here
+        loop.create_task(coro).add_done_callback(copy_outcome)
+
+    loop.call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
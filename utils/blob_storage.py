@@ -0,0 +1,684 @@
+import io
+import os
+import hmac
+import json
+import time
+import errno
+import shutil
+import hashlib
+import logging
+import tempfile
+import mimetypes
+import threading
+import contextlib
+from urllib.parse import quote, urlsplit
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from collections import namedtuple
+from xml.etree import ElementTree
+
+# local: files under UPLOAD_FOLDER and HOSTED_FILES_FOLDER (one instance, or a shared disk);
+# s3: an S3-compatible object store shared by every instance (AWS S3, MinIO, R2, ...)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.environ.get("S3_BUCKET")
+# Endpoint of a non-AWS store, e.g. http://127.0.0.1:9000 for MinIO; path-style URLs are used with it
+S3_ENDPOINT_URL = os.environ.get("S3_ENDPOINT_URL")
+S3_REGION = os.environ.get("S3_REGION", "us-east-1")
+# Prepended to every key, so several deployments can share a bucket
+S3_PREFIX = os.environ.get("S3_PREFIX", "")
+# Remote blobs read recently are kept on local disk, up to this many bytes per instance
+STORAGE_CACHE_DIR = os.environ.get("STORAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "blob-cache"))
+STORAGE_CACHE_MAX_BYTES = int(os.environ.get("STORAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Seconds a cached blob is served before asking the store whether it changed (a bodiless 304 if not)
+STORAGE_CACHE_TTL = float(os.environ.get("STORAGE_CACHE_TTL", "30"))
+# Local files are spread over 256 ** depth subdirectories by a hash of their name, e.g.
+# cssstyles/1_1700000000.css -> cssstyles/3f/a2/1_1700000000.css, so no directory grows huge; 0 keeps folders flat
+STORAGE_SHARD_DEPTH = int(os.environ.get("STORAGE_SHARD_DEPTH", "2"))
+# Files moved between progress reports while sharding a flat folder
+SHARD_PROGRESS_EVERY = 5000
+# Unreferenced files younger than this are kept by utils.file_gc: uploads are saved before the
+# project row points at them. Defined here, with the storage settings, so ingesting an upload
+# doesn't import the app and database
+GC_GRACE_PERIOD = int(os.environ.get("GC_GRACE_PERIOD", str(24 * 3600)))
+
+CHUNK_SIZE = 64 * 1024
+# Permissions of files written through a temporary file (mkstemp creates them 0600)
+FILE_MODE = 0o644
+# Uploads to S3 are buffered in memory up to this size, then in a temporary file
+UPLOAD_SPOOL_SIZE = 1024 * 1024
+EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+# size in bytes, modified as a Unix timestamp
+BlobInfo = namedtuple("BlobInfo", ["key", "size", "modified", "etag"])
+ShardResult = namedtuple("ShardResult", ["moved", "superseded", "seconds"])
+
+
+def _not_found(key):
+    return FileNotFoundError(errno.ENOENT, "No such blob", key)
+
+
+class BlobStorage:
+    """
+    Where uploads and hosted assets live, addressed by keys like 'cssstyles/1_1700000000.css'.
+
+    Backends implement open_blob(), create(), stat(), delete() and
+    iter_blobs(); reads and writes are streams, so large files are never
+    held in memory. A missing key raises FileNotFoundError.
+    """
+
+    def open_blob(self, key):
+        """Return (binary readable stream, BlobInfo) for a key."""
+        raise NotImplementedError
+
+    def create(self, key):
+        """Return a binary writable stream; the blob replaces any previous one when it is closed."""
+        raise NotImplementedError
+
+    def stat(self, key):
+        """Return the key's BlobInfo."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Delete a blob; a missing key raises FileNotFoundError where the backend can tell."""
+        raise NotImplementedError
+
+    def iter_blobs(self, folder):
+        """Yield a BlobInfo-like object (key, size, modified) for every blob under folder/."""
+        raise NotImplementedError
+
+    def open(self, key):
+        """Return a binary readable stream for a key."""
+        return self.open_blob(key)[0]
+
+    def read_text(self, key):
+        with self.open(key) as stream:
+            return stream.read().decode("utf-8")
+
+    def write_text(self, key, text):
+        with self.create(key) as stream:
+            stream.write(text.encode("utf-8"))
+
+    @contextlib.contextmanager
+    def local_copy(self, key):
+        """Yield the path of a local file with the blob's content, for code that needs a real file."""
+        with self.open(key) as source, tempfile.NamedTemporaryFile(suffix=os.path.splitext(key)[1]) as copy:
+            shutil.copyfileobj(source, copy, CHUNK_SIZE)
+            copy.flush()
+            yield copy.name
+
+
+def open_temporary(path):
+    """
+    Create a temporary file beside path, to be renamed over it once written.
+
+    The name is unique to this call, so threads and processes writing the
+    same path never share a temporary file, and dot-prefixed, so directory
+    walks and the file collector skip it.
+
+    Returns:
+        (binary file open for writing, temporary path)
+    """
+    directory, name = os.path.split(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary_path = tempfile.mkstemp(prefix=f".{name}.tmp-", dir=directory)
+    os.fchmod(fd, FILE_MODE)
+    return os.fdopen(fd, "wb"), temporary_path
+
+
+class _AtomicFile:
+    """A file written under a temporary name that replaces its target on close, or vanishes on error."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file, self.temporary_path = open_temporary(path)
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+            os.replace(self.temporary_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class _LocalBlob:
+    """A blob found by a directory walk; stat() runs only if size or modified is read."""
+
+    def __init__(self, key, entry):
+        self.key = key
+        self.entry = entry
+
+    @property
+    def size(self):
+        return self.entry.stat(follow_symlinks=False).st_size
+
+    @property
+    def modified(self):
+        return self.entry.stat(follow_symlinks=False).st_mtime
+
+
+def _existing(path):
+    os.stat(path)
+    return path
+
+
+def shard_path(name, depth=STORAGE_SHARD_DEPTH):
+    """Return the shard subdirectories of a file name: a list of depth two-hex-digit names."""
+    if not depth:
+        return []
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=depth).hexdigest()
+    return [digest[index:index + 2] for index in range(0, 2 * depth, 2)]
+
+
+class LocalStorage(BlobStorage):
+    """
+    Blobs as files; a key's first segment picks the directory, e.g. uploads/ -> UPLOAD_FOLDER.
+
+    Files are written into hash-prefixed shard subdirectories (see
+    STORAGE_SHARD_DEPTH). Files from before sharding, still at the top of
+    their folder until shard_files.py moves them, are found by falling back
+    to the flat path when the sharded one is missing, so keys and the paths
+    stored in older project rows keep working during the move.
+    """
+
+    def __init__(self, directories, shard_depth=STORAGE_SHARD_DEPTH):
+        self.directories = directories
+        self.shard_depth = shard_depth
+
+    def _split(self, key):
+        folder, _, name = key.partition("/")
+        directory = self.directories.get(folder)
+        if directory is None or not name or any(part in ("", ".", "..") for part in name.split("/")):
+            raise ValueError(f"Invalid storage key: {key}")
+        return directory, name
+
+    def path(self, key):
+        """Return the key's sharded file path, where it is written."""
+        directory, name = self._split(key)
+        return os.path.join(directory, *shard_path(name, self.shard_depth), name)
+
+    def flat_path(self, key):
+        """Return the key's file path from before sharding."""
+        return os.path.join(*self._split(key))
+
+    def _resolve(self, operation, key):
+        """Apply operation to the key's sharded path, or to its flat path if only that exists."""
+        path = self.path(key)
+        try:
+            return operation(path)
+        except FileNotFoundError:
+            if not self.shard_depth:
+                raise
+        try:
+            return operation(self.flat_path(key))
+        except FileNotFoundError:
+            # Moved into its shard between the two attempts
+            return operation(path)
+
+    def _info(self, key, stat):
+        return BlobInfo(key, stat.st_size, stat.st_mtime, f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+    def open_blob(self, key):
+        stream = self._resolve(lambda path: open(path, "rb"), key)
+        return stream, self._info(key, os.fstat(stream.fileno()))
+
+    def create(self, key):
+        return _AtomicFile(self.path(key))
+
+    def stat(self, key):
+        return self._info(key, self._resolve(os.stat, key))
+
+    def delete(self, key):
+        # A stale flat copy would resurface once the sharded file is gone, so both are removed
+        paths = [self.path(key)] + ([self.flat_path(key)] if self.shard_depth else [])
+        removed = 0
+        for path in paths:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                removed += 1
+        if not removed:
+            raise _not_found(key)
+
+    def iter_blobs(self, folder):
+        """
+        Walk the folder's directory with os.scandir, which yields names and types without a stat per file.
+
+        Shard subdirectories are left out of the keys, and unmoved flat files are
+        listed too; a file present in both places is listed twice.
+        """
+        pending = [(self.directories[folder], "", 0)]
+        while pending:
+            directory, prefix, level = pending.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith('.'):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if level < self.shard_depth:
+                                pending.append((entry.path, prefix, level + 1))
+                            else:
+                                pending.append((entry.path, f"{prefix}{entry.name}/", level + 1))
+                        elif entry.is_file(follow_symlinks=False):
+                            yield _LocalBlob(f"{folder}/{prefix}{entry.name}", entry)
+            except FileNotFoundError:
+                continue
+
+    @contextlib.contextmanager
+    def local_copy(self, key):
+        yield self._resolve(_existing, key)
+
+    def shard_flat_files(self, folder, dry_run=False, progress=None):
+        """
+        Move the flat files at the top of one folder into their shard directories.
+
+        Each file is hard-linked into place and then unlinked, which never
+        overwrites: if the sharded path already exists, the file was rewritten
+        after sharding was enabled and the flat copy is stale, so it is only
+        removed. Readers resolve flat paths until the move, so the app can keep
+        running; an interrupted run can simply be repeated.
+
+        Args:
+            folder: 'uploads', 'cssstyles' or 'scripts'
+            dry_run: Only count the files that would be moved
+            progress: Callable taking a ShardResult of the running totals every SHARD_PROGRESS_EVERY files
+
+        Returns:
+            ShardResult(moved, superseded, seconds)
+        """
+        start = time.perf_counter()
+        directory = self.directories[folder]
+        created = set()
+        moved = superseded = 0
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            return ShardResult(0, 0, 0.0)
+        with entries:
+            # Unlinking entries while iterating is safe; new entries are only ever shard subdirectories
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                    continue
+                shard = os.path.join(directory, *shard_path(entry.name, self.shard_depth))
+                target = os.path.join(shard, entry.name)
+                if dry_run:
+                    if os.path.exists(target):
+                        superseded += 1
+                    else:
+                        moved += 1
+                else:
+                    if shard not in created:
+                        os.makedirs(shard, exist_ok=True)
+                        created.add(shard)
+                    try:
+                        os.link(entry.path, target)
+                        moved += 1
+                    except FileExistsError:
+                        superseded += 1
+                    os.remove(entry.path)
+                if progress is not None and (moved + superseded) % SHARD_PROGRESS_EVERY == 0:
+                    progress(ShardResult(moved, superseded, time.perf_counter() - start))
+
+        logging.info(f"Sharded {folder}{' (dry run)' if dry_run else ''}: {moved} moved, {superseded} superseded")
+        return ShardResult(moved, superseded, time.perf_counter() - start)
+
+
+class _ResponseStream(io.RawIOBase):
+    """A readable over a streamed httpx response body."""
+
+    def __init__(self, response):
+        self.response = response
+        self.chunks = response.iter_bytes(CHUNK_SIZE)
+        self.pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self.pending:
+            self.pending = next(self.chunks, b"")
+        count = min(len(buffer), len(self.pending))
+        buffer[:count] = self.pending[:count]
+        self.pending = self.pending[count:]
+        return count
+
+    def close(self):
+        if not self.closed:
+            self.response.close()
+        super().close()
+
+
+class _S3Upload:
+    """Buffers a blob being written, hashing it for the request signature, and PUTs it on close."""
+
+    def __init__(self, storage, key):
+        self.storage = storage
+        self.key = key
+        self.file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE)
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        try:
+            self.file.seek(0)
+            self.storage._put(self.key, self.file, self.size, self.hasher.hexdigest())
+        finally:
+            self.file.close()
+
+    def discard(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class S3Storage(BlobStorage):
+    """
+    Blobs in an S3-compatible bucket, over plain HTTP requests signed with AWS Signature V4.
+
+    Credentials come from AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY. With
+    an endpoint URL (MinIO and other S3-compatible stores) buckets are
+    addressed path-style, otherwise virtual-hosted style on AWS.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=S3_REGION, prefix=S3_PREFIX,
+                 access_key=None, secret_key=None):
+        # Deferred: httpx is a heavy import and only the S3 backend needs it
+        import httpx
+
+        self.bucket = bucket
+        self.region = region
+        self.prefix = prefix
+        self.access_key = access_key or os.environ.get("AWS_ACCESS_KEY_ID", "")
+        self.secret_key = secret_key or os.environ.get("AWS_SECRET_ACCESS_KEY", "")
+        if endpoint_url:
+            self.base_url = endpoint_url.rstrip("/")
+            self.bucket_path = f"/{bucket}"
+        else:
+            self.base_url = f"https://{bucket}.s3.{region}.amazonaws.com"
+            self.bucket_path = ""
+        self.host = urlsplit(self.base_url).netloc
+        self.client = httpx.Client(timeout=30)
+
+    def _signing_key(self, date):
+        key = f"AWS4{self.secret_key}".encode("utf-8")
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+        return key
+
+    def _request(self, method, key=None, query=None, headers=None, content=None, payload_hash=EMPTY_SHA256,
+                 stream=False):
+        path = quote(f"{self.bucket_path}/{self.prefix}{key}" if key is not None else f"{self.bucket_path}/",
+                     safe="/-_.~")
+        query_string = "&".join(f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+                                for name, value in sorted((query or {}).items()))
+        amz_date = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        headers.update({"host": self.host, "x-amz-date": amz_date, "x-amz-content-sha256": payload_hash})
+
+        signed_headers = ";".join(sorted(headers))
+        canonical_request = "\n".join([
+            method, path, query_string,
+            "".join(f"{name}:{headers[name].strip()}\n" for name in sorted(headers)),
+            signed_headers, payload_hash,
+        ])
+        scope = f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256", amz_date, scope, hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        signature = hmac.new(self._signing_key(amz_date[:8]), string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        headers["authorization"] = (f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+                                    f"SignedHeaders={signed_headers}, Signature={signature}")
+
+        url = f"{self.base_url}{path}{'?' + query_string if query_string else ''}"
+        request = self.client.build_request(method, url, headers=headers, content=content)
+        response = self.client.send(request, stream=stream)
+        if response.status_code == 404:
+            response.close()
+            raise _not_found(key)
+        if response.status_code >= 400:
+            detail = response.read()[:200] if stream else response.content[:200]
+            response.close()
+            raise OSError(f"S3 {method} {key or '/'} failed with {response.status_code}: {detail!r}")
+        return response
+
+    def _info(self, key, headers):
+        modified = headers.get("last-modified")
+        return BlobInfo(key, int(headers.get("content-length", 0)),
+                        parsedate_to_datetime(modified).timestamp() if modified else 0.0,
+                        headers.get("etag", "").strip('"'))
+
+    def fetch(self, key, etag=None):
+        """Like open_blob(), but returns None instead of a body if the blob still has this etag."""
+        response = self._request("GET", key, headers={"If-None-Match": f'"{etag}"'} if etag else None, stream=True)
+        if response.status_code == 304:
+            response.close()
+            return None
+        return io.BufferedReader(_ResponseStream(response), CHUNK_SIZE), self._info(key, response.headers)
+
+    def open_blob(self, key):
+        return self.fetch(key)
+
+    def create(self, key):
+        return _S3Upload(self, key)
+
+    def _put(self, key, file, size, payload_hash):
+        headers = {"Content-Length": str(size),
+                   "Content-Type": mimetypes.guess_type(key)[0] or "application/octet-stream"}
+        self._request("PUT", key, headers=headers, payload_hash=payload_hash,
+                      content=iter(lambda: file.read(CHUNK_SIZE), b"")).close()
+
+    def stat(self, key):
+        response = self._request("HEAD", key)
+        return self._info(key, response.headers)
+
+    def delete(self, key):
+        # S3 answers 204 whether or not the key existed
+        self._request("DELETE", key).close()
+
+    def iter_blobs(self, folder):
+        """List the folder a page (up to 1000 keys) at a time; sizes and mtimes come with the listing."""
+        query = {"list-type": "2", "prefix": f"{self.prefix}{folder}/"}
+        while True:
+            root = ElementTree.fromstring(self._request("GET", query=query).content)
+            for item in root.iter(f"{S3_NS}Contents"):
+                yield BlobInfo(item.findtext(f"{S3_NS}Key")[len(self.prefix):], int(item.findtext(f"{S3_NS}Size")),
+                               datetime.fromisoformat(item.findtext(f"{S3_NS}LastModified").replace("Z", "+00:00"))
+                               .timestamp(), (item.findtext(f"{S3_NS}ETag") or "").strip('"'))
+            token = root.findtext(f"{S3_NS}NextContinuationToken")
+            if root.findtext(f"{S3_NS}IsTruncated") != "true" or not token:
+                return
+            query["continuation-token"] = token
+
+
+class _InvalidateOnClose:
+    """Wraps a writable so a cached copy of its key is dropped once the new blob is stored."""
+
+    def __init__(self, stream, invalidate):
+        self.stream = stream
+        self.invalidate = invalidate
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def close(self):
+        self.stream.close()
+        self.invalidate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stream.__exit__(*exc_info)
+        self.invalidate()
+
+
+class ReadThroughCache(BlobStorage):
+    """
+    A remote backend with recently read blobs kept on local disk.
+
+    Each cached blob is a data file plus a metadata file holding its etag;
+    the metadata file's mtime is when the etag was last confirmed. Within
+    ttl seconds a blob is served from disk with no request at all; after
+    that a conditional GET either confirms it (304, no body) or replaces
+    it. Writes and deletes through this instance drop the cached copy at
+    once; other instances see them within ttl. When the cache grows past
+    max_bytes the least recently read blobs are evicted, and blobs over an
+    eighth of max_bytes are streamed without being cached. The directory
+    can be shared by all processes on an instance.
+    """
+
+    def __init__(self, backend, directory=STORAGE_CACHE_DIR, max_bytes=STORAGE_CACHE_MAX_BYTES, ttl=STORAGE_CACHE_TTL):
+        self.backend = backend
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key):
+        path = os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+        return path, f"{path}.meta"
+
+    def _invalidate(self, key):
+        for path in self._paths(key):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def _open_cached(self, key, meta):
+        path, _ = self._paths(key)
+        stream = open(path, "rb")
+        # Reads keep a blob from being evicted
+        os.utime(path)
+        return stream, BlobInfo(key, os.fstat(stream.fileno()).st_size, meta["modified"], meta["etag"])
+
+    def open_blob(self, key):
+        path, meta_path = self._paths(key)
+        try:
+            confirmed = os.stat(meta_path).st_mtime
+            with open(meta_path, "r", encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            meta = None
+        if meta is not None and time.time() - confirmed < self.ttl:
+            with contextlib.suppress(FileNotFoundError):
+                return self._open_cached(key, meta)
+            meta = None
+
+        fetched = self.backend.fetch(key, meta["etag"] if meta else None)
+        if fetched is None:
+            os.utime(meta_path)
+            with contextlib.suppress(FileNotFoundError):
+                return self._open_cached(key, meta)
+            fetched = self.backend.fetch(key)
+
+        stream, info = fetched
+        if info.size > self.max_bytes // 8:
+            return stream, info
+        with stream, _AtomicFile(path) as cached:
+            shutil.copyfileobj(stream, cached, CHUNK_SIZE)
+        with _AtomicFile(meta_path) as meta_file:
+            meta_file.write(json.dumps({"etag": info.etag, "modified": info.modified}).encode("utf-8"))
+        self._evict()
+        return self._open_cached(key, {"etag": info.etag, "modified": info.modified})
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if not entry.name.endswith(".meta") and not entry.name.startswith("."):
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        # Down to three quarters, so a full cache doesn't scan on every miss
+        for _, size, path in sorted(entries):
+            for evicted in (path, f"{path}.meta"):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(evicted)
+            total -= size
+            if total <= self.max_bytes * 3 // 4:
+                break
+
+    def create(self, key):
+        self._invalidate(key)
+        return _InvalidateOnClose(self.backend.create(key), lambda: self._invalidate(key))
+
+    def stat(self, key):
+        return self.backend.stat(key)
+
+    def delete(self, key):
+        try:
+            self.backend.delete(key)
+        finally:
+            self._invalidate(key)
+
+    def iter_blobs(self, folder):
+        return self.backend.iter_blobs(folder)
+
+
+_storage = None
+_storage_pid = None
+_storage_lock = threading.Lock()
+
+
+def _create_storage():
+    from app import app
+
+    if STORAGE_BACKEND == "local":
+        hosted = app.config['HOSTED_FILES_FOLDER']
+        return LocalStorage({
+            "uploads": app.config['UPLOAD_FOLDER'],
+            "cssstyles": os.path.join(hosted, 'cssstyles'),
+            "scripts": os.path.join(hosted, 'scripts'),
+        })
+    if STORAGE_BACKEND == "s3":
+        if not S3_BUCKET:
+            raise ValueError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+        return ReadThroughCache(S3Storage(S3_BUCKET, S3_ENDPOINT_URL))
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+
+def get_storage():
+    """
+    Return this process's blob storage, as configured by STORAGE_BACKEND.
+
+    Created on first use and again after a fork, since the S3 backend's
+    HTTP connection pool must not be shared between processes.
+    """
+    global _storage, _storage_pid
+    with _storage_lock:
+        if _storage is None or _storage_pid != os.getpid():
+            _storage = _create_storage()
+            _storage_pid = os.getpid()
+            logging.debug(f"Using {STORAGE_BACKEND} blob storage")
+        return _storage
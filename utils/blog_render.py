@@ -0,0 +1,126 @@
+from datetime import datetime
+
+# Page rendering for exports: pure string work with no app or database
+# imports, so export worker processes can import it cheaply
+
+def localize_asset_links(html, project, prefix):
+    """
+    Point a page's hosted CSS and JS links at the packaged copies.
+    
+    Args:
+        html: The page HTML
+        project: The project object
+        prefix: Path from the page to the blog root ('' or '../')
+        
+    Returns:
+        The HTML with local asset links
+    """
+    html = html.replace(f'https://ourdomain.com/cssstyles/{project.hosted_css_filename}', f'{prefix}assets/css/blog-styles.css')
+    if project.hosted_js_filename:
+        html = html.replace(f'https://ourdomain.com/scripts/{project.hosted_js_filename}', f'{prefix}assets/js/blog-scripts.js')
+    return html
+
+def render_blog_index(project, blog_posts):
+    """
+    Render the blog homepage listing the given posts.
+    
+    Args:
+        project: The project object
+        blog_posts: Posts to list, in order; each needs id, title, created_at and meta_description
+        
+    Returns:
+        The blog.html content, or None if the project has no blog template
+    """
+    if not project.blog_template_html:
+        return None
+    
+    # Add links to blog posts
+    post_links = ""
+    for post in blog_posts:
+        post_date = post.created_at.strftime("%B %d, %Y") if hasattr(post, 'created_at') else ""
+        post_links += f'''
+                    <div class="blog-post-card">
+                        <h3><a href="posts/{post.id}.html">{post.title}</a></h3>
+                        <p class="post-date">{post_date}</p>
+                        <p class="post-excerpt">{post.meta_description if post.meta_description else ''}</p>
+                        <a href="posts/{post.id}.html" class="btn">Read More</a>
+                    </div>
+                    '''
+    
+    # Replace placeholder with actual post links
+    blog_html = project.blog_template_html.replace('<!-- BLOG_POSTS_PLACEHOLDER -->', post_links)
+    
+    # Fix the CSS and JS links to use local paths
+    return localize_asset_links(blog_html, project, '')
+
+def render_post_page(project, post):
+    """
+    Render one blog post as a complete HTML page for posts/<id>.html.
+    
+    Args:
+        project: The project object
+        post: The blog post object
+        
+    Returns:
+        The post page HTML
+    """
+    # Check if we have a complete HTML document or just content fragment
+    if post.html_content and ('<html' in post.html_content):
+        return localize_asset_links(post.html_content, project, '../')
+    
+    post_date = post.created_at.strftime("%B %d, %Y") if hasattr(post, 'created_at') else ""
+    
+    # We have just the content fragment, not a complete document
+    # Use the post template to create a complete HTML document
+    if project.post_template_html:
+        meta_desc = post.meta_description if post.meta_description else f"Read our blog post about {post.title}"
+        
+        # Start with the template
+        post_html = project.post_template_html
+        
+        # Replace placeholder values with actual content
+        post_html = post_html.replace("{{title}}", post.title)
+        post_html = post_html.replace("{{meta_description}}", meta_desc)
+        post_html = post_html.replace("{{post_date}}", post_date)
+        post_html = post_html.replace("{{content}}", post.html_content or post.content)
+        
+        # Fix the CSS and JS links to use local paths
+        return localize_asset_links(post_html, project, '../')
+    
+    # Fallback to basic HTML if no template is available
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{post.title}</title>
+    <link rel="stylesheet" href="../assets/css/blog-styles.css">
+</head>
+<body>
+    <header class="site-header">
+        <div class="container">
+            <h1 class="site-title">{project.name} Blog</h1>
+            <nav class="site-navigation">
+                <a href="../index.html">Home</a>
+                <a href="../blog.html">Blog</a>
+            </nav>
+        </div>
+    </header>
+
+    <main class="container">
+        <article class="blog-post">
+            <h1 class="post-title">{post.title}</h1>
+            <div class="post-meta">Published on {post_date}</div>
+            <div class="post-content">
+                {post.html_content or post.content}
+            </div>
+        </article>
+    </main>
+
+    <footer class="site-footer">
+        <div class="container">
+            <p>&copy; {datetime.now().year} - All rights reserved</p>
+        </div>
+    </footer>
+</body>
+</html>"""
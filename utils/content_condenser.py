@@ -0,0 +1,243 @@
+import re
+import logging
+import tinycss2
+from collections import Counter
+from bs4 import BeautifulSoup, Comment, Tag
+from utils.html_analyzer import extract_colors
+
+# Elements that carry no design or business information for the analysis model
+DROPPED_TAGS = ['script', 'style', 'svg', 'noscript', 'iframe', 'template', 'canvas', 'link']
+
+# Properties worth summarising by frequency
+SUMMARY_PROPERTIES = (
+    'color', 'background', 'background-color', 'border-color', 'font-family',
+    'font-size', 'font-weight', 'line-height', 'border-radius', 'box-shadow',
+    'max-width', 'padding', 'margin', 'gap'
+)
+
+MAX_TEXT_LENGTH = 80
+MAX_CLASSES = 4
+MAX_REPEATED_SIBLINGS = 2
+MAX_SUMMARY_DECLARATIONS = 40
+
+
+def _node_label(tag):
+    """Return a compact selector-style label for a tag, e.g. nav#main.navbar.dark"""
+    label = tag.name
+    if tag.get('id'):
+        label += f"#{tag['id']}"
+    classes = tag.get('class') or []
+    for class_name in classes[:MAX_CLASSES]:
+        label += f".{class_name}"
+    if len(classes) > MAX_CLASSES:
+        label += "…"
+    for attribute in ('role', 'href', 'alt', 'type'):
+        if tag.get(attribute):
+            label += f'[{attribute}="{str(tag[attribute])[:40]}"]'
+    return label
+
+
+def _short_text(text):
+    """Collapse whitespace and clip a text node."""
+    text = re.sub(r'\s+', ' ', text).strip()
+    if len(text) > MAX_TEXT_LENGTH:
+        text = text[:MAX_TEXT_LENGTH].rstrip() + "…"
+    return text
+
+
+def _head_lines(soup):
+    """Collect the title and distinct meta contents, which carry the business context."""
+    lines = []
+    if soup.title and soup.title.string:
+        lines.append(f'title: "{_short_text(soup.title.string)}"')
+
+    seen = set()
+    for meta in soup.find_all('meta'):
+        name = meta.get('name') or meta.get('property')
+        content = meta.get('content')
+        if not name or not content or content in seen or name == 'viewport':
+            continue
+        seen.add(content)
+        lines.append(f'meta {name}: "{_short_text(content)}"')
+    return lines
+
+
+def _signature(tag):
+    """Structural signature used to fold repeated siblings (cards, list items, ...)."""
+    return (tag.name, tuple(tag.get('class') or []))
+
+
+def _skeleton_lines(tag, depth, lines):
+    """Append an indented outline of the tag's element children to lines."""
+    indent = "  " * depth
+    previous_signature = None
+    repeats = 0
+
+    for child in tag.children:
+        if isinstance(child, Comment):
+            continue
+
+        if isinstance(child, Tag):
+            signature = _signature(child)
+            if signature == previous_signature:
+                repeats += 1
+                if repeats >= MAX_REPEATED_SIBLINGS:
+                    continue
+            else:
+                if repeats >= MAX_REPEATED_SIBLINGS:
+                    lines.append(f"{indent}(+{repeats - MAX_REPEATED_SIBLINGS + 1} more like above)")
+                previous_signature = signature
+                repeats = 0
+
+            lines.append(f"{indent}{_node_label(child)}")
+            _skeleton_lines(child, depth + 1, lines)
+        else:
+            text = _short_text(str(child))
+            if text:
+                lines.append(f'{indent}"{text}"')
+
+    if repeats >= MAX_REPEATED_SIBLINGS:
+        lines.append(f"{indent}(+{repeats - MAX_REPEATED_SIBLINGS + 1} more like above)")
+
+
+def condense_html(html_content):
+    """
+    Produce a compact structural skeleton of an HTML document.
+
+    Scripts, styles, inline SVGs and comments are dropped, text is clipped,
+    and runs of structurally identical siblings are folded.
+
+    Args:
+        html_content: The HTML source
+
+    Returns:
+        The skeleton as indented text, one element per line
+    """
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    lines = _head_lines(soup)
+
+    for element in soup.find_all(DROPPED_TAGS):
+        element.decompose()
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+
+    body = soup.body or soup
+    lines.append(_node_label(body) if body is not soup else "body")
+    _skeleton_lines(body, 1, lines)
+
+    return "\n".join(lines)
+
+
+def _is_vendor_prefixed(name):
+    """True for -webkit-/-moz-/... names, but not for custom properties (--foo)."""
+    return name.startswith('-') and not name.startswith('--')
+
+
+def _declarations(rule_content):
+    """Return (property, value) pairs from a rule body, without vendor prefixes."""
+    declarations = []
+    for item in tinycss2.parse_declaration_list(rule_content, skip_comments=True, skip_whitespace=True):
+        if item.type != 'declaration' or _is_vendor_prefixed(item.lower_name):
+            continue
+        value = tinycss2.serialize(item.value).strip()
+        if _is_vendor_prefixed(value):
+            continue
+        if item.important:
+            value += " !important"
+        declarations.append((item.lower_name, re.sub(r'\s+', ' ', value)))
+    return declarations
+
+
+def _collect_rules(rules, context, merged, frequency):
+    """Merge qualified rules by (context, selector) and count declarations."""
+    for rule in rules:
+        if rule.type == 'qualified-rule':
+            selector = re.sub(r'\s+', ' ', tinycss2.serialize(rule.prelude)).strip()
+            if _is_vendor_prefixed(selector.lstrip(':')) or '::-' in selector:
+                continue
+            declarations = merged.setdefault((context, selector), {})
+            for name, value in _declarations(rule.content):
+                declarations[name] = value
+                frequency[(name, value)] += 1
+        elif rule.type == 'at-rule' and rule.content is not None:
+            if rule.lower_at_keyword in ('media', 'supports', 'layer', 'container'):
+                prelude = re.sub(r'\s+', ' ', tinycss2.serialize(rule.prelude)).strip()
+                nested = tinycss2.parse_rule_list(rule.content, skip_comments=True, skip_whitespace=True)
+                _collect_rules(nested, f"{context} @{rule.lower_at_keyword} {prelude}".strip(), merged, frequency)
+            # @keyframes, @font-face and vendor at-rules are animation/loading detail; skip them
+
+
+def condense_css(css_content):
+    """
+    Produce a de-duplicated, comment-free summary of a stylesheet.
+
+    Rules with the same selector are merged, identical declaration blocks are
+    grouped under one selector list, vendor prefixes and keyframes are dropped,
+    and the most frequent design-relevant declarations are listed first.
+
+    Args:
+        css_content: The CSS source
+
+    Returns:
+        The summary as CSS text, one rule per line
+    """
+    rules = tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True)
+
+    merged = {}
+    frequency = Counter()
+    _collect_rules(rules, "", merged, frequency)
+
+    # Group selectors that share an identical declaration block
+    grouped = {}
+    for (context, selector), declarations in merged.items():
+        if not declarations:
+            continue
+        body = "; ".join(f"{name}: {value}" for name, value in declarations.items())
+        grouped.setdefault((context, body), []).append(selector)
+
+    lines = []
+
+    palette = extract_colors(css_content).get('palette', [])
+    if palette:
+        lines.append(f"/* palette by frequency: {', '.join(palette)} */")
+
+    summary = [
+        f"{name}: {value} ×{count}"
+        for (name, value), count in frequency.most_common()
+        if name in SUMMARY_PROPERTIES
+    ][:MAX_SUMMARY_DECLARATIONS]
+    if summary:
+        lines.append(f"/* most used declarations: {'; '.join(summary)} */")
+
+    for (context, body), selectors in grouped.items():
+        rule = f"{', '.join(selectors)} {{ {body} }}"
+        lines.append(f"{context} {{ {rule} }}" if context else rule)
+
+    return "\n".join(lines)
+
+
+def condense_for_analysis(html_content, css_content):
+    """
+    Condense HTML and CSS for the analysis prompt, falling back to the raw sources on error.
+
+    Args:
+        html_content: The HTML source
+        css_content: The CSS source
+
+    Returns:
+        Tuple of (condensed_html, condensed_css)
+    """
+    try:
+        condensed_html = condense_html(html_content)
+    except Exception as e:
+        logging.error(f"Error condensing HTML: {str(e)}")
+        condensed_html = html_content
+
+    try:
+        condensed_css = condense_css(css_content)
+    except Exception as e:
+        logging.error(f"Error condensing CSS: {str(e)}")
+        condensed_css = css_content
+
+    return condensed_html, condensed_css
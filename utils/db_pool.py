@@ -0,0 +1,108 @@
+import os
+import time
+import weakref
+import logging
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+from utils.metrics import counter, gauge, histogram
+from utils.request_metrics import current_request_stats, add_stage_time
+
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+pool_wait = histogram(
+    "db_pool_wait_seconds", "Time to check a connection out of the pool, including any wait for a free one",
+    ("endpoint",), buckets=WAIT_BUCKETS)
+pool_timeouts = counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT seconds", ("endpoint",))
+
+# Every instrumented pool in this process; engine.dispose() replaces a pool, so hold them weakly
+_pools = weakref.WeakSet()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records checkout wait time and logs checkout timeouts with the route."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+
+    def connect(self):
+        stats = current_request_stats()
+        endpoint = stats.endpoint if stats is not None else "none"
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            pool_timeouts.inc(endpoint=endpoint)
+            logging.error(
+                f"Database pool timeout in {endpoint}"
+                f"{f' ({stats.method} {stats.path})' if stats is not None else ''}: {self.status()}"
+            )
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            pool_wait.observe(waited, endpoint=endpoint)
+            add_stage_time("db_pool_wait", waited)
+
+
+def _pool_stat(read):
+    """Gauge callback summing one statistic over this process's pools."""
+    def callback():
+        return [({}, sum(read(pool) for pool in list(_pools)))]
+    return callback
+
+
+gauge("db_pool_size", "Connections the pool keeps open", callback=_pool_stat(lambda pool: pool.size()))
+gauge("db_pool_checked_out", "Connections currently checked out of the pool", callback=_pool_stat(lambda pool: pool.checkedout()))
+gauge("db_pool_idle", "Open connections waiting in the pool", callback=_pool_stat(lambda pool: pool.checkedin()))
+gauge("db_pool_overflow", "Connections open beyond the pool size (negative while the pool is still filling)",
+      callback=_pool_stat(lambda pool: pool.overflow()))
+
+
+def engine_options(database_url):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* environment variables.
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW and DB_POOL_TIMEOUT (seconds, may be fractional) keep
+    the SQLAlchemy defaults of 5, 10 and 30 unless set. Each gunicorn worker
+    has its own pool, so workers x (size + overflow) must stay below the
+    database's connection limit. DB_POOL_PRE_PING (default true) tests each connection
+    on checkout; turn it off to save a round trip per request where idle
+    connections are not dropped, relying on DB_POOL_RECYCLE (default 300 s).
+
+    Args:
+        database_url: The SQLAlchemy database URL
+
+    Returns:
+        Dictionary of create_engine() options
+    """
+    options = {
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes", "on"),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "300")),
+    }
+
+    # In-memory SQLite uses a single static connection, which has no pool to size
+    if not database_url or database_url in ("sqlite://", "sqlite:///:memory:"):
+        return options
+
+    options["poolclass"] = InstrumentedQueuePool
+    for name, option, cast in (
+        ("DB_POOL_SIZE", "pool_size", int),
+        ("DB_MAX_OVERFLOW", "max_overflow", int),
+        ("DB_POOL_TIMEOUT", "pool_timeout", float),
+    ):
+        if os.environ.get(name):
+            options[option] = cast(os.environ[name])
+    return options
+
+
+def release_connection():
+    """
+    End the current transaction and return its connection to the pool.
+
+    Call this before slow network I/O such as LLM calls, after copying what
+    the rest of the request needs out of the loaded objects: they are detached
+    afterwards, so re-query any row that has to be updated.
+    """
+    from app import db
+    db.session.close()
@@ -0,0 +1,217 @@
+import os
+import zlib
+import time
+import logging
+import zipfile
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; .br siblings are skipped without it
+    brotli = None
+
+# ZIP entry compression for text files: deflate (default, opens everywhere), zstd
+# (Python 3.14+, smaller and faster but needs a recent unzip tool) or store
+EXPORT_COMPRESSION = os.environ.get("EXPORT_COMPRESSION", "deflate").lower()
+EXPORT_COMPRESSION_LEVEL = os.environ.get("EXPORT_COMPRESSION_LEVEL")
+# Precompressed siblings to add next to served text files: any of gz, br
+EXPORT_PRECOMPRESS = tuple(
+    encoding.strip() for encoding in os.environ.get("EXPORT_PRECOMPRESS", "").lower().split(",") if encoding.strip()
+)
+
+DEFAULT_LEVELS = {"deflate": 6, "zstd": 3}
+
+# Already-compressed formats gain nothing from another pass; store them as is
+STORED_EXTENSIONS = frozenset((
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".ico", ".woff", ".woff2",
+    ".zip", ".gz", ".br", ".zst", ".mp3", ".mp4", ".webm", ".pdf",
+))
+# Files a static host serves and can send precompressed
+PRECOMPRESS_EXTENSIONS = frozenset((".html", ".css", ".js", ".xml", ".svg", ".json", ".txt"))
+# Below this a .gz/.br sibling saves less than its own request overhead
+PRECOMPRESS_MIN_SIZE = 1024
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# One entry prepared ahead of time, possibly in another process: its uncompressed bytes,
+# the ZIP method zipfile compresses them with when adding it, and its compressed siblings
+CompressedEntry = namedtuple("CompressedEntry", ["data", "compress_type", "siblings"])
+
+
+def zip_method(compression):
+    """Return the zipfile constant for a compression name, falling back to deflate where unsupported."""
+    if compression == "store":
+        return zipfile.ZIP_STORED
+    if compression == "deflate":
+        return zipfile.ZIP_DEFLATED
+    if compression == "zstd":
+        method = getattr(zipfile, "ZIP_ZSTANDARD", None)
+        if method is None:
+            logging.warning("zstd ZIP entries need Python 3.14 or later; using deflate")
+            return zipfile.ZIP_DEFLATED
+        return method
+    raise ValueError(f"Unknown export compression: {compression}")
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+class _SiblingCompressors:
+    """Incremental gzip and brotli compressors producing a file's .gz and .br siblings."""
+
+    def __init__(self, encodings):
+        self.compressors = {}
+        if "gz" in encodings:
+            # wbits 31 writes a gzip container; its header has no timestamp, so output is reproducible
+            self.compressors["gz"] = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        if "br" in encodings and brotli is not None:
+            self.compressors["br"] = brotli.Compressor(quality=BROTLI_QUALITY)
+        self.chunks = {encoding: [] for encoding in self.compressors}
+
+    def update(self, data):
+        for encoding, compressor in self.compressors.items():
+            chunk = compressor.compress(data) if encoding == "gz" else compressor.process(data)
+            if chunk:
+                self.chunks[encoding].append(chunk)
+
+    def finish(self):
+        """Return {encoding: compressed bytes}."""
+        for encoding, compressor in self.compressors.items():
+            self.chunks[encoding].append(compressor.flush() if encoding == "gz" else compressor.finish())
+        return {encoding: b"".join(chunks) for encoding, chunks in self.chunks.items()}
+
+
+def compress_entry(path, data, method, level, precompress=()):
+    """
+    Prepare one entry's bytes the way CompressedPackage would, without a ZIP file.
+
+    Pure and picklable, so export workers can produce the .gz and .br
+    siblings in parallel when precompress is set. The entry itself is only
+    compressed by zipfile when it is added, in the process writing the
+    package, since zipfile has no public API for writing precompressed
+    data; without siblings this does no compression at all.
+
+    Args:
+        path: Entry path, used for the per-extension policy
+        data: The entry's uncompressed bytes
+        method: The package's zipfile compression constant
+        level: The package's compression level (applied when the entry is added)
+        precompress: Encodings of sibling files to produce
+
+    Returns:
+        CompressedEntry
+    """
+    if _extension(path) in STORED_EXTENSIONS:
+        method = zipfile.ZIP_STORED
+
+    siblings = {}
+    if precompress and _extension(path) in PRECOMPRESS_EXTENSIONS and len(data) >= PRECOMPRESS_MIN_SIZE:
+        compressors = _SiblingCompressors(precompress)
+        compressors.update(data)
+        siblings = compressors.finish()
+    return CompressedEntry(data, method, siblings)
+
+
+class _StreamedEntry:
+    """A ZIP entry being streamed; siblings are compressed alongside and added when it closes."""
+
+    def __init__(self, package, path, output, siblings):
+        self.package = package
+        self.path = path
+        self.output = output
+        self.siblings = siblings
+        self.size = 0
+
+    def write(self, data):
+        self.output.write(data)
+        self.size += len(data)
+        if self.siblings is not None:
+            self.siblings.update(data)
+
+    def close(self):
+        if self.output.closed:
+            return
+        self.output.close()
+        if self.siblings is not None and self.size >= PRECOMPRESS_MIN_SIZE:
+            self.package._add_siblings(self.path, self.siblings.finish())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class CompressedPackage:
+    """
+    Writes ZIP entries with a per-entry compression policy.
+
+    Text entries use the configured method and level; already-compressed
+    assets are stored. With precompress, served text files of at least
+    PRECOMPRESS_MIN_SIZE bytes also get .gz and/or .br siblings (stored,
+    since they are compressed already) that static hosts can send as is.
+
+    Entries are compressed by zipfile as they are added, so the package's
+    own compression is serial; only sibling compression can be prepared
+    in other processes (see compress_entry()).
+    """
+
+    def __init__(self, file, compression=None, level=None, precompress=None):
+        compression = (compression or EXPORT_COMPRESSION).lower()
+        if level is None:
+            level = int(EXPORT_COMPRESSION_LEVEL) if EXPORT_COMPRESSION_LEVEL else DEFAULT_LEVELS.get(compression)
+        self.precompress = tuple(EXPORT_PRECOMPRESS if precompress is None else precompress)
+        if "br" in self.precompress and brotli is None:
+            logging.warning("brotli is not installed; skipping .br files in the export")
+        method = zip_method(compression)
+        if method == zipfile.ZIP_DEFLATED and level is not None and not 0 <= level <= 9:
+            # A zstd level after falling back to deflate
+            level = DEFAULT_LEVELS["deflate"]
+        self.zip = zipfile.ZipFile(file, "w", compression=method,
+                                   compresslevel=level if method != zipfile.ZIP_STORED else None)
+
+    def _wants_siblings(self, path):
+        return bool(self.precompress) and _extension(path) in PRECOMPRESS_EXTENSIONS
+
+    def _add_siblings(self, path, compressed):
+        for encoding, data in compressed.items():
+            self.zip.writestr(f"{path}.{encoding}", data, compress_type=zipfile.ZIP_STORED)
+
+    @property
+    def policy(self):
+        """(method, level, precompress) for compress_entry() in worker processes."""
+        return self.zip.compression, self.zip.compresslevel, self.precompress
+
+    def writestr(self, path, data):
+        """Add a whole entry (str or bytes) under path."""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.add_entry(path, compress_entry(path, data, *self.policy))
+
+    def add_entry(self, path, entry):
+        """Add an entry prepared by compress_entry(), and its siblings."""
+        self.zip.writestr(path, entry.data, compress_type=entry.compress_type)
+        self._add_siblings(path, entry.siblings)
+
+    def open(self, path):
+        """Return a binary file that streams an entry under path; only one may be open at a time."""
+        if _extension(path) in STORED_EXTENSIONS:
+            # Same timestamp and permissions zipfile gives a name, but stored
+            entry = zipfile.ZipInfo(path, time.localtime(time.time())[:6])
+            entry.external_attr = 0o600 << 16
+            entry.compress_type = zipfile.ZIP_STORED
+        else:
+            entry = path
+        siblings = _SiblingCompressors(self.precompress) if self._wants_siblings(path) else None
+        return _StreamedEntry(self, path, self.zip.open(entry, "w"), siblings)
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,154 @@
+import os
+import logging
+import threading
+import multiprocessing
+from itertools import chain
+from collections import deque
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from utils.blog_render import render_post_page
+from utils.export_compression import compress_entry
+
+# Processes compressing post pages' .gz/.br siblings for large exports; 1 does it in the calling thread.
+# Every web worker starts its own pool, so the default stays small whatever the core count
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS") or min(2, os.cpu_count() or 1))
+# Below this many posts, starting work in other processes costs more than it saves
+EXPORT_PARALLEL_MIN_POSTS = int(os.environ.get("EXPORT_PARALLEL_MIN_POSTS", "500"))
+# Posts per task: enough to amortize pickling, few enough to keep every worker busy to the end
+SHARD_SIZE = 100
+
+# What render_post_page() reads, copied out of ORM objects so they can be pickled
+PROJECT_FIELDS = ("id", "name", "post_template_html", "hosted_css_filename", "hosted_js_filename")
+POST_FIELDS = ("id", "title", "meta_description", "content", "html_content", "created_at")
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _snapshot(obj, fields):
+    # Only attributes the object has, since render_post_page() checks hasattr(post, 'created_at')
+    return SimpleNamespace(**{name: getattr(obj, name) for name in fields if hasattr(obj, name)})
+
+
+def _render_shard(project, shard, policy):
+    """
+    Render one shard of posts; runs in a worker process.
+
+    Args:
+        project: Project snapshot
+        shard: List of (entry path, post snapshot)
+        policy: (method, level, precompress) to compress with, or None for raw bytes
+
+    Returns:
+        List of CompressedEntry, or of bytes without a policy, in shard order
+    """
+    results = []
+    for path, post in shard:
+        data = render_post_page(project, post).encode("utf-8")
+        results.append(compress_entry(path, data, *policy) if policy is not None else data)
+    return results
+
+
+def _get_executor():
+    """Return this process's export worker pool, starting it on first use and again after a fork."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            # Workers come from a fork server rather than a copy of this process, with its
+            # database connections and threads; they only import the render modules
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                context.set_forkserver_preload(["utils.export_engine"])
+            _executor = ProcessPoolExecutor(max_workers=EXPORT_WORKERS, mp_context=context)
+            _executor_pid = os.getpid()
+            logging.debug(f"Started export pool with {EXPORT_WORKERS} workers")
+        return _executor
+
+
+def _discard_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _shards(posts, path_template):
+    """Yield (posts, shard) pairs of up to SHARD_SIZE posts, snapshotting lazily."""
+    batch = []
+    for post in posts:
+        batch.append(post)
+        if len(batch) == SHARD_SIZE:
+            yield batch, [(path_template.format(post.id), _snapshot(post, POST_FIELDS)) for post in batch]
+            batch = []
+    if batch:
+        yield batch, [(path_template.format(post.id), _snapshot(post, POST_FIELDS)) for post in batch]
+
+
+def render_posts(project, posts, path_template, policy=None):
+    """
+    Render post pages, compressing their siblings in parallel across processes for large exports.
+
+    Rendering is a few template substitutions and the ZIP entries themselves
+    are compressed serially as the package adds them (see CompressedPackage),
+    so the only work worth moving to other processes is a policy's .gz/.br
+    siblings. With such a policy, posts are split into shards of SHARD_SIZE
+    and rendered, along with their siblings, by a process pool; results
+    come back in the order of posts whatever order the shards finish in,
+    so the output is the same as rendering serially. At most two shards
+    per worker are in flight, which bounds memory for very large blogs.
+    Without siblings to produce, with fewer than EXPORT_PARALLEL_MIN_POSTS
+    posts, or with a single worker, posts render in the calling thread. If
+    the pool dies, the remaining shards render serially.
+
+    Args:
+        project: The project object
+        posts: Blog post objects, in output order
+        path_template: Entry path with {} for the post id, e.g. 'blog/posts/{}.html'
+        policy: CompressedPackage.policy to prepare entries for that package,
+            or None to yield the rendered page bytes
+
+    Yields:
+        (post, path, result) where result is a CompressedEntry or bytes
+    """
+    project_snapshot = _snapshot(project, PROJECT_FIELDS)
+    shards = _shards(posts, path_template)
+    size = len(posts) if hasattr(posts, "__len__") else None
+
+    executor = None
+    # Pickling pages to and from workers costs more than rendering them; only siblings pay for it
+    has_siblings = policy is not None and bool(policy[2])
+    if has_siblings and EXPORT_WORKERS > 1 and size is not None and size >= EXPORT_PARALLEL_MIN_POSTS:
+        executor = _get_executor()
+
+    pending = deque()
+
+    def submit():
+        shard = next(shards, None)
+        if shard is not None:
+            pending.append((shard, executor.submit(_render_shard, project_snapshot, shard[1], policy)))
+
+    if executor is not None:
+        for _ in range(EXPORT_WORKERS * 2):
+            submit()
+        while pending:
+            (batch, shard), future = pending.popleft()
+            try:
+                results = future.result()
+            except BrokenProcessPool:
+                logging.exception("Export pool failed; rendering the rest of this export serially")
+                _discard_executor(executor)
+                # Shards already submitted go back in front of the ones not yet taken
+                shards = chain([(batch, shard)], [item for item, _ in pending], shards)
+                pending.clear()
+                break
+            submit()
+            for post, (path, _), result in zip(batch, shard, results):
+                yield post, path, result
+
+    for batch, shard in shards:
+        for post, (path, _), result in zip(batch, shard, _render_shard(project_snapshot, shard, policy)):
+            yield post, path, result
@@ -0,0 +1,126 @@
+import os
+import time
+import bisect
+import hashlib
+import logging
+from array import array
+from collections import namedtuple
+from sqlalchemy import select
+from app import db
+from models import Project
+from utils.blob_storage import GC_GRACE_PERIOD, get_storage
+
+# Blob storage folders the collector cleans
+GC_FOLDERS = ("uploads", "cssstyles", "scripts")
+
+GCResult = namedtuple("GCResult", ["scanned", "referenced", "recent", "deleted", "freed_bytes", "seconds"])
+
+
+def _key(folder, name):
+    """64-bit hash of a file name within one of the collected folders."""
+    return int.from_bytes(hashlib.blake2b(f"{folder}/{name}".encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class ReferenceSet:
+    """
+    Membership test over the file names projects refer to, at 8 bytes per name.
+
+    Names are kept as a sorted array of 64-bit hashes rather than a set of
+    path strings. A hash collision can only make an orphan look referenced,
+    so it is kept; a referenced file is never deleted because of one.
+    """
+
+    def __init__(self, keys):
+        self.keys = array("Q", sorted(keys))
+
+    def __contains__(self, key):
+        index = bisect.bisect_left(self.keys, key)
+        return index < len(self.keys) and self.keys[index] == key
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def collect_references(batch_size=1000):
+    """Stream every project's file references from the database into a ReferenceSet."""
+    keys = array("Q")
+    rows = db.session.execute(
+        select(Project.html_file_path, Project.css_file_path, Project.hosted_css_filename, Project.hosted_js_filename)
+        .execution_options(yield_per=batch_size)
+    )
+    for html_path, css_path, css_filename, js_filename in rows:
+        # Uploads are keys or (before blob storage) absolute paths from any working directory; names are unique
+        for folder, name in (("uploads", html_path), ("uploads", css_path),
+                             ("cssstyles", css_filename), ("scripts", js_filename)):
+            if name:
+                keys.append(_key(folder, os.path.basename(name)))
+    return ReferenceSet(keys)
+
+
+def collect_garbage(grace_period=None, dry_run=False, max_rate=None, references=None):
+    """
+    Delete uploaded and hosted files that no project refers to.
+
+    References are read first, then the uploads, cssstyles and scripts
+    folders of blob storage are listed: on local disk with os.scandir,
+    stat'ing only unreferenced files; on S3 a page of keys, sizes and
+    mtimes per request. Files modified within the grace period are kept
+    even when unreferenced, which also covers files saved after the
+    references were read.
+
+    Args:
+        grace_period: Minimum age in seconds of a file to delete; GC_GRACE_PERIOD by default
+        dry_run: Only log and count what would be deleted
+        max_rate: Maximum deletions per second, to limit I/O load; unlimited if None
+        references: ReferenceSet to use instead of reading the database
+
+    Returns:
+        GCResult(scanned, referenced, recent, deleted, freed_bytes, seconds); in a
+        dry run, deleted and freed_bytes count what would have been deleted
+    """
+    start = time.perf_counter()
+    grace_period = GC_GRACE_PERIOD if grace_period is None else grace_period
+    if references is None:
+        references = collect_references()
+    cutoff = time.time() - grace_period
+    interval = 1 / max_rate if max_rate else 0
+    next_delete = time.monotonic()
+
+    storage = get_storage()
+    scanned = referenced = recent = deleted = freed_bytes = 0
+    for folder in GC_FOLDERS:
+        for blob in storage.iter_blobs(folder):
+            scanned += 1
+            if _key(folder, os.path.basename(blob.key)) in references:
+                referenced += 1
+                continue
+            try:
+                size, modified = blob.size, blob.modified
+            except FileNotFoundError:
+                continue
+            if modified > cutoff:
+                recent += 1
+                continue
+
+            if dry_run:
+                logging.info(f"Would delete {blob.key} ({size} bytes)")
+            else:
+                if interval:
+                    now = time.monotonic()
+                    if next_delete > now:
+                        time.sleep(next_delete - now)
+                    next_delete = max(next_delete, now) + interval
+                try:
+                    storage.delete(blob.key)
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logging.warning(f"Could not remove {blob.key}: {str(e)}")
+                    continue
+            deleted += 1
+            freed_bytes += size
+
+    result = GCResult(scanned, referenced, recent, deleted, freed_bytes, time.perf_counter() - start)
+    logging.info(f"File GC{' (dry run)' if dry_run else ''}: {scanned} scanned, {referenced} referenced, "
+                 f"{recent} within the grace period, {deleted} deleted ({freed_bytes} bytes)")
+    return result
@@ -1,46 +1,61 @@
 
 import os
 import io
-import uuid
+import shutil
 import time
-import zipfile
 import logging
 import re
-from datetime import datetime
-from werkzeug.utils import secure_filename
-from app import app
+import math
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape as xml_escape
+from sqlalchemy import select, func
+from app import db
+from models import BlogPost
+from utils.export_compression import CompressedPackage
+from utils.export_engine import render_posts
+from utils.blob_storage import get_storage
+from utils.upload_ingest import ingest_upload
+from utils.blog_render import localize_asset_links, render_blog_index, render_post_page  # noqa: F401
 from flask import url_for, request
 
+# The sitemap protocol's per-file URL limit; larger blogs get a sitemap index
+SITEMAP_MAX_URLS = 50000
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+FEED_SIZE = 20
+
 def save_uploaded_file(file, file_type):
     """
-    Save an uploaded file to the uploads directory.
+    Save an uploaded file to blob storage under uploads/, named by its content hash.
     
     Args:
         file: The uploaded file object
         file_type: The type of file (html, css, etc.)
         
     Returns:
-        The path to the saved file
+        The storage key of the saved file, e.g. 'uploads/<sha256>.html'; see
+        ingest_upload() for the hash, size and decoded text as well
     """
     try:
-        # Create a secure filename
-        filename = secure_filename(file.filename)
-        
-        # Add a timestamp and unique ID to avoid overwriting files
-        unique_filename = f"{int(time.time())}_{uuid.uuid4().hex}_{filename}"
-        
-        # Create the full path
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        
-        # Save the file
-        file.save(file_path)
-        
-        return file_path
+        return ingest_upload(file, file_type).key
     
     except Exception as e:
         logging.error(f"Error saving uploaded file: {str(e)}")
         raise e
 
+def upload_key(html_or_css_file_path):
+    """
+    Return the storage key of a project's uploaded file.
+    
+    Projects saved before blob storage hold absolute paths into the then
+    flat uploads folder; file names are unique (a content hash, or before
+    that a timestamp and random id), so both forms map to uploads/<name>,
+    which local storage finds in its shard directory or, until
+    shard_files.py has moved it, at the old flat path. Projects that
+    uploaded identical files share one key.
+    """
+    return f"uploads/{os.path.basename(html_or_css_file_path)}"
+
 def generate_unique_filename(project_id, original_filename, file_type):
     """
     Generate a unique filename for a hosted file.
@@ -79,12 +94,8 @@ def save_hosted_file(content, filename, file_type):
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
         
-        # Create the full path
-        file_path = os.path.join(app.config['HOSTED_FILES_FOLDER'], folder, filename)
-        
         # Save the file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+        get_storage().write_text(f"{folder}/{filename}", content)
         
         # Return the URL
         return f"https://{request.host}/hosted_files/{folder}/{filename}"
@@ -95,28 +106,24 @@ def save_hosted_file(content, filename, file_type):
 
 def copy_css_to_hosted(css_file_path, hosted_css_filename):
     """
-    Copy a CSS file from uploads to the hosted_files/cssstyles directory.
+    Copy an uploaded CSS file to the hosted cssstyles folder.
     
     Args:
-        css_file_path: The path to the source CSS file
+        css_file_path: The uploaded CSS file's key (or pre-storage path)
         hosted_css_filename: The filename for the hosted CSS file
         
     Returns:
-        The full path to the hosted CSS file
+        The storage key of the hosted CSS file
     """
     try:
-        # Create the full path for the hosted CSS file
-        hosted_css_path = os.path.join(app.config['HOSTED_FILES_FOLDER'], 'cssstyles', hosted_css_filename)
-        
-        # Read the original CSS file
-        with open(css_file_path, 'r', encoding='utf-8') as source_file:
-            css_content = source_file.read()
+        storage = get_storage()
+        hosted_css_key = f"cssstyles/{hosted_css_filename}"
         
-        # Write to the hosted CSS file
-        with open(hosted_css_path, 'w', encoding='utf-8') as dest_file:
-            dest_file.write(css_content)
+        # Stream the upload into the hosted file
+        with storage.open(upload_key(css_file_path)) as source_file, storage.create(hosted_css_key) as dest_file:
+            shutil.copyfileobj(source_file, dest_file)
         
-        return hosted_css_path
+        return hosted_css_key
     
     except Exception as e:
         logging.error(f"Error copying CSS to hosted directory: {str(e)}")
@@ -124,41 +131,277 @@ def copy_css_to_hosted(css_file_path, hosted_css_filename):
         
 def save_content_to_hosted_file(content_string, filename, folder_name):
     """
-    Save a string content to a file in the specified hosted_files subfolder.
+    Save a string content to a file in the specified hosted folder.
     
     Args:
         content_string: The string content to save
         filename: The filename to use
-        folder_name: The subfolder name (e.g., 'cssstyles', 'scripts')
+        folder_name: The hosted folder name (e.g., 'cssstyles', 'scripts')
         
     Returns:
-        The full path to the saved file
+        The storage key of the saved file
     """
     try:
-        # Ensure the folder exists
-        folder_path = os.path.join(app.config.get('HOSTED_FILES_FOLDER', 'static/hosted_files'), folder_name)
-        os.makedirs(folder_path, exist_ok=True)
-        
-        # Create the full path
-        file_path = os.path.join(folder_path, filename)
+        key = f"{folder_name}/{filename}"
+        get_storage().write_text(key, content_string)
         
-        # Write the content to the file
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(content_string)
-        
-        return file_path
+        return key
     
     except Exception as e:
         logging.error(f"Error saving content to hosted file: {str(e)}")
         raise e
 
-def create_download_package(project, blog_posts):
+def hosted_asset_key(project, file_type):
+    """
+    Return the storage key of the project's hosted CSS or JS file, or None if it has none.
+    
+    Args:
+        project: The project object
+        file_type: 'css' or 'js'
+    """
+    filename = project.hosted_css_filename if file_type == 'css' else project.hosted_js_filename
+    if not filename:
+        return None
+    folder = 'cssstyles' if file_type == 'css' else 'scripts'
+    return f"{folder}/{filename}"
+
+def read_blog_stylesheet(project):
+    """Return the blog CSS for the package: the project's generated stylesheet, or ''."""
+    css_key = hosted_asset_key(project, 'css')
+    if css_key:
+        try:
+            return get_storage().read_text(css_key)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Error reading hosted CSS file: {str(e)}")
+            # If we can't read the generated CSS, fall back to a basic one
+            return """
+                        /* Basic fallback stylesheet */
+                        body {
+                            font-family: sans-serif;
+                            font-size: 16px;
+                            line-height: 1.6;
+                            color: #333;
+                            margin: 0;
+                            padding: 0;
+                        }
+                        """
+    return ""
+
+def read_blog_script(project):
+    """Return the blog JS for the package: the project's hosted script, or ''."""
+    js_key = hosted_asset_key(project, 'js')
+    if js_key:
+        try:
+            return get_storage().read_text(js_key)
+        except:
+            pass
+    return ""
+
+def sitemap_paths(url_count, max_urls=SITEMAP_MAX_URLS):
+    """
+    Return the sitemap files written for url_count URLs.
+    
+    Up to max_urls URLs fit in sitemap.xml itself; above that, sitemap.xml
+    is an index of sitemap-1.xml, sitemap-2.xml, ...
+    """
+    if url_count <= max_urls:
+        return ['sitemap.xml']
+    return ['sitemap.xml'] + [f'sitemap-{part}.xml' for part in range(1, math.ceil(url_count / max_urls) + 1)]
+
+def _w3c_datetime(value):
+    """Format a stored (naive, UTC) datetime for sitemaps and Atom."""
+    return value.replace(tzinfo=value.tzinfo or timezone.utc).isoformat(timespec='seconds')
+
+def _rfc822_datetime(value):
+    """Format a stored (naive, UTC) datetime for RSS."""
+    return format_datetime(value.replace(tzinfo=value.tzinfo or timezone.utc))
+
+def iter_sitemap_posts(project_id, batch_size=1000):
+    """
+    Stream a project's posts newest first from one server-side cursor.
+    
+    Only the columns sitemaps and feeds need are selected, and rows are
+    fetched batch_size at a time, so memory stays flat however large the blog.
+    """
+    statement = (
+        select(BlogPost.id, BlogPost.title, BlogPost.meta_description, BlogPost.created_at, BlogPost.updated_at)
+        .where(BlogPost.project_id == project_id)
+        .order_by(BlogPost.created_at.desc(), BlogPost.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.session.execute(statement)
+
+def _write_rss(output, project, site_url, entries):
+    output.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+<channel>
+<title>{xml_escape(project.name)} Blog</title>
+<link>{xml_escape(site_url)}/blog.html</link>
+<description>{xml_escape(project.description or f"Latest posts from {project.name}")}</description>
+<atom:link href="{xml_escape(site_url)}/feed.xml" rel="self" type="application/rss+xml"/>
+'''.encode('utf-8'))
+    if entries:
+        output.write(f'<lastBuildDate>{_rfc822_datetime(max(entry.updated_at or entry.created_at for entry in entries))}</lastBuildDate>\n'.encode('utf-8'))
+    for entry in entries:
+        link = xml_escape(f"{site_url}/posts/{entry.id}.html")
+        output.write(f'''<item>
+<title>{xml_escape(entry.title)}</title>
+<link>{link}</link>
+<guid isPermaLink="true">{link}</guid>
+<pubDate>{_rfc822_datetime(entry.created_at)}</pubDate>
+<description>{xml_escape(entry.meta_description or '')}</description>
+</item>
+'''.encode('utf-8'))
+    output.write(b'</channel>\n</rss>\n')
+
+def _write_atom(output, project, site_url, entries):
+    updated = max((entry.updated_at or entry.created_at for entry in entries), default=datetime.now(timezone.utc))
+    output.write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+<title>{xml_escape(project.name)} Blog</title>
+<id>{xml_escape(site_url)}/blog.html</id>
+<link href="{xml_escape(site_url)}/blog.html"/>
+<link rel="self" href="{xml_escape(site_url)}/atom.xml"/>
+<updated>{_w3c_datetime(updated)}</updated>
+<author><name>{xml_escape(project.name)}</name></author>
+'''.encode('utf-8'))
+    for entry in entries:
+        link = xml_escape(f"{site_url}/posts/{entry.id}.html")
+        output.write(f'''<entry>
+<title>{xml_escape(entry.title)}</title>
+<id>{link}</id>
+<link href="{link}"/>
+<published>{_w3c_datetime(entry.created_at)}</published>
+<updated>{_w3c_datetime(entry.updated_at or entry.created_at)}</updated>
+<summary>{xml_escape(entry.meta_description or '')}</summary>
+</entry>
+'''.encode('utf-8'))
+    output.write(b'</feed>\n')
+
+class _SitemapWriter:
+    """Writes <url> entries across sitemap files of at most max_urls URLs, one file open at a time."""
+    
+    def __init__(self, open_file, parts, max_urls):
+        self.open_file = open_file
+        self.parts = parts
+        self.max_urls = max_urls
+        self.output = None
+        self.count = 0
+        self.lastmods = []
+    
+    def add(self, loc, lastmod):
+        """Write one URL; returns False once every planned part is full."""
+        if self.output is not None and self.count == self.max_urls:
+            self._finish_part()
+        if self.output is None:
+            if len(self.lastmods) == len(self.parts):
+                return False
+            self._start_part()
+        self.output.write(f'<url><loc>{xml_escape(loc)}</loc><lastmod>{_w3c_datetime(lastmod)}</lastmod></url>\n'.encode('utf-8'))
+        self.count += 1
+        if self.lastmods[-1] is None or lastmod > self.lastmods[-1]:
+            self.lastmods[-1] = lastmod
+        return True
+    
+    def close(self):
+        """Finish the current part; a blog with no URLs still gets a valid, empty sitemap."""
+        if not self.lastmods:
+            self._start_part()
+        if self.output is not None:
+            self._finish_part()
+    
+    def _start_part(self):
+        self.output = self.open_file(self.parts[len(self.lastmods)])
+        self.output.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'.encode('utf-8'))
+        self.lastmods.append(None)
+        self.count = 0
+    
+    def _finish_part(self):
+        self.output.write(b'</urlset>\n')
+        self.output.close()
+        self.output = None
+
+def write_sitemaps_and_feeds(project, site_url, open_file, post_count=None, feed_size=FEED_SIZE,
+                             max_urls=SITEMAP_MAX_URLS):
+    """
+    Write sitemap.xml (split into sub-sitemaps above max_urls URLs), an RSS
+    feed.xml and an Atom atom.xml for a project's blog.
+    
+    Everything comes from one pass over iter_sitemap_posts(): each row is
+    written to the current sitemap file as it arrives, and only the first
+    feed_size rows (the newest posts) are kept for the feeds, which are
+    written once the sitemaps are closed. Only one output file is open at a
+    time, so open_file can write straight into a ZIP archive.
+    
+    Args:
+        project: The project object
+        site_url: Absolute URL the blog folder is served from, e.g. https://example.com/blog
+        open_file: Callable taking a path relative to the blog root and returning a binary writable file
+        post_count: The project's number of posts, if already known
+        feed_size: Number of latest posts in each feed
+        max_urls: URLs per sitemap file
+        
+    Returns:
+        List of the paths written
+    """
+    site_url = site_url.rstrip('/')
+    if post_count is None:
+        post_count = db.session.scalar(select(func.count(BlogPost.id)).where(BlogPost.project_id == project.id))
+    include_index = bool(project.blog_template_html)
+    paths = sitemap_paths(post_count + include_index, max_urls)
+    sitemap = _SitemapWriter(open_file, paths[1:] or paths, max_urls)
+    
+    feed_entries = []
+    newest = None
+    try:
+        for row in iter_sitemap_posts(project.id):
+            if len(feed_entries) < feed_size:
+                feed_entries.append(row)
+            lastmod = row.updated_at or row.created_at
+            newest = lastmod if newest is None else max(newest, lastmod)
+            # Stops early only if posts were added since the count; the next export includes them
+            if not sitemap.add(f"{site_url}/posts/{row.id}.html", lastmod):
+                break
+        # The blog index changes whenever any post does, so it goes last with the newest lastmod
+        if include_index:
+            sitemap.add(f"{site_url}/blog.html", newest or datetime.now(timezone.utc))
+        sitemap.close()
+    except BaseException:
+        # Leave the published sitemap as it was rather than replace it with a truncated one
+        if sitemap.output is not None:
+            getattr(sitemap.output, 'discard', sitemap.output.close)()
+        raise
+    
+    written = sitemap.parts[:len(sitemap.lastmods)]
+    if len(paths) > 1:
+        with open_file('sitemap.xml') as index:
+            index.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">\n'.encode('utf-8'))
+            for part, lastmod in zip(written, sitemap.lastmods):
+                index.write(f'<sitemap><loc>{xml_escape(site_url)}/{part}</loc><lastmod>{_w3c_datetime(lastmod)}</lastmod></sitemap>\n'.encode('utf-8'))
+            index.write(b'</sitemapindex>\n')
+        written = ['sitemap.xml'] + written
+    
+    with open_file('feed.xml') as feed:
+        _write_rss(feed, project, site_url, feed_entries)
+    with open_file('atom.xml') as feed:
+        _write_atom(feed, project, site_url, feed_entries)
+    return written + ['feed.xml', 'atom.xml']
+
+def create_download_package(project, blog_posts, site_url=None, compression=None, level=None, precompress=None):
     """
     Create a downloadable ZIP package containing the blog files.
     
     Args:
         project: The project object
         blog_posts: List of blog post objects
+        site_url: Absolute URL the blog folder will be served from; when given,
+            the package also gets a sitemap and RSS/Atom feeds
+        compression: 'deflate', 'zstd' or 'store' for text entries; EXPORT_COMPRESSION by default
+        level: Compression level; EXPORT_COMPRESSION_LEVEL or the method's default
+        precompress: Encodings ('gz', 'br') of sibling files to add for static hosts;
+            EXPORT_PRECOMPRESS by default
         
     Returns:
         The ZIP file as bytes
@@ -168,154 +411,29 @@ def create_download_package(project, blog_posts):
         memory_file = io.BytesIO()
         
         # Create a ZIP file
-        with zipfile.ZipFile(memory_file, 'w') as zf:
+        with CompressedPackage(memory_file, compression, level, precompress) as zf:
             # Add the blog.html file
-            if project.blog_template_html:
-                # Prepare the blog homepage
-                blog_html = project.blog_template_html
-                
-                # Add links to blog posts
-                post_links = ""
-                for post in blog_posts:
-                    post_date = post.created_at.strftime("%B %d, %Y") if hasattr(post, 'created_at') else ""
-                    post_links += f'''
-                    <div class="blog-post-card">
-                        <h3><a href="posts/{post.id}.html">{post.title}</a></h3>
-                        <p class="post-date">{post_date}</p>
-                        <p class="post-excerpt">{post.meta_description if post.meta_description else ''}</p>
-                        <a href="posts/{post.id}.html" class="btn">Read More</a>
-                    </div>
-                    '''
-                
-                # Replace placeholder with actual post links
-                blog_html = blog_html.replace('<!-- BLOG_POSTS_PLACEHOLDER -->', post_links)
-                
-                # Fix the CSS and JS links to use local paths
-                blog_html = blog_html.replace(f'https://ourdomain.com/cssstyles/{project.hosted_css_filename}', 'assets/css/blog-styles.css')
-                if project.hosted_js_filename:
-                    blog_html = blog_html.replace(f'https://ourdomain.com/scripts/{project.hosted_js_filename}', 'assets/js/blog-scripts.js')
-                
-                # Add the file to the ZIP
+            blog_html = render_blog_index(project, blog_posts)
+            if blog_html is not None:
                 zf.writestr('blog/blog.html', blog_html)
             
-            # Create posts directory and add blog posts
-            if blog_posts:
-                # Add each blog post as an HTML file
-                for post in blog_posts:
-                    # Check if we have a complete HTML document or just content fragment
-                    if post.html_content and ('<html' in post.html_content):
-                        post_html = post.html_content
-                        
-                        # Fix the CSS and JS links to use local paths
-                        post_html = post_html.replace(f'https://ourdomain.com/cssstyles/{project.hosted_css_filename}', '../assets/css/blog-styles.css')
-                        if project.hosted_js_filename:
-                            post_html = post_html.replace(f'https://ourdomain.com/scripts/{project.hosted_js_filename}', '../assets/js/blog-scripts.js')
-                    else:
-                        # We have just the content fragment, not a complete document
-                        # Use the post template to create a complete HTML document
-                        if project.post_template_html:
-                            post_date = post.created_at.strftime("%B %d, %Y") if hasattr(post, 'created_at') else ""
-                            meta_desc = post.meta_description if post.meta_description else f"Read our blog post about {post.title}"
-                            
-                            # Start with the template
-                            post_html = project.post_template_html
-                            
-                            # Replace placeholder values with actual content
-                            post_html = post_html.replace("{{title}}", post.title)
-                            post_html = post_html.replace("{{meta_description}}", meta_desc)
-                            post_html = post_html.replace("{{post_date}}", post_date)
-                            post_html = post_html.replace("{{content}}", post.html_content or post.content)
-                            
-                            # Fix the CSS and JS links to use local paths
-                            post_html = post_html.replace(f'https://ourdomain.com/cssstyles/{project.hosted_css_filename}', '../assets/css/blog-styles.css')
-                            if project.hosted_js_filename:
-                                post_html = post_html.replace(f'https://ourdomain.com/scripts/{project.hosted_js_filename}', '../assets/js/blog-scripts.js')
-                        else:
-                            # Fallback to basic HTML if no template is available
-                            post_date = post.created_at.strftime("%B %d, %Y") if hasattr(post, 'created_at') else ""
-                            post_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{post.title}</title>
-    <link rel="stylesheet" href="../assets/css/blog-styles.css">
-</head>
-<body>
-    <header class="site-header">
-        <div class="container">
-            <h1 class="site-title">{project.name} Blog</h1>
-            <nav class="site-navigation">
-                <a href="../index.html">Home</a>
-                <a href="../blog.html">Blog</a>
-            </nav>
-        </div>
-    </header>
-
-    <main class="container">
-        <article class="blog-post">
-            <h1 class="post-title">{post.title}</h1>
-            <div class="post-meta">Published on {post_date}</div>
-            <div class="post-content">
-                {post.html_content or post.content}
-            </div>
-        </article>
-    </main>
-
-    <footer class="site-footer">
-        <div class="container">
-            <p>&copy; {datetime.now().year} - All rights reserved</p>
-        </div>
-    </footer>
-</body>
-</html>"""
-                    
-                    # Write the post HTML to the ZIP file
-                    zf.writestr(f'blog/posts/{post.id}.html', post_html)
+            # Add each blog post as an HTML file; worker processes compress any .gz/.br siblings for large blogs,
+            # while the entries themselves are deflated here as they are added
+            for post, path, entry in render_posts(project, blog_posts, 'blog/posts/{}.html', zf.policy):
+                zf.add_entry(path, entry)
             
             # Create assets directories
             zf.writestr('blog/posts/.keep', '')
             zf.writestr('blog/assets/images/.keep', '')
             
-            # Create css directory and add CSS file
-            css_content = ""
-            
             # Use the generated CSS file as the single source of styles
-            if project.hosted_css_filename:
-                css_path = os.path.join(app.config.get('HOSTED_FILES_FOLDER', 'static/hosted_files'), 'cssstyles', project.hosted_css_filename)
-                if os.path.exists(css_path):
-                    try:
-                        with open(css_path, 'r', encoding='utf-8') as css_file:
-                            css_content = css_file.read()
-                    except Exception as e:
-                        logging.error(f"Error reading hosted CSS file: {str(e)}")
-                        # If we can't read the generated CSS, fall back to a basic one
-                        css_content = """
-                        /* Basic fallback stylesheet */
-                        body {
-                            font-family: sans-serif;
-                            font-size: 16px;
-                            line-height: 1.6;
-                            color: #333;
-                            margin: 0;
-                            padding: 0;
-                        }
-                        """
-            
-            zf.writestr('blog/assets/css/blog-styles.css', css_content)
-            
-            # Create js directory and add JS file
-            js_content = ""
-            if project.hosted_js_filename:
-                js_path = os.path.join(app.config.get('HOSTED_FILES_FOLDER', 'static/hosted_files'), 'scripts', project.hosted_js_filename)
-                if os.path.exists(js_path):
-                    try:
-                        with open(js_path, 'r', encoding='utf-8') as js_file:
-                            js_content = js_file.read()
-                    except:
-                        pass
+            zf.writestr('blog/assets/css/blog-styles.css', read_blog_stylesheet(project))
+            zf.writestr('blog/assets/js/blog-scripts.js', read_blog_script(project))
             
-            zf.writestr('blog/assets/js/blog-scripts.js', js_content)
+            # Sitemap and feeds need absolute URLs, so only when we know where the blog lives
+            if site_url:
+                write_sitemaps_and_feeds(project, site_url, lambda path: zf.open(f'blog/{path}'),
+                                         post_count=len(blog_posts))
             
             # Add a README file
             readme_content = f"""# {project.name} Blog
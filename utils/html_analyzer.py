@@ -6,74 +6,91 @@ from bs4 import BeautifulSoup
 import tinycss2
 from collections import Counter
 
-def analyze_html_css(html_path, css_path):
+def analyze_html_css(html_path=None, css_path=None, html_content=None, css_content=None):
     """
     Analyze HTML and CSS files to extract design patterns, colors, typography, and layout information.
+    
+    Pass html_content and css_content instead of the paths to analyze text
+    already in memory, such as an ingested upload.
     """
     try:
         # Read the HTML file
-        with open(html_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        if html_content is None:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                html_content = f.read()
         
         # Read the CSS file
-        with open(css_path, 'r', encoding='utf-8') as f:
-            css_content = f.read()
-        
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Extract colors from CSS
-        colors = extract_colors(css_content)
-        
-        # Extract typography from CSS
-        typography = extract_typography(css_content)
+        if css_content is None:
+            with open(css_path, 'r', encoding='utf-8') as f:
+                css_content = f.read()
         
-        # Extract layout information
-        layout = extract_layout(soup, css_content)
-        
-        # Extract component styles
-        components = extract_components(soup, css_content)
-        
-        # Return the analysis results
-        return {
-            "colors": colors,
-            "typography": typography,
-            "layout": layout,
-            "components": components
-        }
+        return extract_style(html_content, css_content)
     
     except Exception as e:
         logging.error(f"Error analyzing HTML/CSS: {str(e)}")
-        return {
-            "colors": {
-                "primary": "#007bff",
-                "secondary": "#6c757d",
-                "background": "#ffffff",
-                "text": "#333333",
-                "accent": "#17a2b8"
-            },
-            "typography": {
-                "headingFont": "sans-serif",
-                "bodyFont": "sans-serif",
-                "headingSizes": {
-                    "h1": "2rem",
-                    "h2": "1.75rem",
-                    "h3": "1.5rem"
-                },
-                "bodySize": "1rem"
-            },
-            "layout": {
-                "containerWidth": "1200px",
-                "spacing": "1rem",
-                "headerStyle": "Simple header with logo and navigation",
-                "footerStyle": "Basic footer with copyright information"
+        return default_analysis()
+
+def default_analysis():
+    """
+    The analysis used when a site's HTML and CSS can't be analyzed: a neutral, generic style.
+    """
+    return {
+        "colors": {
+            "primary": "#007bff",
+            "secondary": "#6c757d",
+            "background": "#ffffff",
+            "text": "#333333",
+            "accent": "#17a2b8"
+        },
+        "typography": {
+            "headingFont": "sans-serif",
+            "bodyFont": "sans-serif",
+            "headingSizes": {
+                "h1": "2rem",
+                "h2": "1.75rem",
+                "h3": "1.5rem"
             },
-            "components": {
-                "buttonStyle": "Standard rounded buttons with hover effect",
-                "linkStyle": "Underlined links with color change on hover",
-                "cardStyle": "Simple bordered cards with padding"
-            }
+            "bodySize": "1rem"
+        },
+        "layout": {
+            "containerWidth": "1200px",
+            "spacing": "1rem",
+            "headerStyle": "Simple header with logo and navigation",
+            "footerStyle": "Basic footer with copyright information"
+        },
+        "components": {
+            "buttonStyle": "Standard rounded buttons with hover effect",
+            "linkStyle": "Underlined links with color change on hover",
+            "cardStyle": "Simple bordered cards with padding"
         }
+    }
+
+def extract_style(html_content, css_content):
+    """
+    Analyze HTML and CSS text; like analyze_html_css(), but errors propagate instead of giving the defaults.
+    """
+    # Parse HTML with BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    
+    # Extract colors from CSS
+    colors = extract_colors(css_content)
+    
+    # Extract typography from CSS
+    typography = extract_typography(css_content)
+    
+    # Extract layout information
+    layout = extract_layout(soup, css_content)
+    
+    # Extract component styles
+    components = extract_components(soup, css_content)
+    
+    # Return the analysis results
+    return {
+        "colors": colors,
+        "typography": typography,
+        "layout": layout,
+        "components": components
+    }
 
 def extract_colors(css_content):
     """Extract color values from CSS content."""
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+MODES = ("off", "record", "replay")
+TIMINGS = ("instant", "original")
+
+# Request arguments that change how a call is sent but not what it asks for
+TRANSPORT_PARAMS = ("timeout", "extra_headers", "extra_query", "extra_body")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+def normalize_request(kwargs):
+    """
+    Reduce chat.completions.create arguments to the parts that decide the response.
+
+    Message contents have their whitespace collapsed, so re-indenting a prompt
+    template does not invalidate a recording.
+
+    Args:
+        kwargs: The arguments passed to chat.completions.create
+
+    Returns:
+        A JSON-serializable dictionary
+    """
+    normalized = {}
+    for name, value in kwargs.items():
+        if name in TRANSPORT_PARAMS:
+            continue
+        if name == "messages":
+            value = [
+                {**message, "content": re.sub(r'\s+', ' ', message.get("content") or "").strip()}
+                for message in value
+            ]
+        normalized[name] = value
+    return normalized
+
+
+def request_key(kwargs):
+    """Return the hash a request is recorded and looked up under."""
+    canonical = json.dumps(normalize_request(kwargs), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """
+    A JSONL file of recorded LLM request/response pairs.
+
+    In record mode every successful call is appended to the file. In replay
+    mode responses are served from the file by request hash; when the same
+    request was recorded several times, the recordings are replayed in order
+    and the last one is repeated after that.
+    """
+
+    def __init__(self, path, mode="replay", timing="instant"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(MODES)}")
+        if timing not in TIMINGS:
+            raise ValueError(f"Unknown cassette timing {timing!r}; expected one of {', '.join(TIMINGS)}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._positions = {}
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        """Read every recording in the file, grouped by request hash."""
+        if not os.path.exists(self.path):
+            logging.warning(f"LLM cassette {self.path} does not exist; every call will miss")
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as e:
+                    logging.error(f"Skipping invalid cassette line {self.path}:{line_number}: {str(e)}")
+                    continue
+                self._entries.setdefault(entry["key"], []).append(entry)
+        logging.info(f"Loaded {sum(len(e) for e in self._entries.values())} LLM recordings from {self.path}")
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, call_site, kwargs):
+        """
+        Return the recorded entry for a request, without any replay delay.
+
+        Args:
+            call_site: Name of the calling function, used in the miss message
+            kwargs: The arguments passed to chat.completions.create
+
+        Returns:
+            The recorded entry
+
+        Raises:
+            CassetteMiss: If nothing was recorded for the request
+        """
+        key = request_key(kwargs)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                raise CassetteMiss(f"No recorded response for {call_site} (request {key[:12]}) in {self.path}")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            self.hits += 1
+        return entries[min(position, len(entries) - 1)]
+
+    def replay_delay(self, entry):
+        """Return how long replaying an entry should take under the configured timing."""
+        return entry.get("wall_seconds", 0.0) if self.timing == "original" else 0.0
+
+    def record(self, call_site, kwargs, response, wall_seconds, processing_seconds=None):
+        """
+        Append one request/response pair to the cassette file.
+
+        Args:
+            call_site: Name of the calling function
+            kwargs: The arguments passed to chat.completions.create
+            response: The parsed ChatCompletion
+            wall_seconds: How long the call took
+            processing_seconds: Server-side processing time, if known
+        """
+        entry = {
+            "key": request_key(kwargs),
+            "call_site": call_site,
+            "recorded_at": datetime.utcnow().isoformat(),
+            "request": normalize_request(kwargs),
+            "response": response.model_dump(mode="json"),
+            "wall_seconds": wall_seconds,
+            "processing_seconds": processing_seconds,
+        }
+        line = json.dumps(entry, default=str) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One write per line in append mode, so concurrent workers do not interleave entries
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+def _cassette_from_env():
+    """Build the cassette configured by LLM_CASSETTE_MODE, or None when it is off."""
+    mode = os.environ.get("LLM_CASSETTE_MODE", "off").lower()
+    if mode == "off":
+        return None
+    path = os.environ.get("LLM_CASSETTE_PATH", os.path.join(os.getcwd(), "cassettes", "llm.jsonl"))
+    timing = os.environ.get("LLM_CASSETTE_TIMING", "instant").lower()
+    return Cassette(path, mode, timing)
+
+
+_active_cassette = _cassette_from_env()
+
+
+def active_cassette():
+    """Return the cassette LLM calls currently go through, or None."""
+    return _active_cassette
+
+
+@contextmanager
+def use_cassette(path, mode="replay", timing="instant"):
+    """
+    Route LLM calls through a cassette for the duration of a with block.
+
+    Args:
+        path: The cassette file
+        mode: "record" or "replay"
+        timing: "instant" or "original" replay latency
+
+    Yields:
+        The Cassette, whose hits and misses counters can be checked afterwards
+    """
+    global _active_cassette
+    previous = _active_cassette
+    _active_cassette = Cassette(path, mode, timing)
+    try:
+        yield _active_cassette
+    finally:
+        _active_cassette = previous
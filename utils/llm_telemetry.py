@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from openai.types.chat import ChatCompletion
+from utils.metrics import counter, histogram
+from utils.request_metrics import add_stage_time
+from utils.llm_cassette import active_cassette
+
+# USD per million tokens: (input, cached input, output).
+# Override with LLM_PRICING='{"model": [input, cached, output], ...}'
+DEFAULT_PRICING = {
+    "o4-mini-2025-04-16": (1.10, 0.275, 4.40),
+    "o4-mini": (1.10, 0.275, 4.40),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+}
+
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LABELS = ("call_site", "model")
+
+llm_duration = histogram(
+    "llm_call_duration_seconds", "Wall time of LLM API calls", LABELS)
+llm_queue = histogram(
+    "llm_call_queue_seconds", "Part of the wall time not spent in model processing (network, queueing, retries)", LABELS)
+llm_prompt_tokens = histogram(
+    "llm_call_prompt_tokens", "Prompt tokens per LLM API call", LABELS, buckets=TOKEN_BUCKETS)
+llm_completion_tokens = histogram(
+    "llm_call_completion_tokens", "Completion tokens per LLM API call", LABELS, buckets=TOKEN_BUCKETS)
+llm_calls = counter(
+    "llm_calls_total", "LLM API calls by outcome", LABELS + ("outcome", "cache"))
+llm_cost = counter(
+    "llm_cost_usd_total", "Estimated LLM spend in US dollars", LABELS)
+
+
+def _load_pricing():
+    """Return the pricing table, merged with any LLM_PRICING override."""
+    pricing = dict(DEFAULT_PRICING)
+    override = os.environ.get("LLM_PRICING")
+    if override:
+        try:
+            pricing.update({model: tuple(prices) for model, prices in json.loads(override).items()})
+        except (ValueError, TypeError) as e:
+            logging.error(f"Ignoring invalid LLM_PRICING: {str(e)}")
+    return pricing
+
+
+PRICING = _load_pricing()
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    """
+    Estimate the cost of a call in US dollars.
+
+    Args:
+        model: The model name
+        prompt_tokens: Total prompt tokens, including cached ones
+        cached_tokens: Prompt tokens served from the provider's prompt cache
+        completion_tokens: Completion tokens, including reasoning tokens
+
+    Returns:
+        The estimated cost, or 0.0 for models missing from the pricing table
+    """
+    prices = PRICING.get(model)
+    if not prices:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def _usage_figures(response):
+    """Pull token counts out of response.usage, tolerating missing fields."""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    prompt_details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(prompt_details, "cached_tokens", 0) or 0
+    completion_details = getattr(usage, "completion_tokens_details", None)
+    reasoning_tokens = getattr(completion_details, "reasoning_tokens", 0) or 0
+    return prompt_tokens, completion_tokens, cached_tokens, reasoning_tokens
+
+
+def _processing_seconds(headers):
+    """Return the server-side processing time reported by OpenAI, if present."""
+    try:
+        return float(headers.get("openai-processing-ms")) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+def record_llm_call(call_site, model, wall_seconds, response=None, processing_seconds=None, error=None, replayed=False):
+    """
+    Record metrics and a structured log line for one LLM API call.
+
+    Args:
+        call_site: Name of the function that made the call
+        model: The model name
+        wall_seconds: Total time the call took
+        response: The parsed ChatCompletion, if the call succeeded
+        processing_seconds: Server-side processing time, if known
+        error: The exception raised by the call, if any
+        replayed: Whether the response came from a cassette rather than the API
+
+    Returns:
+        Dictionary with the recorded figures
+    """
+    prompt_tokens, completion_tokens, cached_tokens, reasoning_tokens = _usage_figures(response)
+    queue_seconds = max(wall_seconds - processing_seconds, 0.0) if processing_seconds is not None else None
+    # A replayed response costs nothing; its recorded usage is still reported
+    cost = estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens) if response is not None and not replayed else 0.0
+    cache = "hit" if cached_tokens else "miss"
+    outcome = "error" if error is not None else "replayed" if replayed else "ok"
+
+    add_stage_time("llm", wall_seconds)
+
+    labels = {"call_site": call_site, "model": model}
+    llm_duration.observe(wall_seconds, **labels)
+    if queue_seconds is not None:
+        llm_queue.observe(queue_seconds, **labels)
+    llm_calls.inc(outcome=outcome, cache=cache, **labels)
+    if response is not None:
+        llm_prompt_tokens.observe(prompt_tokens, **labels)
+        llm_completion_tokens.observe(completion_tokens, **labels)
+        llm_cost.inc(cost, **labels)
+
+    record = {
+        "event": "llm_call",
+        "call_site": call_site,
+        "model": model,
+        "outcome": outcome,
+        "wall_ms": round(wall_seconds * 1000, 1),
+        "queue_ms": round(queue_seconds * 1000, 1) if queue_seconds is not None else None,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "reasoning_tokens": reasoning_tokens,
+        "cache": cache,
+        "cost_usd": round(cost, 6),
+    }
+    if error is not None:
+        record["error"] = str(error)
+    logging.info(json.dumps(record))
+
+    return record
+
+
+def _record_live_response(cassette, call_site, model, kwargs, response, raw_response, wall_seconds):
+    """Record telemetry for a call that reached the API, and append it to a recording cassette."""
+    processing_seconds = _processing_seconds(raw_response.headers)
+    record_llm_call(call_site, model, wall_seconds, response=response, processing_seconds=processing_seconds)
+    if cassette is not None and cassette.mode == "record":
+        try:
+            cassette.record(call_site, kwargs, response, wall_seconds, processing_seconds)
+        except Exception as e:
+            logging.error(f"Error recording LLM call to cassette: {str(e)}")
+
+
+def _replayed_response(cassette, call_site, model, entry, wall_seconds):
+    """Rebuild the ChatCompletion of a cassette entry and record telemetry for it."""
+    response = ChatCompletion.model_validate(entry["response"])
+    processing_seconds = entry.get("processing_seconds") if cassette.timing == "original" else None
+    record_llm_call(
+        call_site, model, wall_seconds,
+        response=response, processing_seconds=processing_seconds, replayed=True
+    )
+    return response
+
+
+async def acreate_chat_completion(client, call_site, **kwargs):
+    """
+    Call client.chat.completions.create and record telemetry for the call.
+
+    When a cassette is active (see utils.llm_cassette), the call is either
+    recorded to it or answered from it without touching the network.
+
+    Args:
+        client: The AsyncOpenAI client
+        call_site: Name of the calling function, used as a metric label
+        **kwargs: Arguments passed through to chat.completions.create
+
+    Returns:
+        The parsed ChatCompletion
+    """
+    model = kwargs.get("model", "unknown")
+    cassette = active_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        start = time.perf_counter()
+        try:
+            entry = cassette.lookup(call_site, kwargs)
+            await asyncio.sleep(cassette.replay_delay(entry))
+        except Exception as e:
+            record_llm_call(call_site, model, time.perf_counter() - start, error=e, replayed=True)
+            raise
+        return _replayed_response(cassette, call_site, model, entry, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        raw_response = await client.chat.completions.with_raw_response.create(**kwargs)
+        response = raw_response.parse()
+    except Exception as e:
+        record_llm_call(call_site, model, time.perf_counter() - start, error=e)
+        raise
+
+    _record_live_response(cassette, call_site, model, kwargs, response, raw_response, time.perf_counter() - start)
+    return response
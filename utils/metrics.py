@@ -0,0 +1,178 @@
+import bisect
+import logging
+import threading
+
+# Default latency buckets in seconds, from fast DB calls up to long LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _escape_label_value(value):
+    """Escape backslashes, quotes and newlines in a label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names, label_values, extra=None):
+    """Render a Prometheus label set such as {route="dashboard",model="o4-mini"}"""
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.extend(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    """Render a sample value the way Prometheus expects."""
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for labelled metrics kept in the process-wide registry."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    """A monotonically increasing value."""
+
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down, or be read from a callback at render time."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name, documentation, label_names=(), callback=None):
+        super().__init__(name, documentation, label_names)
+        self._callback = callback
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        if self._callback is not None:
+            try:
+                for labels, value in self._callback():
+                    self.set(value, **labels)
+            except Exception as e:
+                logging.error(f"Error reading gauge {self.name}: {str(e)}")
+        return super().render()
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with a running sum and count."""
+
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _render_sample(self, key, state):
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.label_names, key, [("le", _format_value(float(bound)))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def _register(metric_class, name, *args, **kwargs):
+    """Create a metric once per process and return the existing one on later calls."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = metric_class(name, *args, **kwargs)
+        return _registry[name]
+
+
+def counter(name, documentation, label_names=()):
+    """Get or create a counter in the process-wide registry."""
+    return _register(Counter, name, documentation, label_names)
+
+
+def gauge(name, documentation, label_names=(), callback=None):
+    """Get or create a gauge in the process-wide registry."""
+    return _register(Gauge, name, documentation, label_names, callback=callback)
+
+
+def histogram(name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+    """Get or create a histogram in the process-wide registry."""
+    return _register(Histogram, name, documentation, label_names, buckets=buckets)
+
+
+def render_prometheus():
+    """
+    Render every registered metric in the Prometheus text exposition format.
+
+    Returns:
+        The exposition text
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    lines = []
+    for metric in sorted(metrics, key=lambda m: m.name):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,192 @@
+import re
+import logging
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+# Snippet highlight markers; control characters can't appear in the escaped output
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+
+SEARCH_PER_PAGE = 20
+
+# Postgres: title matches outrank the meta description, which outranks the body
+POSTGRES_SEARCH_DDL = (
+    """
+    ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(meta_description, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_blog_posts_search_vector ON blog_posts USING GIN (search_vector)",
+)
+
+# SQLite: an external-content FTS5 table kept in step with blog_posts by triggers
+SQLITE_SEARCH_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS blog_posts_fts USING fts5(
+        title, meta_description, content,
+        content='blog_posts', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_posts_fts_insert AFTER INSERT ON blog_posts BEGIN
+        INSERT INTO blog_posts_fts(rowid, title, meta_description, content)
+        VALUES (new.id, new.title, new.meta_description, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_posts_fts_delete AFTER DELETE ON blog_posts BEGIN
+        INSERT INTO blog_posts_fts(blog_posts_fts, rowid, title, meta_description, content)
+        VALUES ('delete', old.id, old.title, old.meta_description, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blog_posts_fts_update AFTER UPDATE OF title, meta_description, content ON blog_posts BEGIN
+        INSERT INTO blog_posts_fts(blog_posts_fts, rowid, title, meta_description, content)
+        VALUES ('delete', old.id, old.title, old.meta_description, old.content);
+        INSERT INTO blog_posts_fts(rowid, title, meta_description, content)
+        VALUES (new.id, new.title, new.meta_description, new.content);
+    END
+    """,
+)
+
+POSTGRES_SEARCH_SQL = """
+    SELECT page.id, page.title, page.project_id, page.project_name, page.created_at, page.rank,
+           ts_headline('english', coalesce(nullif(page.meta_description, ''), left(page.content, 2000)), page.query,
+                       'StartSel="' || chr(2) || '", StopSel="' || chr(3) || '", MaxWords=35, MinWords=15') AS snippet
+    FROM (
+        SELECT blog_posts.id, blog_posts.title, blog_posts.meta_description, blog_posts.content,
+               blog_posts.project_id, projects.name AS project_name, blog_posts.created_at,
+               ts_rank_cd(blog_posts.search_vector, query) AS rank, query
+        FROM blog_posts
+        JOIN projects ON projects.id = blog_posts.project_id,
+             websearch_to_tsquery('english', :query) AS query
+        WHERE projects.user_id = :user_id AND blog_posts.search_vector @@ query
+        ORDER BY rank DESC, blog_posts.id DESC
+        LIMIT :limit OFFSET :offset
+    ) AS page
+    ORDER BY page.rank DESC, page.id DESC
+"""
+
+# bm25() is lower-is-better; the weights favour title over meta description over body
+SQLITE_SEARCH_SQL = """
+    SELECT blog_posts.id, blog_posts.title, blog_posts.project_id, projects.name AS project_name,
+           blog_posts.created_at, -bm25(blog_posts_fts, 10.0, 5.0, 1.0) AS rank,
+           snippet(blog_posts_fts, -1, char(2), char(3), '…', 24) AS snippet
+    FROM blog_posts_fts
+    JOIN blog_posts ON blog_posts.id = blog_posts_fts.rowid
+    JOIN projects ON projects.id = blog_posts.project_id
+    WHERE blog_posts_fts MATCH :query AND projects.user_id = :user_id
+    ORDER BY bm25(blog_posts_fts, 10.0, 5.0, 1.0), blog_posts.id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+
+def install_search_index(connection):
+    """
+    Create the full-text index for blog posts, for the connection's database.
+
+    Safe to run repeatedly. On SQLite a newly created index is filled from
+    the existing posts.
+
+    Args:
+        connection: A SQLAlchemy Connection inside a transaction
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_SEARCH_DDL:
+            connection.execute(text(statement))
+    elif dialect == "sqlite":
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'blog_posts_fts'"
+        )).first()
+        for statement in SQLITE_SEARCH_DDL:
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text("INSERT INTO blog_posts_fts(blog_posts_fts) VALUES ('rebuild')"))
+    else:
+        logging.warning(f"No full-text index for {dialect}; search will scan posts")
+
+
+def to_fts5_query(query):
+    """
+    Turn free text into an FTS5 query that matches posts containing every word.
+
+    Each word is quoted, so FTS5 operators and punctuation in user input are
+    treated as plain text; the last word also matches as a prefix.
+    """
+    words = re.findall(r"\w+", query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def highlight(snippet):
+    """Escape a snippet and turn its highlight markers into <mark> tags."""
+    escaped = str(escape(snippet or ""))
+    return Markup(escaped.replace(HIGHLIGHT_START, "<mark>").replace(HIGHLIGHT_END, "</mark>"))
+
+
+def _like_search(connection, user_id, query, limit, offset):
+    """Unindexed fallback for databases without a supported full-text engine."""
+    # LIKE wildcards typed by the user match themselves
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    pattern = f"%{escaped}%"
+    return connection.execute(text("""
+        SELECT blog_posts.id, blog_posts.title, blog_posts.project_id, projects.name AS project_name,
+               blog_posts.created_at, 0 AS rank, blog_posts.meta_description AS snippet
+        FROM blog_posts JOIN projects ON projects.id = blog_posts.project_id
+        WHERE projects.user_id = :user_id
+          AND (blog_posts.title LIKE :pattern ESCAPE '\\' OR blog_posts.meta_description LIKE :pattern ESCAPE '\\'
+               OR blog_posts.content LIKE :pattern ESCAPE '\\')
+        ORDER BY blog_posts.id DESC
+        LIMIT :limit OFFSET :offset
+    """), {"user_id": user_id, "pattern": pattern, "limit": limit, "offset": offset}).mappings().all()
+
+
+def search_posts(connection, user_id, query, page=1, per_page=SEARCH_PER_PAGE):
+    """
+    Search one user's blog posts by title, meta description and content.
+
+    Args:
+        connection: A SQLAlchemy Connection or Session (e.g. db.session)
+        user_id: Only posts in this user's projects are searched
+        query: The search text
+        page: 1-based page number
+        per_page: Results per page
+
+    Returns:
+        Tuple of (results, has_next), where results is a list of dictionaries
+        with id, title, project_id, project_name, created_at, rank and a
+        highlighted snippet, best match first
+    """
+    query = (query or "").strip()
+    if not query:
+        return [], False
+
+    # Fetch one extra row to know whether there is a next page without counting every match
+    limit = per_page + 1
+    offset = (max(page, 1) - 1) * per_page
+    bind = connection.get_bind() if hasattr(connection, "get_bind") else connection
+    dialect = bind.dialect.name
+
+    if dialect == "postgresql":
+        rows = connection.execute(text(POSTGRES_SEARCH_SQL), {
+            "user_id": user_id, "query": query, "limit": limit, "offset": offset
+        }).mappings().all()
+    elif dialect == "sqlite":
+        fts_query = to_fts5_query(query)
+        if fts_query is None:
+            return [], False
+        rows = connection.execute(text(SQLITE_SEARCH_SQL), {
+            "user_id": user_id, "query": fts_query, "limit": limit, "offset": offset
+        }).mappings().all()
+    else:
+        rows = _like_search(connection, user_id, query, limit, offset)
+
+    results = [{**row, "snippet": highlight(row["snippet"])} for row in rows[:per_page]]
+    return results, len(rows) > per_page
@@ -0,0 +1,188 @@
+import os
+import re
+import sys
+import hmac
+import time
+import random
+import logging
+import cProfile
+import threading
+from collections import Counter
+
+# Request header that turns profiling on; its value must match PROFILE_TOKEN
+PROFILE_HEADER = "HTTP_X_PROFILE_TOKEN"
+
+PROFILE_SUFFIXES = (".pstats", ".collapsed")
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, target_thread_id, interval):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class _ProfiledResponse:
+    """Keeps the profiler running while the response body is produced, then saves it."""
+
+    def __init__(self, iterable, finish):
+        self._iterable = iterable
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._finish()
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware that profiles selected requests.
+
+    A request is profiled when it carries an X-Profile-Token header matching
+    PROFILE_TOKEN, or at random with probability PROFILE_SAMPLE_RATE. Each
+    capture is saved as a pstats file (deterministic cProfile data) and a
+    collapsed-stack file (from a stack sampler, for flamegraph tools) in a
+    directory that keeps only the newest PROFILE_MAX_FILES captures.
+
+    Both only see the thread handling the request: analyzer and LLM work
+    run with asyncio.to_thread(), on the async runtime's loop thread or in
+    a process pool shows up as time spent waiting, not as its own frames.
+    """
+
+    def __init__(self, wsgi_app, profile_dir):
+        self.wsgi_app = wsgi_app
+        self.profile_dir = profile_dir
+        self.token = os.environ.get("PROFILE_TOKEN")
+        self.sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+        self.max_files = int(os.environ.get("PROFILE_MAX_FILES", "50"))
+        self.interval = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+        # cProfile cannot run two profilers at once, so only one capture per process at a time
+        self._active = threading.Lock()
+
+    def _should_profile(self, environ):
+        if self.token and hmac.compare_digest(environ.get(PROFILE_HEADER, "").encode("latin-1"),
+                                              self.token.encode("latin-1", "replace")):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._should_profile(environ) or not self._active.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        profiler = cProfile.Profile()
+        sampler = _StackSampler(threading.get_ident(), self.interval)
+        start = time.perf_counter()
+        finished = []
+
+        def finish():
+            if finished:
+                return
+            finished.append(True)
+            profiler.disable()
+            sampler.stop()
+            try:
+                self._save(environ, profiler, sampler.stacks, time.perf_counter() - start)
+            except Exception as e:
+                logging.error(f"Error saving request profile: {str(e)}")
+            finally:
+                self._active.release()
+
+        sampler.start()
+        profiler.enable()
+        try:
+            iterable = self.wsgi_app(environ, start_response)
+        except Exception:
+            finish()
+            raise
+
+        return _ProfiledResponse(iterable, finish)
+
+    def _save(self, environ, profiler, stacks, duration):
+        """Write the capture files and trim the ring buffer."""
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        path_slug = re.sub(r'[^A-Za-z0-9]+', '-', environ.get("PATH_INFO", "")).strip('-') or "root"
+        name = f"{int(time.time() * 1000)}_{environ.get('REQUEST_METHOD', 'GET')}_{path_slug[:60]}_{duration * 1000:.0f}ms"
+        base_path = os.path.join(self.profile_dir, name)
+
+        profiler.dump_stats(base_path + ".pstats")
+        with open(base_path + ".collapsed", 'w', encoding='utf-8') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        logging.info(f"Saved request profile {name}")
+        self._trim()
+
+    def _trim(self):
+        """Delete the oldest captures beyond the ring buffer size."""
+        captures = list_profiles(self.profile_dir)
+        for capture in captures[self.max_files:]:
+            for filename in capture["files"]:
+                try:
+                    os.remove(os.path.join(self.profile_dir, filename))
+                except FileNotFoundError:
+                    pass
+
+
+def list_profiles(profile_dir):
+    """
+    List saved captures, newest first.
+
+    Args:
+        profile_dir: The profile ring-buffer directory
+
+    Returns:
+        List of dictionaries with name, created_at, size and files for each capture
+    """
+    if not os.path.isdir(profile_dir):
+        return []
+
+    captures = {}
+    with os.scandir(profile_dir) as entries:
+        for entry in entries:
+            base, suffix = os.path.splitext(entry.name)
+            if suffix not in PROFILE_SUFFIXES or not entry.is_file():
+                continue
+            stat = entry.stat()
+            capture = captures.setdefault(base, {"name": base, "created_at": stat.st_mtime, "size": 0, "files": []})
+            capture["size"] += stat.st_size
+            capture["files"].append(entry.name)
+
+    return sorted(captures.values(), key=lambda capture: capture["name"], reverse=True)
+
+
+def init_profiling(app):
+    """
+    Install the opt-in request profiler on a Flask app.
+
+    Args:
+        app: The Flask application
+    """
+    app.config.setdefault('PROFILE_FOLDER', os.environ.get('PROFILE_DIR', os.path.join(os.getcwd(), 'profiles')))
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.config['PROFILE_FOLDER'])
@@ -0,0 +1,154 @@
+import time
+import logging
+from datetime import datetime, timedelta
+from collections import namedtuple
+from sqlalchemy import select, delete, func, and_, or_, true
+from app import db
+from models import Project, BlogPost, PostSignature
+from utils.blob_storage import get_storage
+from utils.file_storage import upload_key
+
+# Projects deleted per transaction
+DELETE_CHUNK_SIZE = 100
+# Posts deleted per statement, so one project with a huge blog doesn't hold one huge transaction
+POST_BATCH_SIZE = 5000
+
+DeletionResult = namedtuple("DeletionResult", ["projects", "posts", "files", "seconds"])
+
+
+def project_filter(project_ids=None, user_id=None, older_than_days=None):
+    """
+    Build the WHERE clause selecting projects to delete; no arguments selects every project.
+
+    Args:
+        project_ids: Only these project ids
+        user_id: Only this user's projects
+        older_than_days: Only projects created more than this many days ago
+    """
+    conditions = []
+    if project_ids:
+        conditions.append(Project.id.in_(project_ids))
+    if user_id is not None:
+        conditions.append(Project.user_id == user_id)
+    if older_than_days is not None:
+        conditions.append(Project.created_at < datetime.now() - timedelta(days=older_than_days))
+    return and_(*conditions) if conditions else true()
+
+
+def count_matching(condition):
+    """Return (projects, posts) counts for a project filter, for dry runs and progress."""
+    projects = db.session.scalar(select(func.count(Project.id)).where(condition))
+    posts = db.session.scalar(select(func.count(BlogPost.id)).join(Project, Project.id == BlogPost.project_id)
+                              .where(condition))
+    return projects, posts
+
+
+def _project_files(row):
+    """(storage key, stored value) of the uploads and hosted assets a project row refers to."""
+    files = [(upload_key(path), path) for path in (row.html_file_path, row.css_file_path) if path]
+    if row.hosted_css_filename:
+        files.append((f"cssstyles/{row.hosted_css_filename}", row.hosted_css_filename))
+    if row.hosted_js_filename:
+        files.append((f"scripts/{row.hosted_js_filename}", row.hosted_js_filename))
+    return files
+
+
+def _still_referenced(rows):
+    """File paths and hosted filenames of the given rows that a remaining project also uses."""
+    uploads = {path for row in rows for path in (row.html_file_path, row.css_file_path) if path}
+    hosted = {name for row in rows for name in (row.hosted_css_filename, row.hosted_js_filename) if name}
+    if not uploads and not hosted:
+        return set()
+    shared = db.session.execute(
+        select(Project.html_file_path, Project.css_file_path, Project.hosted_css_filename, Project.hosted_js_filename)
+        .where(or_(Project.html_file_path.in_(uploads), Project.css_file_path.in_(uploads),
+                   Project.hosted_css_filename.in_(hosted), Project.hosted_js_filename.in_(hosted)))
+    ).all()
+    return {value for row in shared for value in row if value}
+
+
+def _remove_files(rows):
+    """Delete the files of deleted project rows that no remaining project refers to; returns how many."""
+    shared = _still_referenced(rows)
+    storage = get_storage()
+    removed = 0
+    for row in rows:
+        for key, reference in _project_files(row):
+            if reference in shared:
+                continue
+            try:
+                storage.delete(key)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logging.warning(f"Could not remove {key}: {str(e)}")
+    return removed
+
+
+def _delete_posts(project_ids):
+    """Delete the projects' posts and signatures in committed batches; returns how many posts."""
+    deleted = 0
+    while True:
+        post_ids = db.session.scalars(select(BlogPost.id).where(BlogPost.project_id.in_(project_ids))
+                                      .limit(POST_BATCH_SIZE)).all()
+        if not post_ids:
+            return deleted
+        # Signatures first: SQLite doesn't enforce their ON DELETE CASCADE
+        db.session.execute(delete(PostSignature).where(PostSignature.post_id.in_(post_ids)),
+                           execution_options={"synchronize_session": False})
+        db.session.execute(delete(BlogPost).where(BlogPost.id.in_(post_ids)),
+                           execution_options={"synchronize_session": False})
+        db.session.commit()
+        deleted += len(post_ids)
+
+
+def delete_projects(condition, chunk_size=DELETE_CHUNK_SIZE, remove_files=True, progress=None):
+    """
+    Delete the projects matching a filter, with their posts and files.
+
+    Projects are taken in id order, chunk_size at a time, and deleted with
+    set-based DELETE statements rather than loading them into the session
+    for ORM cascades; posts go in batches of POST_BATCH_SIZE. Each batch is
+    its own transaction, so an interrupted run leaves the database
+    consistent and re-running it finishes the job. A chunk's uploaded and
+    hosted files are removed once its projects are committed, unless
+    another project still refers to them.
+
+    Args:
+        condition: Project filter from project_filter()
+        chunk_size: Projects per chunk
+        remove_files: Also delete the projects' uploaded and hosted files from blob storage
+        progress: Callable taking a DeletionResult of the running totals after each chunk
+
+    Returns:
+        DeletionResult(projects, posts, files, seconds)
+    """
+    start = time.perf_counter()
+    projects = posts = files = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Project.id, Project.html_file_path, Project.css_file_path,
+                   Project.hosted_css_filename, Project.hosted_js_filename)
+            .where(condition, Project.id > last_id).order_by(Project.id).limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        project_ids = [row.id for row in rows]
+        last_id = project_ids[-1]
+
+        posts += _delete_posts(project_ids)
+        db.session.execute(delete(PostSignature).where(PostSignature.project_id.in_(project_ids)),
+                           execution_options={"synchronize_session": False})
+        db.session.execute(delete(Project).where(Project.id.in_(project_ids)),
+                           execution_options={"synchronize_session": False})
+        db.session.commit()
+        projects += len(project_ids)
+
+        if remove_files:
+            files += _remove_files(rows)
+        if progress is not None:
+            progress(DeletionResult(projects, posts, files, time.perf_counter() - start))
+
+    return DeletionResult(projects, posts, files, time.perf_counter() - start)
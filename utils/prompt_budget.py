@@ -0,0 +1,298 @@
+import copy
+import logging
+import math
+import tinycss2
+from bs4 import BeautifulSoup, Tag
+
+try:
+    import tiktoken
+except ImportError:  # Installs without tiktoken fall back to a character heuristic
+    tiktoken = None
+
+# The model used by openai_service; o4-mini uses the o200k_base encoding. tiktoken downloads an
+# encoding's files on first use (cached in TIKTOKEN_CACHE_DIR, else the temp directory); if that
+# fails, e.g. offline, a warning is logged once and token counts fall back to CHARS_PER_TOKEN
+DEFAULT_MODEL = "o4-mini-2025-04-16"
+DEFAULT_ENCODING = "o200k_base"
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+# Token budgets per prompt (roughly what the old character slices allowed)
+ANALYSIS_PROMPT_BUDGET = 7500
+TITLE_INSPIRATION_BUDGET = 750
+CONTENT_INSPIRATION_BUDGET = 1250
+
+_encoders = {}
+
+
+def _get_encoder(model):
+    """Return a cached tiktoken encoder for the model, or None if unavailable."""
+    if tiktoken is None:
+        return None
+
+    if model not in _encoders:
+        try:
+            try:
+                _encoders[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoders[model] = tiktoken.get_encoding(DEFAULT_ENCODING)
+        except Exception as e:
+            # Encodings are downloaded on first use, which can fail offline
+            logging.warning(f"Tokenizer unavailable for {model}, using character estimate: {str(e)}")
+            _encoders[model] = None
+
+    return _encoders[model]
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    """
+    Count the tokens in a piece of text for the given model.
+
+    Args:
+        text: The text to measure
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The number of tokens (estimated if no tokenizer is available)
+    """
+    if not text:
+        return 0
+
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def _cut_to_budget(text, max_tokens, model):
+    """Cut text to its first max_tokens tokens, for a unit too large to keep whole."""
+    encoder = _get_encoder(model)
+    if encoder is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    return encoder.decode(encoder.encode(text, disallowed_special=())[:max_tokens])
+
+
+def truncate_css(css_content, max_tokens, model=DEFAULT_MODEL):
+    """
+    Truncate CSS to fit a token budget, keeping only whole rules.
+
+    If even the first rule doesn't fit, it is cut to the budget instead.
+
+    Args:
+        css_content: The CSS source
+        max_tokens: The token budget for the CSS
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The truncated CSS
+    """
+    if count_tokens(css_content, model) <= max_tokens:
+        return css_content
+
+    rules = tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True)
+
+    kept = []
+    remaining = max_tokens
+    for rule in rules:
+        rule_text = rule.serialize()
+        cost = count_tokens(rule_text + "\n", model)
+        if cost > remaining:
+            break
+        kept.append(rule_text)
+        remaining -= cost
+
+    if not kept:
+        return _cut_to_budget(css_content.strip(), max_tokens, model)
+
+    return "\n".join(kept)
+
+
+def _tag_shell(tag):
+    """Return the opening and closing markup of a tag without its children."""
+    shell = copy.copy(tag)
+    shell.clear()
+    markup = str(shell)
+    closing = f"</{tag.name}>"
+    if markup.endswith(closing):
+        return markup[:-len(closing)], closing
+    return markup, ""
+
+
+def _take_html_nodes(nodes, remaining, pieces, model):
+    """Append whole nodes to pieces, stopping at the first node that does not fit."""
+    for node in nodes:
+        node_text = str(node)
+        cost = count_tokens(node_text, model)
+        if cost <= remaining:
+            pieces.append(node_text)
+            remaining -= cost
+            continue
+
+        # The node doesn't fit: descend into it so its leading children still make it in,
+        # or keep the start of a text too long to fit whole
+        if not isinstance(node, Tag):
+            if remaining > 0:
+                pieces.append(_cut_to_budget(node_text, remaining, model))
+        elif node.contents:
+            opening, closing = _tag_shell(node)
+            shell_cost = count_tokens(opening + closing, model)
+            if shell_cost < remaining:
+                pieces.append(opening)
+                _take_html_nodes(node.contents, remaining - shell_cost, pieces, model)
+                pieces.append(closing)
+        return
+
+
+def truncate_html(html_content, max_tokens, model=DEFAULT_MODEL):
+    """
+    Truncate HTML to fit a token budget, keeping only whole elements.
+
+    Elements that do not fit are opened and filled with as many of their
+    children as fit, so the result is always well-formed markup; a text
+    node that does not fit is cut to what is left of the budget.
+
+    Args:
+        html_content: The HTML source
+        max_tokens: The token budget for the HTML
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The truncated HTML
+    """
+    if count_tokens(html_content, model) <= max_tokens:
+        return html_content
+
+    soup = BeautifulSoup(html_content, 'html.parser')
+    pieces = []
+    _take_html_nodes(soup.contents, max_tokens, pieces, model)
+
+    return "".join(pieces)
+
+
+def truncate_text(text, max_tokens, model=DEFAULT_MODEL):
+    """
+    Truncate plain text to fit a token budget, keeping only whole paragraphs.
+
+    If even the first paragraph doesn't fit, it is cut to the budget instead.
+
+    Args:
+        text: The text to truncate (paragraphs separated by newlines)
+        max_tokens: The token budget for the text
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The truncated text
+    """
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    kept = []
+    remaining = max_tokens
+    for paragraph in text.split("\n"):
+        cost = count_tokens(paragraph + "\n", model)
+        if cost > remaining:
+            break
+        kept.append(paragraph)
+        remaining -= cost
+
+    if not any(kept):
+        return _cut_to_budget(text.strip(), max_tokens, model)
+
+    return "\n".join(kept)
+
+
+def allocate_budget(token_counts, total_budget):
+    """
+    Split a token budget across prompt sections.
+
+    Each section gets an equal share; sections that need less than their share
+    give the surplus back to be shared among the larger sections.
+
+    Args:
+        token_counts: Dictionary of section name to its full token count
+        total_budget: The total number of tokens available
+
+    Returns:
+        Dictionary of section name to its token budget
+    """
+    budgets = {}
+    pending = dict(token_counts)
+    remaining = total_budget
+
+    while pending:
+        share = remaining // len(pending)
+        small = {name: count for name, count in pending.items() if count <= share}
+        if not small:
+            for name in pending:
+                budgets[name] = share
+            break
+        for name, count in small.items():
+            budgets[name] = count
+            remaining -= count
+            del pending[name]
+
+    return budgets
+
+
+def fit_prompt_sections(sections, total_budget, call_site, model=DEFAULT_MODEL):
+    """
+    Fit several prompt sections into a shared token budget.
+
+    Args:
+        sections: Dictionary of section name to a (text, truncate_function) tuple
+        total_budget: The total number of tokens available for all sections
+        call_site: Name of the calling function, used for logging
+        model: The model whose tokenizer should be used
+
+    Returns:
+        Dictionary of section name to the (possibly truncated) text
+    """
+    token_counts = {name: count_tokens(text, model) for name, (text, _) in sections.items()}
+    budgets = allocate_budget(token_counts, total_budget)
+
+    fitted = {}
+    kept_tokens = 0
+    for name, (text, truncate) in sections.items():
+        if token_counts[name] <= budgets[name]:
+            fitted[name] = text
+            kept_tokens += token_counts[name]
+        else:
+            fitted[name] = truncate(text, budgets[name], model)
+            kept_tokens += count_tokens(fitted[name], model)
+
+    log_tokens_saved(call_site, sum(token_counts.values()), kept_tokens)
+    return fitted
+
+
+def fit_text(text, max_tokens, call_site, model=DEFAULT_MODEL):
+    """
+    Fit a single block of plain text into a token budget.
+
+    Args:
+        text: The text to fit
+        max_tokens: The token budget
+        call_site: Name of the calling function, used for logging
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The (possibly truncated) text
+    """
+    original_tokens = count_tokens(text, model)
+    if original_tokens <= max_tokens:
+        log_tokens_saved(call_site, original_tokens, original_tokens)
+        return text
+
+    fitted = truncate_text(text, max_tokens, model)
+    log_tokens_saved(call_site, original_tokens, count_tokens(fitted, model))
+    return fitted
+
+
+def log_tokens_saved(call_site, original_tokens, kept_tokens):
+    """Log how many prompt tokens were dropped by budgeting."""
+    logging.info(
+        f"Prompt budget [{call_site}]: kept {kept_tokens} of {original_tokens} tokens "
+        f"({original_tokens - kept_tokens} saved)"
+    )
@@ -0,0 +1,176 @@
+import os
+import time
+import logging
+import contextvars
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from utils.metrics import counter, gauge, histogram
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+LABELS = ("endpoint", "method")
+
+request_duration = histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last byte", LABELS + ("status",))
+request_db_seconds = histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", LABELS)
+request_db_queries = histogram(
+    "http_request_db_queries", "SQL statements executed per request", LABELS, buckets=QUERY_BUCKETS)
+request_llm_seconds = histogram(
+    "http_request_llm_seconds", "Time spent waiting on LLM APIs per request", LABELS)
+response_size = histogram(
+    "http_response_size_bytes", "Response body size", LABELS, buckets=SIZE_BUCKETS)
+slow_requests = counter(
+    "http_slow_requests_total", "Requests slower than the slow-request threshold", LABELS)
+requests_in_flight = gauge(
+    "http_requests_in_flight", "Requests currently being handled by this worker")
+
+_current_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Per-request timing accumulators, filled in by hooks while the request runs."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = "unmatched"
+        self.status = ""
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.stages = {"db": 0.0, "llm": 0.0}
+        self.response_bytes = 0
+
+
+def current_request_stats():
+    """Return the RequestStats of the request being handled, or None outside a request."""
+    return _current_stats.get()
+
+
+def add_stage_time(stage, seconds):
+    """
+    Add time spent in a named stage (db, llm, ...) to the current request.
+
+    Args:
+        stage: The stage name
+        seconds: The time spent
+    """
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.stages[stage] = stats.stages.get(stage, 0.0) + seconds
+
+
+class _MeasuredResponse:
+    """Wraps the WSGI response iterable to count bytes and finish timing on close()."""
+
+    def __init__(self, iterable, stats, token, middleware):
+        self._iterable = iterable
+        self._stats = stats
+        self._token = token
+        self._middleware = middleware
+
+    def __iter__(self):
+        for chunk in self._iterable:
+            self._stats.response_bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, "close"):
+                self._iterable.close()
+        finally:
+            self._middleware.finish(self._stats, self._token)
+
+
+class RequestMetricsMiddleware:
+    """
+    WSGI middleware that records per-endpoint latency, DB and LLM time and response size.
+
+    Requests slower than the threshold are logged with a per-stage breakdown.
+    """
+
+    def __init__(self, wsgi_app, slow_threshold_ms=None):
+        self.wsgi_app = wsgi_app
+        if slow_threshold_ms is None:
+            slow_threshold_ms = float(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", "2000"))
+        self.slow_threshold = slow_threshold_ms / 1000
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats(environ.get("REQUEST_METHOD", ""), environ.get("PATH_INFO", ""))
+        token = _current_stats.set(stats)
+        requests_in_flight.inc()
+
+        def measured_start_response(status, headers, exc_info=None):
+            stats.status = status.split(" ", 1)[0]
+            return start_response(status, headers, exc_info)
+
+        try:
+            iterable = self.wsgi_app(environ, measured_start_response)
+        except Exception:
+            stats.status = "500"
+            self.finish(stats, token)
+            raise
+
+        return _MeasuredResponse(iterable, stats, token, self)
+
+    def finish(self, stats, token):
+        """Record the metrics for a finished request."""
+        duration = time.perf_counter() - stats.start
+        requests_in_flight.dec()
+        try:
+            _current_stats.reset(token)
+        except ValueError:
+            # close() ran in a different context than __call__; nothing to reset
+            pass
+
+        labels = {"endpoint": stats.endpoint, "method": stats.method}
+        request_duration.observe(duration, status=stats.status, **labels)
+        request_db_seconds.observe(stats.stages["db"], **labels)
+        request_db_queries.observe(stats.db_queries, **labels)
+        request_llm_seconds.observe(stats.stages["llm"], **labels)
+        response_size.observe(stats.response_bytes, **labels)
+
+        if duration >= self.slow_threshold:
+            slow_requests.inc(**labels)
+            accounted = sum(stats.stages.values())
+            breakdown = ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in stats.stages.items())
+            logging.warning(
+                f"Slow request: {stats.method} {stats.path} ({stats.endpoint}) -> {stats.status} "
+                f"in {duration * 1000:.0f}ms [{breakdown}, other={(duration - accounted) * 1000:.0f}ms, "
+                f"queries={stats.db_queries}, bytes={stats.response_bytes}]"
+            )
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    elapsed = time.perf_counter() - start_times.pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.stages["db"] += elapsed
+
+
+def init_request_metrics(app):
+    """
+    Install the request metrics middleware and endpoint tracking on a Flask app.
+
+    Args:
+        app: The Flask application
+    """
+    app.wsgi_app = RequestMetricsMiddleware(app.wsgi_app)
+
+    @app.before_request
+    def record_request_endpoint():
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.endpoint = request.endpoint or "unmatched"
@@ -0,0 +1,302 @@
+import os
+import re
+import time
+import logging
+import zipfile
+import posixpath
+import threading
+import multiprocessing
+from collections import Counter, namedtuple
+from urllib.parse import unquote, urlsplit
+from utils.html_analyzer import default_analysis, extract_style
+from utils.upload_ingest import decode_content
+
+# Uncompressed bytes of pages and stylesheets read from one site ZIP; the rest of the site is skipped
+SITE_ANALYSIS_MAX_BYTES = int(os.environ.get("SITE_ANALYSIS_MAX_BYTES", str(8 * 1024 * 1024)))
+# Seconds the per-page analysis may take; pages still being analyzed then are left out of the merge
+SITE_ANALYSIS_TIME_BUDGET = float(os.environ.get("SITE_ANALYSIS_TIME_BUDGET", "20"))
+# Most pages analyzed per site, home page and shallowest pages first
+SITE_ANALYSIS_MAX_PAGES = int(os.environ.get("SITE_ANALYSIS_MAX_PAGES", "50"))
+# Processes analyzing pages; 1 analyzes them in the calling thread. Every web worker starts
+# its own pool, so the default stays small whatever the core count
+SITE_ANALYSIS_WORKERS = int(os.environ.get("SITE_ANALYSIS_WORKERS") or min(2, os.cpu_count() or 1))
+# Archives listing more entries are rejected before anything is read
+MAX_ZIP_ENTRIES = 20000
+
+PAGE_EXTENSIONS = (".html", ".htm")
+STYLESHEET_EXTENSIONS = (".css",)
+INDEX_PAGES = ("index.html", "index.htm")
+LINK_TAG = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+STYLESHEET_REL = re.compile(r"""\brel\s*=\s*["']?[^"'>]*\bstylesheet\b""", re.IGNORECASE)
+HREF = re.compile(r"""\bhref\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+STYLE_BLOCK = re.compile(r"<style\b[^>]*>(.*?)</style>", re.IGNORECASE | re.DOTALL)
+
+# pages: [(name, html, css)] in analysis order, css being the page's linked stylesheets and <style>
+# blocks; html and css: the home page and its own css, for the OpenAI analysis
+SiteArchive = namedtuple("SiteArchive", ["pages", "stylesheets", "skipped", "bytes_read", "html", "css"])
+# analysis: merged style analysis; pages: how many were merged, of how many read
+SiteAnalysis = namedtuple("SiteAnalysis", ["analysis", "pages", "pages_read", "seconds"])
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_default_analysis = None
+
+
+def _page_order(info):
+    """Home page first, then shallower pages, then smaller ones."""
+    name = info.filename
+    return name.count("/"), posixpath.basename(name).lower() not in INDEX_PAGES, info.file_size, name
+
+
+def _site_root(names):
+    """The folder every entry is in, for archives of a folder rather than of its contents."""
+    roots = {name.split("/", 1)[0] if "/" in name else "" for name in names}
+    return f"{roots.pop()}/" if len(roots) == 1 and "" not in roots else ""
+
+
+def _linked_stylesheets(page_name, html, root):
+    """Archive names of the stylesheets a page links to; external URLs are ignored."""
+    names = []
+    for tag in LINK_TAG.findall(html):
+        href = HREF.search(tag)
+        if not STYLESHEET_REL.search(tag) or not href:
+            continue
+        url = urlsplit(next(group for group in href.groups() if group is not None))
+        if url.scheme or url.netloc or not url.path:
+            continue
+        path = unquote(url.path)
+        base = root if path.startswith("/") else posixpath.dirname(page_name)
+        names.append(posixpath.normpath(posixpath.join(base, path.lstrip("/"))))
+    return names
+
+
+def read_site_zip(fileobj, max_bytes=SITE_ANALYSIS_MAX_BYTES, max_pages=SITE_ANALYSIS_MAX_PAGES):
+    """
+    Read the pages and stylesheets of a site ZIP that fit the byte budget, without extracting it.
+
+    Entries are read straight from the archive, home page and shallowest
+    pages first, each followed by the stylesheets it links to; a page
+    linking to none that are in the archive gets every stylesheet. An entry
+    is only read if its size fits what is left of max_bytes, and at most
+    that much is read whatever its header claims, so a ZIP bomb costs no
+    more than an honest archive.
+
+    Args:
+        fileobj: A seekable binary file holding the ZIP
+        max_bytes: Uncompressed bytes to read at most
+        max_pages: Pages to read at most
+
+    Returns:
+        SiteArchive(pages, stylesheets, skipped, bytes_read, html, css)
+
+    Raises:
+        ValueError: If the file is not a ZIP, or has no HTML page that fits the budget
+    """
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise ValueError(f"Not a valid ZIP file: {str(e)}")
+    with archive:
+        entries = archive.infolist()
+        if len(entries) > MAX_ZIP_ENTRIES:
+            raise ValueError(f"The ZIP file has more than {MAX_ZIP_ENTRIES} entries")
+        entries = [
+            info for info in entries
+            if not info.is_dir() and not info.flag_bits & 0x1
+            and not any(part.startswith((".", "__MACOSX")) for part in info.filename.split("/"))
+        ]
+        pages = sorted((info for info in entries if info.filename.lower().endswith(PAGE_EXTENSIONS)), key=_page_order)
+        stylesheets = {info.filename: info for info in entries if info.filename.lower().endswith(STYLESHEET_EXTENSIONS)}
+        root = _site_root(info.filename for info in entries)
+
+        remaining = max_bytes
+        skipped = 0
+        css_texts = {}
+
+        def read(info, file_type):
+            nonlocal remaining, skipped
+            if info.file_size > remaining:
+                skipped += 1
+                return None
+            try:
+                with archive.open(info) as entry:
+                    data = entry.read(remaining + 1)
+            except (zipfile.BadZipFile, NotImplementedError, OSError) as e:
+                logging.warning(f"Skipping {info.filename} in site ZIP: {str(e)}")
+                skipped += 1
+                return None
+            if len(data) > remaining:
+                skipped += 1
+                return None
+            remaining -= len(data)
+            return decode_content(data, file_type)[0]
+
+        def stylesheet(name):
+            if name not in css_texts:
+                css_texts[name] = read(stylesheets[name], "css")
+            return css_texts[name]
+
+        read_pages = []
+        for info in pages:
+            if len(read_pages) == max_pages:
+                skipped += 1
+                continue
+            html = read(info, "html")
+            if html is None:
+                continue
+            linked = [name for name in _linked_stylesheets(info.filename, html, root) if name in stylesheets]
+            if not linked:
+                linked = sorted(stylesheets, key=lambda name: stylesheets[name].file_size)
+            css = [stylesheet(name) for name in dict.fromkeys(linked)]
+            css.extend(STYLE_BLOCK.findall(html))
+            read_pages.append((info.filename, html, "\n".join(text for text in css if text)))
+
+    if not read_pages:
+        raise ValueError("The ZIP file has no HTML page within the size limit")
+    css_read = [text for text in css_texts.values() if text is not None]
+    logging.info(f"Read site ZIP: {len(read_pages)} pages, {len(css_read)} stylesheets, "
+                 f"{max_bytes - remaining} bytes; {skipped} entries skipped")
+    return SiteArchive(read_pages, len(css_read), skipped, max_bytes - remaining, read_pages[0][1], read_pages[0][2])
+
+
+def _default_style():
+    """What extract_style() fills in for a page with no HTML or CSS: its defaults for every field."""
+    global _default_analysis
+    if _default_analysis is None:
+        _default_analysis = extract_style("", "")
+    return _default_analysis
+
+
+def _merge_values(values, default):
+    """The value most analyses agree on; ties go to the one seen first, i.e. on the higher-priority page."""
+    if all(isinstance(value, dict) for value in values):
+        return _merge_fields(values, default if isinstance(default, dict) else {})
+    if all(isinstance(value, list) for value in values):
+        # Palettes: colors ranked by how many pages use them
+        counts = Counter(item for value in values for item in dict.fromkeys(value))
+        return [item for item, _ in counts.most_common(max(len(value) for value in values))]
+    # A page whose CSS doesn't set a style gets the analyzer's default for it, which only
+    # counts if no page has anything else
+    found = [value for value in values if value != default] or values
+    counts = Counter(value for value in found if value is not None and not isinstance(value, (dict, list)))
+    if counts:
+        return counts.most_common(1)[0][0]
+    return next((value for value in found if value is not None), None)
+
+
+def _merge_fields(analyses, defaults):
+    fields = dict.fromkeys(key for analysis in analyses for key in analysis)
+    return {key: _merge_values([analysis[key] for analysis in analyses if key in analysis], defaults.get(key))
+            for key in fields}
+
+
+def merge_analyses(analyses):
+    """
+    Merge per-page style analyses into one for the site, weighting each value by how many pages have it.
+
+    Every field takes its most frequent value across pages, so a style
+    used on most pages wins over one the home page alone uses; lists
+    (the color palette) keep the items the most pages share. Values equal
+    to extract_style()'s default for the field don't vote unless no page
+    has another, so pages with little or no CSS of their own, such as
+    those styled inline or from a CDN, don't outvote the site's style.
+    """
+    return _merge_fields(analyses, _default_style())
+
+
+def _get_pool():
+    """Return this process's site analysis pool, starting it on first use and again after a fork."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # As in utils.export_engine: workers from a fork server, importing only the analyzer. A
+            # multiprocessing.Pool rather than an executor, since its workers can be killed on overrun
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(method)
+            if method == "forkserver":
+                context.set_forkserver_preload(["utils.html_analyzer"])
+            _pool = context.Pool(SITE_ANALYSIS_WORKERS)
+            _pool_pid = os.getpid()
+            logging.debug(f"Started site analysis pool with {SITE_ANALYSIS_WORKERS} workers")
+        return _pool
+
+
+def _discard_pool(pool):
+    """Kill a pool's workers, including any still analyzing; the next upload starts a fresh pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.terminate()
+
+
+def _analyze_in_pool(pages, deadline):
+    """
+    Analyze pages in worker processes until the deadline; returns {index: analysis} of those done.
+
+    Returns None if the pool was shut down before it took the pages.
+    """
+    pool = _get_pool()
+    try:
+        pending = [pool.apply_async(extract_style, (html, css)) for _, html, css in pages]
+    except ValueError:
+        # Terminated by a concurrent upload that overran
+        _discard_pool(pool)
+        return None
+    for result in pending:
+        result.wait(max(deadline - time.monotonic(), 0))
+    if not all(result.ready() for result in pending):
+        # Terminating the workers is what stops pages that overran from using CPU past the budget
+        logging.warning("Site analysis overran its time budget; terminating the worker pool")
+        _discard_pool(pool)
+    results = {}
+    for index, result in enumerate(pending):
+        if not result.ready():
+            continue
+        try:
+            results[index] = result.get()
+        except Exception as e:
+            logging.warning(f"Could not analyze page {pages[index][0]}: {str(e)}")
+    return results
+
+
+def analyze_site(site, time_budget=SITE_ANALYSIS_TIME_BUDGET):
+    """
+    Analyze every page of a site read by read_site_zip() and merge the results.
+
+    Pages are analyzed with extract_style() in parallel in a process pool
+    (SITE_ANALYSIS_WORKERS), each against its own stylesheets; whatever
+    has finished when time_budget runs out is merged with
+    merge_analyses(), and the pool's workers are killed if any page was
+    still being analyzed, so no work outlives the budget. Without a pool,
+    pages are analyzed in turn until the budget runs out. If no page
+    finished, the default analysis is used rather than analyzing again
+    past the budget; the home page has failed or overrun already.
+
+    Returns:
+        SiteAnalysis(analysis, pages, pages_read, seconds)
+    """
+    start = time.monotonic()
+    deadline = start + time_budget
+    pages = site.pages
+    results = None
+    if SITE_ANALYSIS_WORKERS > 1 and len(pages) > 1:
+        results = _analyze_in_pool(pages, deadline)
+    if results is None:
+        results = {}
+        for index, (name, html, css) in enumerate(pages):
+            if index and time.monotonic() >= deadline:
+                break
+            try:
+                results[index] = extract_style(html, css)
+            except Exception as e:
+                logging.warning(f"Could not analyze page {name}: {str(e)}")
+    if results:
+        analysis = merge_analyses([results[index] for index in sorted(results)])
+    else:
+        # No page finished in time, or none could be analyzed
+        analysis = default_analysis()
+    seconds = time.monotonic() - start
+    logging.info(f"Analyzed site: merged {len(results)} of {len(pages)} pages in {seconds:.2f}s")
+    return SiteAnalysis(analysis, len(results), len(pages), seconds)
@@ -0,0 +1,240 @@
+import os
+import json
+import fcntl
+import hashlib
+import contextlib
+import logging
+from datetime import datetime
+from collections import namedtuple
+from app import db
+from models import BlogPost
+from utils.file_storage import (render_blog_index, hosted_asset_key, read_blog_stylesheet,
+                                read_blog_script, sitemap_paths, write_sitemaps_and_feeds)
+from utils.export_engine import render_posts
+from utils.blob_storage import get_storage, open_temporary
+
+MANIFEST_NAME = ".publish-manifest.json"
+MANIFEST_VERSION = 1
+LOAD_BATCH_SIZE = 500
+
+PublishResult = namedtuple("PublishResult", ["written", "unchanged", "removed"])
+
+
+def _digest(*parts):
+    """Stable hash of the inputs that determine one output file."""
+    hasher = hashlib.sha256()
+    for part in parts:
+        hasher.update(repr(part).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _asset_stamp(key):
+    """Identify a hosted asset by key, size and etag, without reading it."""
+    if not key:
+        return None
+    try:
+        info = get_storage().stat(key)
+    except FileNotFoundError:
+        return (key, None)
+    return (key, info.size, info.etag)
+
+
+def _load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temporary file, so the web tier never serves a partial file."""
+    output_file, temporary_path = open_temporary(path)
+    with output_file:
+        output_file.write(data)
+    os.replace(temporary_path, path)
+
+
+class _StagedFile:
+    """
+    A file streamed to a temporary path and hashed; on close it replaces the target only if its bytes changed.
+
+    A file discarded instead, as on an error while it is written, leaves the
+    target and the manifest as they were.
+    """
+
+    def __init__(self, publisher, path, input_hash):
+        self.publisher = publisher
+        self.path = path
+        self.input_hash = input_hash
+        self.target = os.path.join(publisher.output_dir, path)
+        self.file, self.temporary_path = open_temporary(self.target)
+        self.hasher = hashlib.sha256()
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.file.write(data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.file.close()
+        output_hash = self.hasher.hexdigest()
+        entry = self.publisher.previous.get(self.path)
+        if entry is not None and entry["sha256"] == output_hash:
+            os.remove(self.temporary_path)
+            self.publisher.unchanged += 1
+        else:
+            os.replace(self.temporary_path, self.target)
+            self.publisher.written += 1
+        self.publisher.files[self.path] = {"input": self.input_hash, "sha256": output_hash}
+
+    def discard(self):
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class _Publisher:
+    """One publish run: compares input hashes with the manifest and rewrites what changed."""
+
+    def __init__(self, output_dir, previous):
+        self.output_dir = output_dir
+        self.previous = previous
+        self.files = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def is_current(self, path, input_hash):
+        """Keep path as is if its inputs are unchanged since the last publish."""
+        entry = self.previous.get(path)
+        if entry is not None and entry["input"] == input_hash:
+            self.files[path] = entry
+            self.unchanged += 1
+            return True
+        return False
+
+    def all_current(self, paths, input_hash):
+        """Keep a group of files rendered together if their shared inputs are unchanged."""
+        if all(self.previous.get(path, {}).get("input") == input_hash for path in paths):
+            for path in paths:
+                self.is_current(path, input_hash)
+            return True
+        return False
+
+    def open(self, path, input_hash):
+        """Return a binary file for streaming path's new content."""
+        return _StagedFile(self, path, input_hash)
+
+    def write(self, path, input_hash, content):
+        """Record path's new inputs, writing it only if the rendered bytes (or text) differ."""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        output_hash = hashlib.sha256(data).hexdigest()
+        entry = self.previous.get(path)
+        if entry is not None and entry["sha256"] == output_hash:
+            self.unchanged += 1
+        else:
+            _write_atomic(os.path.join(self.output_dir, path), data)
+            self.written += 1
+        self.files[path] = {"input": input_hash, "sha256": output_hash}
+
+    def remove_stale(self):
+        """Delete files from the last publish that this one no longer produces."""
+        removed = 0
+        for path in self.previous.keys() - self.files.keys():
+            try:
+                os.remove(os.path.join(self.output_dir, path))
+            except FileNotFoundError:
+                pass
+            removed += 1
+        return removed
+
+    def save_manifest(self):
+        manifest = {"version": MANIFEST_VERSION, "files": self.files}
+        _write_atomic(os.path.join(self.output_dir, MANIFEST_NAME),
+                      json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+
+
+def publish_project(project, output_dir, site_url=None, full=False):
+    """
+    Publish a project's blog as a static site, rewriting only what changed.
+
+    The output has the same layout as the blog/ folder of the ZIP export:
+    blog.html, posts/<id>.html and assets/. A manifest in the output
+    directory records, per file, a hash of the inputs it was rendered from
+    and of its content. Posts are compared by id and updated_at, the index
+    by the post list, and assets by size and etag, so unchanged posts
+    are neither loaded nor rendered. With a site URL, sitemap.xml and the
+    RSS/Atom feeds are streamed whenever the post list changes. Files the
+    manifest lists that are no longer produced (deleted posts) are removed;
+    other files are left alone.
+
+    Args:
+        project: The project object
+        output_dir: Directory to publish into; created if missing
+        site_url: Absolute URL output_dir is served from, for the sitemap and feeds
+        full: Ignore the manifest and rewrite every file
+
+    Returns:
+        PublishResult(written, unchanged, removed) file counts
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, f"{MANIFEST_NAME}.lock"), "w") as lock_file:
+        # One publish per directory at a time
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        publisher = _Publisher(output_dir, {} if full else _load_manifest(output_dir))
+        posts = (db.session.query(BlogPost.id, BlogPost.updated_at)
+                 .filter(BlogPost.project_id == project.id).order_by(BlogPost.id).all())
+
+        # Everything a post page depends on besides the post itself
+        post_template = _digest(project.post_template_html, project.name, project.hosted_css_filename,
+                                project.hosted_js_filename, datetime.now().year)
+        changed = [post_id for post_id, updated_at in posts
+                   if not publisher.is_current(f"posts/{post_id}.html", _digest(post_template, post_id, updated_at))]
+        for start in range(0, len(changed), LOAD_BATCH_SIZE):
+            batch = BlogPost.query.filter(BlogPost.id.in_(changed[start:start + LOAD_BATCH_SIZE])).all()
+            for post, path, page in render_posts(project, batch, "posts/{}.html"):
+                publisher.write(path, _digest(post_template, post.id, post.updated_at), page)
+                # Rendered posts are not needed again; don't let the session accumulate the whole blog
+                db.session.expunge(post)
+
+        index_input = _digest(project.blog_template_html, project.hosted_css_filename,
+                              project.hosted_js_filename, posts)
+        if project.blog_template_html and not publisher.is_current("blog.html", index_input):
+            listing = (db.session.query(BlogPost.id, BlogPost.title, BlogPost.meta_description, BlogPost.created_at)
+                       .filter(BlogPost.project_id == project.id).order_by(BlogPost.id).all())
+            publisher.write("blog.html", index_input, render_blog_index(project, listing))
+
+        for path, file_type, read in (("assets/css/blog-styles.css", "css", read_blog_stylesheet),
+                                      ("assets/js/blog-scripts.js", "js", read_blog_script)):
+            asset_input = _digest(_asset_stamp(hosted_asset_key(project, file_type)))
+            if not publisher.is_current(path, asset_input):
+                publisher.write(path, asset_input, read(project))
+
+        if site_url:
+            feeds_input = _digest(site_url, project.name, project.description, bool(project.blog_template_html), posts)
+            feed_paths = sitemap_paths(len(posts) + bool(project.blog_template_html)) + ["feed.xml", "atom.xml"]
+            if not publisher.all_current(feed_paths, feeds_input):
+                write_sitemaps_and_feeds(project, site_url, lambda path: publisher.open(path, feeds_input),
+                                         post_count=len(posts))
+
+        removed = publisher.remove_stale()
+        publisher.save_manifest()
+
+    logging.info(f"Published project {project.id} to {output_dir}: {publisher.written} written, "
+                 f"{publisher.unchanged} unchanged, {removed} removed")
+    return PublishResult(publisher.written, publisher.unchanged, removed)
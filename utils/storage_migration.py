@@ -0,0 +1,65 @@
+from sqlalchemy import select, update, or_
+from app import db
+from models import Project
+from utils.blob_storage import LocalStorage, get_storage
+from utils.file_storage import upload_key
+
+# Project rows rewritten per transaction
+ROW_BATCH_SIZE = 1000
+
+
+def normalize_upload_paths(batch_size=ROW_BATCH_SIZE, dry_run=False):
+    """
+    Rewrite project rows still holding absolute upload paths to storage keys.
+
+    Rows saved before blob storage point at files by absolute path, which
+    upload_key() already resolves; this makes the rows themselves
+    independent of where the uploads folder is and how it is laid out.
+
+    Returns:
+        The number of project rows rewritten (or, in a dry run, to rewrite)
+    """
+    legacy = or_(Project.html_file_path.not_like("uploads/%"), Project.css_file_path.not_like("uploads/%"))
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Project.id, Project.html_file_path, Project.css_file_path)
+            .where(legacy, Project.id > last_id).order_by(Project.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updated += len(rows)
+        if dry_run:
+            continue
+        db.session.execute(update(Project), [
+            {"id": row.id,
+             "html_file_path": upload_key(row.html_file_path) if row.html_file_path else None,
+             "css_file_path": upload_key(row.css_file_path) if row.css_file_path else None}
+            for row in rows
+        ])
+        db.session.commit()
+    return updated
+
+
+def shard_local_storage(folders=("uploads", "cssstyles", "scripts"), dry_run=False, progress=None):
+    """
+    Run the one-time move to sharded local storage: every folder's flat files, then the project rows.
+
+    Args:
+        folders: Storage folders to shard
+        dry_run: Only count what would change
+        progress: Callable taking (folder, ShardResult) while files are moved
+
+    Returns:
+        ({folder: ShardResult}, number of project rows rewritten)
+    """
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage) or not storage.shard_depth:
+        raise ValueError("Sharding applies to local storage with STORAGE_SHARD_DEPTH above 0")
+    results = {}
+    for folder in folders:
+        results[folder] = storage.shard_flat_files(folder, dry_run,
+                                                   progress and (lambda result, folder=folder: progress(folder, result)))
+    return results, normalize_upload_paths(dry_run=dry_run)
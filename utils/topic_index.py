@@ -0,0 +1,262 @@
+import os
+import re
+import random
+import struct
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# Signatures are NUM_PERM MinHash values; LSH splits them into BANDS bands of
+# ROWS values, so posts sharing any whole band become candidates. With 20 x 3
+# a pair at Jaccard 0.5 is a candidate 93% of the time, at 0.6 99%.
+NUM_PERM = 60
+BANDS = 20
+ROWS = 3
+MERSENNE_PRIME = (1 << 61) - 1
+SIGNATURE_FORMAT = f"<{NUM_PERM}Q"
+
+# Fixed seed: signatures are stored, so every process must use the same permutations
+_random = random.Random(1729)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE_PRIME), _random.randrange(MERSENNE_PRIME)) for _ in range(NUM_PERM)]
+
+# Estimated Jaccard similarity at which a new topic counts as a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0.5"))
+# skip: stop before generating and ask for confirmation; warn: generate and flash a warning; off
+NEAR_DUPLICATE_ACTION = os.environ.get("NEAR_DUPLICATE_ACTION", "skip").lower()
+# Projects whose index is kept in memory per worker
+MAX_CACHED_PROJECTS = 256
+
+STOPWORDS = frozenset("""
+    a an and are as at be by can do for from how i in is it its my of on or our that the this
+    to what when where which who why will with you your vs versus into about best guide tips
+""".split())
+
+NearDuplicate = namedtuple("NearDuplicate", ["post_id", "title", "similarity"])
+
+
+def _stem(word):
+    """Strip the most common English suffixes so 'tomatoes' and 'tomato' share a shingle."""
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("es", ""), ("ed", ""), ("s", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def shingles(text):
+    """
+    Word shingles for a text: normalized words plus adjacent word pairs.
+
+    Markup and stopwords are dropped first, so the shingles describe what a
+    text is about rather than how it is phrased.
+    """
+    text = re.sub(r"<[^>]+>", " ", text or "").lower()
+    words = [_stem(word) for word in re.findall(r"[a-z0-9]+", text) if len(word) > 1 and word not in STOPWORDS]
+    result = set(words)
+    result.update(f"{first} {second}" for first, second in zip(words, words[1:]))
+    return result
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+
+
+def minhash(text):
+    """
+    MinHash signature of a text's shingles, or None if it has none.
+
+    Each shingle is hashed once, then permuted NUM_PERM ways with a*x+b mod
+    a Mersenne prime; the signature keeps the minimum per permutation. The
+    fraction of equal values between two signatures estimates the Jaccard
+    similarity of their shingle sets.
+    """
+    hashes = [_hash(shingle) for shingle in shingles(text)]
+    if not hashes:
+        return None
+    return tuple(min((a * hashed + b) % MERSENNE_PRIME for hashed in hashes) for a, b in PERMUTATIONS)
+
+
+def pack_signature(signature):
+    return struct.pack(SIGNATURE_FORMAT, *signature) if signature else None
+
+
+def unpack_signature(data):
+    return struct.unpack(SIGNATURE_FORMAT, data) if data else None
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(first, second) if a == b) / NUM_PERM
+
+
+def _bands(signature):
+    for band in range(BANDS):
+        yield band, signature[band * ROWS:(band + 1) * ROWS]
+
+
+class TopicIndex:
+    """In-memory LSH index over one project's post signatures."""
+
+    def __init__(self):
+        self.posts = {}  # post_id -> (title signature, content signature, updated_at)
+        self.buckets = defaultdict(set)
+
+    def add(self, post_id, title_signature, content_signature, updated_at):
+        self.remove(post_id)
+        self.posts[post_id] = (title_signature, content_signature, updated_at)
+        for signature in (title_signature, content_signature):
+            if signature:
+                for key in _bands(signature):
+                    self.buckets[key].add(post_id)
+
+    def remove(self, post_id):
+        entry = self.posts.pop(post_id, None)
+        if entry is None:
+            return
+        for signature in entry[:2]:
+            if signature:
+                for key in _bands(signature):
+                    bucket = self.buckets.get(key)
+                    if bucket is not None:
+                        bucket.discard(post_id)
+                        if not bucket:
+                            del self.buckets[key]
+
+    def query(self, signature, threshold):
+        """Return [(similarity, post_id)] for posts at or above threshold, most similar first."""
+        candidates = set()
+        for key in _bands(signature):
+            candidates.update(self.buckets.get(key, ()))
+        matches = []
+        for post_id in candidates:
+            title_signature, content_signature, _ = self.posts[post_id]
+            score = max(similarity(signature, other) for other in (title_signature, content_signature) if other)
+            if score >= threshold:
+                matches.append((score, post_id))
+        matches.sort(reverse=True)
+        return matches
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _project_index(project_id):
+    """
+    Return the project's index, brought up to date with the post_signatures table.
+
+    Only (post_id, updated_at) pairs are read on each call; signatures are
+    loaded just for posts added or changed since the last call, and deleted
+    posts are dropped, so other workers' writes are picked up incrementally.
+    """
+    from app import db
+    from models import PostSignature
+
+    with _indexes_lock:
+        index = _indexes.pop(project_id, None) or TopicIndex()
+        _indexes[project_id] = index
+        while len(_indexes) > MAX_CACHED_PROJECTS:
+            _indexes.popitem(last=False)
+
+    current = dict(db.session.query(PostSignature.post_id, PostSignature.updated_at)
+                   .filter(PostSignature.project_id == project_id))
+    with _indexes_lock:
+        for post_id in [post_id for post_id in index.posts if post_id not in current]:
+            index.remove(post_id)
+        changed = [post_id for post_id, updated_at in current.items()
+                   if post_id not in index.posts or index.posts[post_id][2] != updated_at]
+
+    if changed:
+        rows = db.session.query(PostSignature)
+        # A first load reads the whole project rather than a huge IN list
+        if len(changed) > 500:
+            rows = rows.filter(PostSignature.project_id == project_id).all()
+        else:
+            rows = rows.filter(PostSignature.post_id.in_(changed)).all()
+        with _indexes_lock:
+            for row in rows:
+                index.add(row.post_id, unpack_signature(row.title_minhash),
+                          unpack_signature(row.content_minhash), row.updated_at)
+    return index
+
+
+def find_near_duplicates(project_id, text, threshold=None, limit=3):
+    """
+    Find a project's existing posts that cover nearly the same topic as text.
+
+    A topic is compared with each post's title signature and its title plus
+    content signature, so both a short topic and a pasted brief are caught.
+
+    Args:
+        project_id: The project whose posts are searched
+        text: The proposed topic (and title, if the user gave one)
+        threshold: Minimum estimated Jaccard similarity, NEAR_DUPLICATE_THRESHOLD by default
+        limit: Maximum number of matches to return
+
+    Returns:
+        List of NearDuplicate(post_id, title, similarity), most similar first
+    """
+    from models import BlogPost
+
+    signature = minhash(text)
+    if signature is None:
+        return []
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    index = _project_index(project_id)
+    with _indexes_lock:
+        matches = index.query(signature, threshold)[:limit]
+    if not matches:
+        return []
+
+    titles = dict(BlogPost.query.with_entities(BlogPost.id, BlogPost.title)
+                  .filter(BlogPost.id.in_([post_id for _, post_id in matches])))
+    return [NearDuplicate(post_id, titles[post_id], score) for score, post_id in matches if post_id in titles]
+
+
+def sign_post(post):
+    """Create or refresh a BlogPost's signature row from its title and content."""
+    from models import PostSignature
+
+    title_signature = pack_signature(minhash(post.title))
+    content_signature = pack_signature(minhash(f"{post.title or ''} {post.content or ''}"))
+    project_id = post.project_id if post.project_id is not None else post.project.id
+    if post.signature is None:
+        post.signature = PostSignature(project_id=project_id, title_minhash=title_signature,
+                                       content_minhash=content_signature)
+    else:
+        post.signature.project_id = project_id
+        post.signature.title_minhash = title_signature
+        post.signature.content_minhash = content_signature
+
+
+@event.listens_for(Session, "before_flush")
+def _sign_changed_posts(session, flush_context, instances):
+    """Keep post signatures in step with every BlogPost insert and title or content edit."""
+    from models import BlogPost
+
+    for post in list(session.new) + list(session.dirty):
+        if not isinstance(post, BlogPost) or post in session.deleted:
+            continue
+        state = inspect(post)
+        if post in session.new or any(state.attrs[name].history.has_changes() for name in ("title", "content")):
+            sign_post(post)
+
+
+def backfill_signatures(batch_size=500):
+    """Sign existing posts that have no signature yet; returns how many were signed."""
+    from app import db
+    from models import BlogPost, PostSignature
+
+    signed = 0
+    while True:
+        posts = (BlogPost.query.outerjoin(PostSignature, PostSignature.post_id == BlogPost.id)
+                 .filter(PostSignature.post_id.is_(None)).order_by(BlogPost.id).limit(batch_size).all())
+        if not posts:
+            return signed
+        for post in posts:
+            sign_post(post)
+        db.session.commit()
+        signed += len(posts)
+        logging.info(f"Signed {signed} blog posts for near-duplicate detection")
@@ -0,0 +1,168 @@
+import re
+import time
+import codecs
+import hashlib
+import logging
+from collections import namedtuple
+from utils.blob_storage import CHUNK_SIZE, GC_GRACE_PERIOD, get_storage
+
+# Bytes at the start of an upload searched for a BOM or a declared charset, as browsers do
+SNIFF_BYTES = 1024
+# An identical upload already stored is rewritten, refreshing its mtime, once it is this old, so the
+# file collector can't delete it between this upload finding it and the project row pointing at it
+DEDUPE_REFRESH_AGE = GC_GRACE_PERIOD / 2
+
+BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+DECLARED_CHARSET = {
+    "html": re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.IGNORECASE),
+    "css": re.compile(rb'''^@charset\s+["']([\w.:-]+)["']'''),
+}
+# Labels browsers treat as another encoding; a page can't really be UTF-16 if its ASCII meta tag was readable
+ENCODING_ALIASES = {"ascii": "cp1252", "iso8859_1": "cp1252", "utf_16": "utf-8",
+                    "utf_16_le": "utf-8", "utf_16_be": "utf-8"}
+# What undeclared text that isn't valid UTF-8 is decoded as
+FALLBACK_ENCODING = "cp1252"
+
+# An upload read into memory but not stored yet; data is the original bytes, sha256 their hash as hex
+UploadContent = namedtuple("UploadContent", ["data", "sha256", "encoding", "text"])
+# sha256 as hex, size in bytes; duplicate is True if identical content was already stored and was left as it was
+IngestedUpload = namedtuple("IngestedUpload", ["key", "sha256", "size", "encoding", "text", "duplicate"])
+
+
+def sniff_encoding(head, file_type):
+    """
+    Return the encoding a file's first bytes announce, or None.
+
+    A byte order mark wins, then a <meta charset> (HTML) or @charset rule
+    (CSS) within the first SNIFF_BYTES bytes. Unknown labels are ignored.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    pattern = DECLARED_CHARSET.get(file_type)
+    match = pattern.search(head[:SNIFF_BYTES]) if pattern else None
+    if match is None:
+        return None
+    try:
+        name = codecs.lookup(match.group(1).decode("ascii")).name.replace("-", "_")
+    except LookupError:
+        return None
+    return ENCODING_ALIASES.get(name, name)
+
+
+def decode_content(data, file_type):
+    """Decode a whole file in memory the way ingest_upload() decodes a stream; returns (text, encoding)."""
+    declared = sniff_encoding(data, file_type)
+    if declared:
+        return data.decode(declared, errors="replace"), declared
+    try:
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return data.decode(FALLBACK_ENCODING, errors="replace"), FALLBACK_ENCODING
+
+
+def read_upload(file, file_type, decode=True):
+    """
+    Read an uploaded file once into memory, hashing and decoding it as it streams in.
+
+    The upload is read in CHUNK_SIZE pieces into one in-memory buffer
+    (uploads are capped by MAX_CONTENT_LENGTH) while the same loop feeds
+    the SHA-256 hash and an incremental decoder, so the hash, encoding and
+    text are all known when the stream ends. The encoding is the one
+    sniff_encoding() finds, else UTF-8, else FALLBACK_ENCODING if the
+    bytes turn out not to be UTF-8 (the only case that decodes twice).
+
+    Args:
+        file: The uploaded file object
+        file_type: 'html', 'css', or 'zip' for a whole site
+        decode: Decode the content; False for binary uploads, whose encoding and text are None
+
+    Returns:
+        UploadContent(data, sha256, encoding, text), for store_upload()
+    """
+    buffer = bytearray()
+    digest = hashlib.sha256()
+    decoder = None
+    encoding = None
+    pieces = []
+    while True:
+        chunk = file.stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if decoder is None and decode:
+            # The first chunk holds the BOM or charset declaration, if any
+            declared = sniff_encoding(chunk, file_type)
+            encoding = declared or "utf-8"
+            decoder = codecs.getincrementaldecoder(encoding)(errors="replace" if declared else "strict")
+        buffer += chunk
+        digest.update(chunk)
+        if pieces is not None and decoder is not None:
+            try:
+                pieces.append(decoder.decode(chunk))
+            except UnicodeDecodeError:
+                pieces = None
+    if not decode:
+        text = None
+    elif decoder is None:
+        encoding = "utf-8"
+        text = ""
+    elif pieces is not None and _finished(decoder, pieces):
+        text = "".join(pieces)
+    else:
+        encoding = FALLBACK_ENCODING
+        text = buffer.decode(encoding, errors="replace")
+    return UploadContent(buffer, digest.hexdigest(), encoding, text)
+
+
+def store_upload(content, file_type):
+    """
+    Store an upload read by read_upload() under uploads/<sha256>.<file_type>.
+
+    The bytes are written in one go, unless identical content is already
+    stored there.
+
+    Returns:
+        IngestedUpload(key, sha256, size, encoding, text, duplicate)
+    """
+    key = f"uploads/{content.sha256}.{file_type}"
+    storage = get_storage()
+    duplicate = False
+    try:
+        duplicate = time.time() - storage.stat(key).modified < DEDUPE_REFRESH_AGE
+    except FileNotFoundError:
+        pass
+    if not duplicate:
+        with storage.create(key) as output:
+            output.write(content.data)
+    size = len(content.data)
+    logging.info(f"Ingested {file_type} upload {key}: {size} bytes"
+                 f"{f', {content.encoding}' if content.encoding else ''}{', already stored' if duplicate else ''}")
+    return IngestedUpload(key, content.sha256, size, content.encoding, content.text, duplicate)
+
+
+def ingest_upload(file, file_type, decode=True):
+    """
+    Read an uploaded file once, storing it under its content hash and decoding it for analysis.
+
+    read_upload() followed by store_upload(); read them separately to
+    check an upload before it is stored.
+
+    Args:
+        file: The uploaded file object
+        file_type: 'html', 'css', or 'zip' for a whole site
+        decode: Decode the content; False for binary uploads, whose encoding and text are None
+
+    Returns:
+        IngestedUpload(key, sha256, size, encoding, text, duplicate); text is
+        the decoded content, to hand to the analyzers instead of re-reading
+    """
+    return store_upload(read_upload(file, file_type, decode), file_type)
+
+
+def _finished(decoder, pieces):
+    """Flush an incremental decoder into pieces; False if the input ended mid-character."""
+    try:
+        pieces.append(decoder.decode(b"", final=True))
+        return True
+    except UnicodeDecodeError:
+        return False